@@ -1,31 +1,214 @@
 # api/alerts.py
-from fastapi import APIRouter
-from api.db import conectar_oracle
-import pandas as pd
+import base64
+import binascii
+import csv
+import io
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from api.cache import CacheTTL
+from api.db import PoolAgotado, ejecutar_en_pool, exportaciones_disponibles, iterar_en_pool
+from scripts.almacenamiento import ERRORES_BD, Almacenamiento
 
 router = APIRouter()
 
+# Páginas recientes de /alertas-quiebra. Las claves incluyen la "versión"
+# de la tabla (MAX(id_alerta)), de modo que al terminar una nueva carga de
+# Z-Scores las páginas anteriores dejan de servirse.
+_cache_alertas = CacheTTL(ttl=float(os.getenv("ALERTAS_CACHE_TTL", "30")))
+_VERIFICACION_VERSION = float(os.getenv("ALERTAS_CACHE_VERIFICACION", "2"))
+_version = {"valor": None, "comprobada": float("-inf")}
+
+# Filas que se piden a la base de datos por cada bloque de la exportación.
+_LOTE_EXPORTACION = int(os.getenv("ALERTAS_EXPORTACION_LOTE", "5000"))
+_TIPOS_EXPORTACION = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def codificar_cursor(fecha_alerta, id_alerta):
+    texto = f"{fecha_alerta.isoformat()}|{id_alerta}"
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    try:
+        fecha, id_alerta = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha), int(id_alerta)
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Cursor de paginación no válido")
+
+
+def consultar_version_alertas(almacenamiento):
+    return almacenamiento.version_alertas()
+
+
+def consultar_alertas(almacenamiento, limit, id_empresa=None, anio=None, escenario_id=None,
+                      despues_de=None):
+    """
+    Devuelve una página de alertas ordenada por (fecha_alerta, id_alerta)
+    descendente y el cursor para pedir la siguiente.
+    """
+    resultados = almacenamiento.obtener_alertas(limit, id_empresa, anio, escenario_id, despues_de)
+
+    siguiente = None
+    if len(resultados) == limit:
+        ultima = resultados[-1]
+        siguiente = codificar_cursor(ultima["fecha_alerta"], ultima["id_alerta"])
+
+    return resultados, siguiente
+
+
+async def version_alertas():
+    """Versión de la tabla de alertas, consultada como mucho cada pocos segundos."""
+    ahora = time.monotonic()
+    if ahora - _version["comprobada"] >= _VERIFICACION_VERSION:
+        valor = await ejecutar_en_pool(consultar_version_alertas)
+        if valor != _version["valor"]:
+            _cache_alertas.limpiar()
+        _version["valor"], _version["comprobada"] = valor, ahora
+    return _version["valor"]
+
+
+def invalidar_cache_alertas():
+    _cache_alertas.limpiar()
+    _version["comprobada"] = float("-inf")
+
+
 @router.get("/alertas-quiebra")
-def obtener_alertas(limit: int = 100):  # Valor por defecto: 100
-    conn = conectar_oracle()
-    
-    if not conn:
-        return {"error": "No se pudo conectar a la base de datos"}
+async def obtener_alertas(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),  # Valor por defecto: 100
+    id_empresa: Optional[int] = None,
+    anio: Optional[int] = None,
+    escenario_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Alertas de quiebra paginadas por cursor. El cursor de la página
+    siguiente se devuelve en la cabecera X-Siguiente-Cursor.
+    """
+    despues_de = decodificar_cursor(cursor) if cursor else None
 
-    cursor = conn.cursor()
-    
-    query = f"""
-        SELECT id_empresa, año, escenario_id, z_score, mensaje, fecha_alerta
-        FROM alertas_empresas
-        ORDER BY fecha_alerta DESC
-        FETCH FIRST {limit} ROWS ONLY
-    """
-    
-    cursor.execute(query)
-    columnas = [col[0].lower() for col in cursor.description]
-    resultados = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
-    
-    cursor.close()
-    conn.close()
+    try:
+        version = await version_alertas()
+        clave = (version, limit, id_empresa, anio, escenario_id, cursor)
+        pagina = _cache_alertas.obtener(clave)
+        if pagina is None:
+            pagina = await ejecutar_en_pool(
+                consultar_alertas, limit, id_empresa, anio, escenario_id, despues_de
+            )
+            _cache_alertas.guardar(clave, pagina)
+    except PoolAgotado as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ERRORES_BD as e:
+        print("❌ Error al consultar alertas:", e)
+        return {"error": "No se pudo conectar a la base de datos"}
 
+    resultados, siguiente = pagina
+    if siguiente:
+        response.headers["X-Siguiente-Cursor"] = siguiente
     return resultados
+
+
+@router.post("/alertas-quiebra/cache/invalidar")
+def invalidar_cache():
+    # Permite a los procesos de carga forzar la invalidación inmediata.
+    invalidar_cache_alertas()
+    return {"mensaje": "Caché de alertas invalidada."}
+
+
+def _valor_json(valor):
+    # Mismo formato de fecha que las respuestas JSON de FastAPI.
+    return valor.isoformat() if isinstance(valor, datetime) else str(valor)
+
+
+def serializar_alertas(filas, formato, cabecera=False):
+    """Convierte un bloque de tuplas de alertas en texto NDJSON o CSV."""
+    columnas = Almacenamiento.COLUMNAS_ALERTAS
+    if formato == "ndjson":
+        return "".join(
+            json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_valor_json) + "\n"
+            for fila in filas
+        )
+
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator="\n")
+    if cabecera:
+        escritor.writerow(columnas)
+    escritor.writerows(filas)
+    return salida.getvalue()
+
+
+def leer_bloques_alertas(almacenamiento, id_empresa=None, anio=None, escenario_id=None):
+    return almacenamiento.leer_alertas(_LOTE_EXPORTACION, id_empresa, anio, escenario_id)
+
+
+async def generar_exportacion(request, formato, comprimir, id_empresa, anio, escenario_id):
+    """
+    Produce la exportación bloque a bloque: cada bloque leído con fetchmany
+    se serializa (y comprime) y se envía antes de pedir el siguiente, así que
+    la memoria depende del tamaño del bloque y no del de la tabla.
+    """
+    compresor = zlib.compressobj(wbits=31) if comprimir else None  # 31: formato gzip
+    primero = True
+
+    bloques = iterar_en_pool(leer_bloques_alertas, id_empresa, anio, escenario_id)
+    try:
+        async for filas in bloques:
+            if await request.is_disconnected():
+                return
+            datos = serializar_alertas(filas, formato, cabecera=primero).encode("utf-8")
+            primero = False
+            if compresor:
+                datos = compresor.compress(datos)
+            if datos:
+                yield datos
+    except ERRORES_BD as e:
+        # Los datos ya enviados no se pueden retirar: se corta la respuesta.
+        print("❌ Error durante la exportación de alertas:", e)
+        return
+    finally:
+        # Devuelve la conexión al pool aunque el cliente se haya ido.
+        await bloques.aclose()
+
+    if primero and formato == "csv":
+        datos = serializar_alertas([], formato, cabecera=True).encode("utf-8")
+        yield compresor.compress(datos) if compresor else datos
+    if compresor:
+        yield compresor.flush()
+
+
+@router.get("/alertas-quiebra/exportar")
+async def exportar_alertas(
+    request: Request,
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    id_empresa: Optional[int] = None,
+    anio: Optional[int] = None,
+    escenario_id: Optional[int] = None,
+):
+    """
+    Exporta todas las alertas (con los filtros indicados) en NDJSON o CSV,
+    enviando los datos a medida que se leen de la base de datos.
+
+    Cada exportación retiene una conexión del pool mientras dura; si ya hay
+    el máximo en curso responde 503 en lugar de esperar.
+    """
+    if not exportaciones_disponibles():
+        raise HTTPException(status_code=503, detail="Demasiadas exportaciones simultáneas",
+                            headers={"Retry-After": "30"})
+    cabeceras = {"Content-Disposition": f'attachment; filename="alertas_quiebra.{formato}"'}
+    if gzip:
+        cabeceras["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        generar_exportacion(request, formato, gzip, id_empresa, anio, escenario_id),
+        media_type=_TIPOS_EXPORTACION[formato],
+        headers=cabeceras,
+    )
@@ -1,10 +1,65 @@
 # api/db.py
-import cx_Oracle
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from scripts.almacenamiento import (
+    AlmacenamientoOracle,
+    AlmacenamientoSQLite,
+    ERRORES_BD,
+    ErrorAlmacenamiento,
+    PoolSQLite,
+    cx_Oracle,
+)
+
+try:
+    from instrumentacion import medir, registrar_indicador
+except ImportError:  # Mismo módulo que usa scripts/almacenamiento.py.
+    from scripts.instrumentacion import medir, registrar_indicador
+
+# Pool de sesiones compartido durante toda la vida de la aplicación.
+# Se crea en el arranque de FastAPI (crear_pool) y se cierra al apagarla.
+# Con FDI_BACKEND=sqlite se usa la base embebida (FDI_SQLITE_RUTA) en lugar
+# de Oracle, para pruebas de latencia sin Oracle XE.
+_pool = None
+_executor = None
+_clase_almacenamiento = AlmacenamientoOracle
+
+# Las exportaciones retienen una conexión mientras dura la descarga. Tienen
+# su propio executor y como mucho ORACLE_POOL_MAX - 1 a la vez, para que
+# siempre quede una conexión para el resto de peticiones. El contador solo
+# se toca desde el bucle de eventos, así que no necesita lock.
+_executor_exportaciones = None
+_exportaciones = {"en_curso": 0, "maximo": 0}
+
+
+class PoolAgotado(ErrorAlmacenamiento):
+    """No hay conexión libre en el pool dentro del tiempo de espera (HTTP 503)."""
+
+
+def _estado_pool(atributo):
+    return lambda: getattr(_pool, atributo, None) if _pool is not None else None
+
+
+registrar_indicador("bd_pool_ocupadas", _estado_pool("busy"))
+registrar_indicador("bd_pool_abiertas", _estado_pool("opened"))
+
+
+def _dsn(driver=cx_Oracle):
+    return driver.makedsn(
+        os.getenv("ORACLE_HOST", "localhost"),
+        int(os.getenv("ORACLE_PORT", "1521")),
+        service_name=os.getenv("ORACLE_SERVICE", "XE"),
+    )
+
 
 def conectar_oracle():
+    if cx_Oracle is None:
+        print("❌ cx_Oracle no está instalado.")
+        return None
     try:
-        dsn = cx_Oracle.makedsn("localhost", 1521, service_name="XE")
+        dsn = _dsn()
         user = os.getenv("ORACLE_USER", "usuario_por_defecto")
         password = os.getenv("ORACLE_PASS", "contraseña_por_defecto")
         conn = cx_Oracle.connect(user, password, dsn)
@@ -12,3 +67,155 @@ def conectar_oracle():
     except cx_Oracle.Error as e:
         print("❌ Error al conectar con Oracle:", e)
         return None
+
+
+def crear_pool(driver=cx_Oracle):
+    """
+    Crea el pool de sesiones con el tamaño indicado en las variables de
+    entorno ORACLE_POOL_MIN, ORACLE_POOL_MAX y ORACLE_POOL_INCREMENT.
+    Pedir una conexión espera como mucho ORACLE_POOL_ESPERA segundos.
+
+    Args:
+        driver: Módulo compatible con cx_Oracle. Permite usar un driver
+            simulado en pruebas.
+
+    Returns:
+        El pool creado, o None si no se pudo conectar.
+    """
+    global _pool, _executor, _executor_exportaciones, _clase_almacenamiento
+
+    minimo = int(os.getenv("ORACLE_POOL_MIN", "2"))
+    maximo = int(os.getenv("ORACLE_POOL_MAX", "10"))
+    incremento = int(os.getenv("ORACLE_POOL_INCREMENT", "1"))
+    espera = float(os.getenv("ORACLE_POOL_ESPERA", "10"))
+    exportaciones = max(1, min(int(os.getenv("API_EXPORTACIONES_MAX", str(maximo - 1))),
+                               maximo - 1))
+
+    # Un hilo por conexión: las consultas lentas esperan en este executor
+    # y no ocupan el threadpool que FastAPI usa para el resto de endpoints.
+    _executor = ThreadPoolExecutor(max_workers=maximo, thread_name_prefix="bd")
+    _executor_exportaciones = ThreadPoolExecutor(max_workers=exportaciones,
+                                                 thread_name_prefix="bd-exportacion")
+    _exportaciones["maximo"] = exportaciones
+
+    if os.getenv("FDI_BACKEND", "oracle").lower() == "sqlite":
+        _clase_almacenamiento = AlmacenamientoSQLite
+        _pool = PoolSQLite(os.getenv("FDI_SQLITE_RUTA", "data/fdi.db"), maximo, espera)
+        return _pool
+
+    _clase_almacenamiento = AlmacenamientoOracle
+    if driver is None:
+        print("❌ cx_Oracle no está instalado; usa FDI_BACKEND=sqlite.")
+        _pool = None
+        return _pool
+
+    try:
+        _pool = driver.SessionPool(
+            user=os.getenv("ORACLE_USER", "usuario_por_defecto"),
+            password=os.getenv("ORACLE_PASS", "contraseña_por_defecto"),
+            dsn=_dsn(driver),
+            min=minimo,
+            max=maximo,
+            increment=incremento,
+            threaded=True,
+            getmode=driver.SPOOL_ATTRVAL_TIMEDWAIT,
+            waitTimeout=int(espera * 1000),
+            encoding="UTF-8",
+        )
+    except driver.Error as e:
+        print("❌ Error al crear el pool de Oracle:", e)
+        _pool = None
+
+    return _pool
+
+
+def cerrar_pool():
+    global _pool, _executor, _executor_exportaciones
+
+    if _executor_exportaciones is not None:
+        _executor_exportaciones.shutdown(wait=True)
+        _executor_exportaciones = None
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _pool is not None:
+        _pool.close(force=True)
+        _pool = None
+
+
+@contextmanager
+def obtener_almacenamiento():
+    """Presta una conexión del pool, envuelta en su backend, y la devuelve al terminar."""
+    if _pool is None:
+        raise ErrorAlmacenamiento("El pool de conexiones no está disponible")
+
+    with medir("bd.pool_espera"):
+        try:
+            conn = _pool.acquire()
+        except ERRORES_BD as e:
+            raise PoolAgotado(f"No hay conexiones libres en el pool: {e}") from e
+    try:
+        yield _clase_almacenamiento(conn)
+    finally:
+        _pool.release(conn)
+
+
+async def ejecutar_en_pool(funcion, *args, **kwargs):
+    """
+    Ejecuta `funcion(almacenamiento, *args, **kwargs)` con una conexión del
+    pool en un hilo dedicado, sin bloquear el bucle de eventos.
+    """
+    def tarea():
+        with obtener_almacenamiento() as almacenamiento:
+            with medir("bd.consulta", funcion=funcion.__name__):
+                return funcion(almacenamiento, *args, **kwargs)
+
+    if _executor is None:
+        raise ErrorAlmacenamiento("El pool de conexiones no está disponible")
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, tarea)
+
+
+def exportaciones_disponibles():
+    """True si ahora mismo se puede empezar una exportación."""
+    return (_executor_exportaciones is not None
+            and _exportaciones["en_curso"] < _exportaciones["maximo"])
+
+
+async def iterar_en_pool(funcion, *args, **kwargs):
+    """
+    Recorre el generador `funcion(almacenamiento, *args, **kwargs)` pidiendo
+    cada elemento en el executor de exportaciones. La conexión queda
+    prestada mientras dura el recorrido y se devuelve al pool al terminar o
+    al abandonarlo.
+
+    Raises:
+        PoolAgotado: Si ya hay el máximo de exportaciones en curso.
+    """
+    if _executor_exportaciones is None:
+        raise ErrorAlmacenamiento("El pool de conexiones no está disponible")
+    if not exportaciones_disponibles():
+        raise PoolAgotado("Demasiadas exportaciones simultáneas")
+
+    executor = _executor_exportaciones
+    _exportaciones["en_curso"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        contexto = obtener_almacenamiento()
+        almacenamiento = await loop.run_in_executor(executor, contexto.__enter__)
+        try:
+            generador = funcion(almacenamiento, *args, **kwargs)
+            try:
+                while True:
+                    elemento = await loop.run_in_executor(executor, next, generador, None)
+                    if elemento is None:
+                        break
+                    yield elemento
+            finally:
+                # Cierra el cursor en un hilo del executor, como el resto de llamadas.
+                await loop.run_in_executor(executor, generador.close)
+        finally:
+            await loop.run_in_executor(executor, contexto.__exit__, None, None, None)
+    finally:
+        _exportaciones["en_curso"] -= 1
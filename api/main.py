@@ -1,11 +1,54 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from api.alerts import router as alerts_router  # Importamos el router
+from api.resumen import router as resumen_router
+from api.db import crear_pool, cerrar_pool
+
+try:
+    from instrumentacion import esta_activa, exportar_prometheus, observar
+except ImportError:  # Mismo módulo que usa scripts/almacenamiento.py.
+    from scripts.instrumentacion import esta_activa, exportar_prometheus, observar
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # El pool de Oracle vive lo mismo que la aplicación.
+    crear_pool()
+    yield
+    cerrar_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def medir_peticiones(request: Request, call_next):
+    # Con FDI_METRICAS desactivado la petición pasa sin medir.
+    if not esta_activa():
+        return await call_next(request)
+
+    inicio = time.perf_counter()
+    respuesta = await call_next(request)
+    ruta = request.scope.get("route")
+    observar("api.peticion", time.perf_counter() - inicio,
+             ruta=getattr(ruta, "path", "desconocida"), metodo=request.method)
+    return respuesta
 
-app = FastAPI()
 
 @app.get("/")
 def read_root():
     return {"mensaje": "API funcionando correctamente."}
 
-app.include_router(alerts_router)  # Activamos la ruta /alertas-quiebra
 
+@app.get("/metrics", include_in_schema=False)
+def metricas():
+    # Formato de exposición de Prometheus. Sin FDI_METRICAS solo incluye el
+    # estado del pool de conexiones.
+    return PlainTextResponse(exportar_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+app.include_router(alerts_router)  # Activamos la ruta /alertas-quiebra
+app.include_router(resumen_router)  # /resumen-escenarios
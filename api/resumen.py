@@ -0,0 +1,52 @@
+# api/resumen.py
+import os
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from api.cache import CacheTTL
+from api.db import PoolAgotado, ejecutar_en_pool
+from scripts.almacenamiento import ERRORES_BD
+
+router = APIRouter()
+
+# El resumen solo cambia al regenerarse tras una carga de Z-Scores.
+_cache_resumen = CacheTTL(ttl=float(os.getenv("RESUMEN_CACHE_TTL", "300")))
+
+
+def consultar_resumen(almacenamiento, limit, nivel, id_empresa=None, pais=None, anio=None):
+    return almacenamiento.obtener_resumen_escenarios(limit, nivel, id_empresa, pais, anio)
+
+
+@router.get("/resumen-escenarios")
+async def obtener_resumen_escenarios(
+    nivel: str = Query("empresa", pattern="^(empresa|pais)$"),
+    limit: int = Query(500, ge=1, le=5000),
+    id_empresa: Optional[int] = None,
+    pais: Optional[str] = None,
+    anio: Optional[int] = None,
+):
+    """
+    Media, percentiles 5/50/95 de ingreso y Z-Score y proporción de
+    escenarios en riesgo, por (empresa, año) o por (país, año).
+    """
+    clave = (nivel, limit, id_empresa, pais, anio)
+    try:
+        resultados = _cache_resumen.obtener(clave)
+        if resultados is None:
+            resultados = await ejecutar_en_pool(consultar_resumen, limit, nivel,
+                                                id_empresa, pais, anio)
+            _cache_resumen.guardar(clave, resultados)
+    except PoolAgotado as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ERRORES_BD as e:
+        print("❌ Error al consultar el resumen por escenarios:", e)
+        return {"error": "No se pudo conectar a la base de datos"}
+
+    return resultados
+
+
+@router.post("/resumen-escenarios/cache/invalidar")
+def invalidar_cache():
+    _cache_resumen.limpiar()
+    return {"mensaje": "Caché del resumen invalidada."}
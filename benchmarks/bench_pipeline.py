@@ -0,0 +1,338 @@
+"""
+Benchmark del pipeline completo sobre la base embebida (SQLite).
+
+Mide por separado tiempo y memoria pico de cada etapa:
+    limpiar_datos_fdi, procesar_pais, simular_fdi, simular_ingresos_empresa,
+    calcular_z_score, las inserciones en BBDD y el endpoint /alertas-quiebra
+    bajo carga concurrente.
+
+Los resultados se guardan en JSON y se comparan con benchmarks/baseline.json
+(si existe); el script termina con código 1 si alguna etapa empeora más que
+la tolerancia indicada. El baseline depende de la máquina, así que no se
+versiona: cada equipo o runner de CI guarda el suyo con --guardar-baseline.
+Con --exigir-baseline, no tener baseline o tenerlo con otros parámetros es
+un error (código 2) en lugar de omitir la comparación.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_pipeline.py --paises 50 --empresas 20 --escenarios 1000
+    python benchmarks/bench_pipeline.py --guardar-baseline
+    python benchmarks/bench_pipeline.py --exigir-baseline --baseline /ruta/baseline_ci.json
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / "scripts"))
+sys.path.insert(0, str(RAIZ))
+
+from fdi_analysis_preprocessing import limpiar_datos_fdi, procesar_pais  # noqa: E402
+from simulacion_montecarlo import simular_fdi, insertar_simulacion_oracle  # noqa: E402
+from empresas import (  # noqa: E402
+    generar_empresas_ficticias,
+    insertar_empresas,
+    insertar_simulaciones_empresas,
+    simular_ingresos_empresa,
+)
+from escenarios import CuboEscenarios  # noqa: E402
+
+# z-score.py no es importable por nombre (lleva guion).
+_spec = importlib.util.spec_from_file_location("z_score", RAIZ / "scripts" / "z-score.py")
+z_score = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(z_score)
+
+DIRECTORIO = Path(__file__).resolve().parent
+BASELINE = DIRECTORIO / "baseline.json"
+
+
+# =====================================
+# Datos sintéticos
+# =====================================
+
+def generar_csv_sintetico(paises, rng):
+    """DataFrame con el formato del CSV del Banco Mundial (1960-2023)."""
+    años = [str(a) for a in range(1960, 2024)]
+    valores = rng.normal(3.0, 4.0, size=(paises, len(años)))
+    valores[rng.random(valores.shape) < 0.1] = np.nan
+    valores[:, :40] = np.nan  # Los primeros años suelen venir vacíos.
+
+    df = pd.DataFrame(valores, columns=años)
+    df.insert(0, "Country Name", [f"Pais {i}" for i in range(paises)])
+    df.insert(1, "Country Code", [f"P{i:02d}" for i in range(paises)])
+    df.insert(2, "Indicator Name", "Foreign direct investment, net inflows (% of GDP)")
+    df.insert(3, "Indicator Code", "BX.KLT.DINV.WD.GD.ZS")
+    df["Unnamed: 68"] = np.nan
+    return df
+
+
+# =====================================
+# Medición
+# =====================================
+
+def medir(funcion, repeticiones=1):
+    """Devuelve (resultado, mejor tiempo en s, pico de memoria en MB)."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return resultado, min(tiempos), pico / 1e6
+
+
+def medir_sin_repetir(funcion):
+    """Para etapas con efectos en BBDD: una sola ejecución, con tracemalloc."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, segundos, pico / 1e6
+
+
+def registrar(resultados, etapa, segundos, pico_mb, filas):
+    resultados[etapa] = {
+        "segundos": round(segundos, 6),
+        "pico_mb": round(pico_mb, 3),
+        "filas": filas,
+        "filas_s": round(filas / segundos, 1) if segundos > 0 else None,
+    }
+    print(f"{etapa:<32} {segundos:9.4f} s  {pico_mb:9.2f} MB  {filas:>12,} filas")
+
+
+async def cargar_endpoint(peticiones, concurrencia):
+    """Lanza peticiones concurrentes a /alertas-quiebra y mide latencias."""
+    import httpx
+    from api import db
+    from api.main import app
+
+    db.crear_pool()
+    latencias = []
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def peticion(cliente, i):
+        async with semaforo:
+            inicio = time.perf_counter()
+            respuesta = await cliente.get("/alertas-quiebra", params={"limit": 100,
+                                                                       "id_empresa": i % 5 + 1})
+            respuesta.raise_for_status()
+            latencias.append(time.perf_counter() - inicio)
+
+    transporte = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            inicio = time.perf_counter()
+            await asyncio.gather(*(peticion(cliente, i) for i in range(peticiones)))
+            total = time.perf_counter() - inicio
+    finally:
+        db.cerrar_pool()
+
+    latencias.sort()
+    return {
+        "segundos": total,
+        "p50_ms": statistics.median(latencias) * 1000,
+        "p95_ms": latencias[int(len(latencias) * 0.95) - 1] * 1000,
+    }
+
+
+# =====================================
+# Ejecución de etapas
+# =====================================
+
+def ejecutar(args):
+    rng = np.random.default_rng(args.semilla)
+    random.seed(args.semilla)
+    resultados = {}
+
+    df_csv = generar_csv_sintetico(args.paises, rng)
+
+    df_limpio, seg, pico = medir(lambda: limpiar_datos_fdi(df_csv.copy()), args.repeticiones)
+    registrar(resultados, "limpiar_datos_fdi", seg, pico, len(df_csv))
+
+    nombres = df_limpio["Country Name"].tolist()
+    paises, seg, pico = medir(lambda: {n: procesar_pais(df_limpio, n) for n in nombres},
+                              args.repeticiones)
+    registrar(resultados, "procesar_pais", seg, pico, len(nombres))
+
+    parametros = {n: (df["FDI"].mean(), df["FDI"].std()) for n, df in paises.items()}
+
+    def simular_paises():
+        return [simular_fdi(n[:10], m, s, años=args.años, iteraciones=args.escenarios, semilla=i)
+                for i, (n, (m, s)) in enumerate(parametros.items())]
+
+    simulaciones, seg, pico = medir(simular_paises, args.repeticiones)
+    df_simulado = pd.concat(simulaciones, ignore_index=True)
+    registrar(resultados, "simular_fdi", seg, pico, len(df_simulado))
+
+    empresas = [e for _ in range(-(-args.empresas // 10)) for e in generar_empresas_ficticias()]
+    empresas = empresas[:args.empresas]
+
+    def simular_empresas():
+        return CuboEscenarios.concatenar(
+            simular_ingresos_empresa(e.ingresos_base, e.sensibilidad_fdi, args.años,
+                                     args.escenarios, rng=i, id_empresa=i + 1, pais=e.pais)
+            for i, e in enumerate(empresas)
+        )
+
+    cubo, seg, pico = medir(simular_empresas, args.repeticiones)
+    filas_empresas = len(cubo)
+    registrar(resultados, "simular_ingresos_empresa", seg, pico, filas_empresas)
+
+    df_sim = cubo.a_dataframe()
+    sensibilidades = {i + 1: e.sensibilidad_fdi for i, e in enumerate(empresas)}
+    df_z, seg, pico = medir(lambda: z_score.calcular_z_score(df_sim.copy(), sensibilidades),
+                            args.repeticiones)
+    registrar(resultados, "calcular_z_score", seg, pico, len(df_z))
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "bench.db")
+        cs = f"sqlite:///{ruta}"
+
+        _, seg, pico = medir_sin_repetir(lambda: insertar_simulacion_oracle(df_simulado, cs))
+        registrar(resultados, "insertar_simulacion_oracle", seg, pico, len(df_simulado))
+
+        insertar_empresas(cs, empresas)
+        _, seg, pico = medir_sin_repetir(lambda: insertar_simulaciones_empresas(
+            cs, años=args.años, escenarios=args.escenarios, semilla=args.semilla))
+        registrar(resultados, "insertar_simulaciones_empresas", seg, pico, filas_empresas)
+
+        _, seg, pico = medir_sin_repetir(lambda: z_score.procesar_zscores_streaming(cs))
+        registrar(resultados, "procesar_zscores_streaming", seg, pico, filas_empresas)
+
+        os.environ["FDI_BACKEND"] = "sqlite"
+        os.environ["FDI_SQLITE_RUTA"] = ruta
+        carga = asyncio.run(cargar_endpoint(args.peticiones, args.concurrencia))
+        registrar(resultados, "endpoint_alertas_quiebra", carga["segundos"], 0.0, args.peticiones)
+        resultados["endpoint_alertas_quiebra"].update(
+            p50_ms=round(carga["p50_ms"], 3), p95_ms=round(carga["p95_ms"], 3)
+        )
+        print(f"{'':<32} p50 {carga['p50_ms']:.2f} ms  p95 {carga['p95_ms']:.2f} ms")
+
+    return resultados
+
+
+def cargar_baseline(ruta):
+    """Informe guardado con --guardar-baseline, o None si no existe o no se puede leer."""
+    try:
+        informe = json.loads(Path(ruta).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return informe if isinstance(informe, dict) and "etapas" in informe else None
+
+
+def comparar_con_baseline(resultados, baseline, tolerancia):
+    """Devuelve las etapas cuyo tiempo supera el baseline en más de `tolerancia`."""
+    regresiones = []
+    print("\nComparación con baseline:")
+    for etapa, medida in resultados.items():
+        if etapa not in baseline:
+            continue
+        referencia = baseline[etapa]["segundos"]
+        cambio = medida["segundos"] / referencia - 1 if referencia else 0.0
+        marca = "❌" if cambio > tolerancia else "✅"
+        print(f"{marca} {etapa:<32} {cambio:+8.1%}")
+        if cambio > tolerancia:
+            regresiones.append(etapa)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline FDI")
+    parser.add_argument("--paises", type=int, default=20)
+    parser.add_argument("--empresas", type=int, default=10)
+    parser.add_argument("--escenarios", type=int, default=1000)
+    parser.add_argument("--años", type=int, default=8)
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="Empeoramiento relativo admitido frente al baseline")
+    parser.add_argument("--salida", type=Path, default=DIRECTORIO / "resultados")
+    parser.add_argument("--baseline", type=Path, default=BASELINE,
+                        help="Fichero de baseline (por defecto benchmarks/baseline.json)")
+    parser.add_argument("--guardar-baseline", action="store_true")
+    parser.add_argument("--exigir-baseline", action="store_true",
+                        help="Fallar (código 2) si no hay baseline con los mismos parámetros")
+    args = parser.parse_args()
+
+    resultados = ejecutar(args)
+    parametros = {k: v for k, v in vars(args).items()
+                  if k not in ("salida", "baseline", "guardar_baseline", "exigir_baseline")}
+
+    informe = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            # Los tiempos solo son comparables en la misma máquina.
+            "maquina": {
+                "sistema": platform.platform(),
+                "procesador": platform.processor() or platform.machine(),
+                "nucleos": os.cpu_count(),
+            },
+            "parametros": parametros,
+        },
+        "etapas": resultados,
+    }
+
+    args.salida.mkdir(parents=True, exist_ok=True)
+    ruta = args.salida / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    ruta.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n📁 Resultados guardados en: {ruta}")
+
+    if args.guardar_baseline:
+        args.baseline.write_text(json.dumps(informe, indent=2, ensure_ascii=False),
+                                 encoding="utf-8")
+        print(f"📁 Baseline actualizado: {args.baseline}")
+        return 0
+
+    baseline = cargar_baseline(args.baseline)
+    if baseline is None:
+        if args.exigir_baseline:
+            print(f"\n❌ No hay baseline en {args.baseline} (guárdalo con --guardar-baseline).")
+            return 2
+        print("\nNo hay baseline guardado; se omite la comparación.")
+        return 0
+
+    # La tolerancia no cambia lo que se mide.
+    medidos = {k: v for k, v in parametros.items() if k != "tolerancia"}
+    guardados = {k: v for k, v in baseline.get("meta", {}).get("parametros", {}).items()
+                 if k != "tolerancia"}
+    if guardados != medidos:
+        print("\n⚠️ El baseline se guardó con otros parámetros; los tiempos no son comparables.")
+        if args.exigir_baseline:
+            return 2
+    maquina = baseline.get("meta", {}).get("maquina")
+    if maquina and maquina != informe["meta"]["maquina"]:
+        print(f"⚠️ El baseline es de otra máquina ({maquina['procesador']}, "
+              f"{maquina['nucleos']} núcleos).")
+
+    return 1 if comparar_con_baseline(resultados, baseline["etapas"], args.tolerancia) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
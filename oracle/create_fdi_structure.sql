@@ -30,238 +30,15 @@ NESTED TABLE fdi_anual STORE AS fdi_anual_nt;
 
 
 /*
-  Se insertan los regitros en la tabla fdi_pais_objeto.
-  Se especifica el país, su código y una colección anidada de objetos 
-  fdi_anual_tipo que representan los valores históricos de FDI por año.
-*/
-
-
--- España
-INSERT INTO fdi_pais_objeto VALUES (
-    'España',
-    'ESP',
-    fdi_lista_tipo(
-        fdi_anual_tipo(2000.0, 6.77), fdi_anual_tipo(2001.0, 4.6), fdi_anual_tipo(2002.0, 5.55),
-        fdi_anual_tipo(2003.0, 3.39), fdi_anual_tipo(2004.0, 2.36), fdi_anual_tipo(2005.0, 2.34),
-        fdi_anual_tipo(2006.0, 2.61), fdi_anual_tipo(2007.0, 4.62), fdi_anual_tipo(2008.0, 4.53),
-        fdi_anual_tipo(2009.0, 0.64), fdi_anual_tipo(2010.0, 2.56), fdi_anual_tipo(2011.0, 1.8),
-        fdi_anual_tipo(2012.0, 1.57), fdi_anual_tipo(2013.0, 3.46), fdi_anual_tipo(2014.0, 2.32),
-        fdi_anual_tipo(2015.0, 1.97), fdi_anual_tipo(2016.0, 3.62), fdi_anual_tipo(2017.0, 2.54),
-        fdi_anual_tipo(2018.0, 4.47), fdi_anual_tipo(2019.0, 2.16), fdi_anual_tipo(2020.0, 2.92),
-        fdi_anual_tipo(2021.0, 4.42), fdi_anual_tipo(2022.0, 4.53)
-    )
-);
-
-COMMIT;
-
--- Irlanda 
-INSERT INTO fdi_pais_objeto VALUES (
-    'Iralanda',
-    'IRL',
-    fdi_lista_tipo(
-        fdi_anual_tipo(2000.0, 25.73), fdi_anual_tipo(2001.0, 8.83), fdi_anual_tipo(2002.0, 22.8),
-        fdi_anual_tipo(2003.0, 13.83), fdi_anual_tipo(2004.0, -5.46), fdi_anual_tipo(2005.0, 22.18),
-        fdi_anual_tipo(2006.0, 9.51), fdi_anual_tipo(2007.0, 22.19), fdi_anual_tipo(2008.0, 8.45),
-        fdi_anual_tipo(2009.0, 22.83), fdi_anual_tipo(2010.0, 17.0), fdi_anual_tipo(2011.0, 9.82),
-        fdi_anual_tipo(2012.0, 25.56), fdi_anual_tipo(2013.0, 29.81), fdi_anual_tipo(2014.0, 39.32),
-        fdi_anual_tipo(2015.0, 74.75), fdi_anual_tipo(2016.0, 26.1), fdi_anual_tipo(2017.0, 20.41),
-        fdi_anual_tipo(2018.0, 20.38), fdi_anual_tipo(2019.0, 7.68), fdi_anual_tipo(2020.0, 8.08),
-        fdi_anual_tipo(2021.0, 14.63), fdi_anual_tipo(2022.0, -6.49)
-    )
-);
-COMMIT;
-
--- Unión Europea
-INSERT INTO fdi_pais_objeto VALUES (
-    'Unión Europea',
-    'EUU',
-    fdi_lista_tipo(
-        fdi_anual_tipo(2000.0, 8.72), fdi_anual_tipo(2001.0, 4.96), fdi_anual_tipo(2002.0, 3.65),
-        fdi_anual_tipo(2003.0, 2.95), fdi_anual_tipo(2004.0, 2.74), fdi_anual_tipo(2005.0, 6.12),
-        fdi_anual_tipo(2006.0, 7.14), fdi_anual_tipo(2007.0, 9.99), fdi_anual_tipo(2008.0, 5.06),
-        fdi_anual_tipo(2009.0, 3.96), fdi_anual_tipo(2010.0, 3.27), fdi_anual_tipo(2011.0, 5.68),
-        fdi_anual_tipo(2012.0, 3.95), fdi_anual_tipo(2013.0, 3.89), fdi_anual_tipo(2014.0, 2.96),
-        fdi_anual_tipo(2015.0, 6.23), fdi_anual_tipo(2016.0, 5.2), fdi_anual_tipo(2017.0, 3.97),
-        fdi_anual_tipo(2018.0, 0.83), fdi_anual_tipo(2019.0, 3.69), fdi_anual_tipo(2020.0, 1.24),
-        fdi_anual_tipo(2021.0, 3.76), fdi_anual_tipo(2022.0, 1.11)
-    )
-);
-COMMIT;
-
--- Estados Unidos
-INSERT INTO fdi_pais_objeto VALUES (
-    'Estados Unidos de América',
-    'USA',
-    fdi_lista_tipo(
-        fdi_anual_tipo(2000.0, 3.41), fdi_anual_tipo(2001.0, 1.63), fdi_anual_tipo(2002.0, 1.02),
-        fdi_anual_tipo(2003.0, 1.02), fdi_anual_tipo(2004.0, 1.75), fdi_anual_tipo(2005.0, 1.09),
-        fdi_anual_tipo(2006.0, 2.16), fdi_anual_tipo(2007.0, 2.39), fdi_anual_tipo(2008.0, 2.31),
-        fdi_anual_tipo(2009.0, 1.11), fdi_anual_tipo(2010.0, 1.75), fdi_anual_tipo(2011.0, 1.69),
-        fdi_anual_tipo(2012.0, 1.54), fdi_anual_tipo(2013.0, 1.71), fdi_anual_tipo(2014.0, 1.43),
-        fdi_anual_tipo(2015.0, 2.8), fdi_anual_tipo(2016.0, 2.52), fdi_anual_tipo(2017.0, 1.94),
-        fdi_anual_tipo(2018.0, 1.04), fdi_anual_tipo(2019.0, 1.47), fdi_anual_tipo(2020.0, 0.64),
-        fdi_anual_tipo(2021.0, 2.01),fdi_anual_tipo(2022.0, 1.57)
-    )
-);
-COMMIT;
-
--- Alemania
-INSERT INTO fdi_pais_objeto VALUES (
-        'Alemania',
-        'DEU',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, 12.61), fdi_anual_tipo(2001.0, 2.9), fdi_anual_tipo(2002.0, 2.44),
-        fdi_anual_tipo(2003.0, 2.58), fdi_anual_tipo(2004.0, -0.72), fdi_anual_tipo(2005.0, 2.07),
-        fdi_anual_tipo(2006.0, 2.87), fdi_anual_tipo(2007.0, 1.46), fdi_anual_tipo(2008.0, 0.81),
-        fdi_anual_tipo(2009.0, 1.63), fdi_anual_tipo(2010.0, 2.48), fdi_anual_tipo(2011.0, 2.55),
-        fdi_anual_tipo(2012.0, 1.82), fdi_anual_tipo(2013.0, 1.76), fdi_anual_tipo(2014.0, 0.44),
-        fdi_anual_tipo(2015.0, 1.82), fdi_anual_tipo(2016.0, 1.64), fdi_anual_tipo(2017.0, 2.89),
-        fdi_anual_tipo(2018.0, 4.0), fdi_anual_tipo(2019.0, 1.91), fdi_anual_tipo(2020.0, 4.49),
-        fdi_anual_tipo(2021.0, 2.35), fdi_anual_tipo(2022.0, 1.51)
-        )
-    );
-COMMIT;
-
--- FRANCIA
-INSERT INTO fdi_pais_objeto VALUES (
-        'Francia',
-        'FRA',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, 3.04), fdi_anual_tipo(2001.0, 3.66), fdi_anual_tipo(2002.0, 3.45),
-        fdi_anual_tipo(2003.0, 2.31), fdi_anual_tipo(2004.0, 1.69), fdi_anual_tipo(2005.0, 3.88),
-        fdi_anual_tipo(2006.0, 3.41), fdi_anual_tipo(2007.0, 3.15), fdi_anual_tipo(2008.0, 2.32),
-        fdi_anual_tipo(2009.0, 0.68), fdi_anual_tipo(2010.0, 1.47), fdi_anual_tipo(2011.0, 1.54),
-        fdi_anual_tipo(2012.0, 1.23), fdi_anual_tipo(2013.0, 1.19), fdi_anual_tipo(2014.0, 0.18),
-        fdi_anual_tipo(2015.0, 1.77), fdi_anual_tipo(2016.0, 1.44),  fdi_anual_tipo(2017.0, 1.69),
-        fdi_anual_tipo(2018.0, 2.79), fdi_anual_tipo(2019.0, 1.96), fdi_anual_tipo(2020.0, 0.73),
-        fdi_anual_tipo(2021.0, 3.3), fdi_anual_tipo(2022.0, 3.92)
-        )
-    );
-COMMIT;
-
--- Italia
-INSERT INTO fdi_pais_objeto VALUES (
-        'Italia',
-        'ITA',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, 1.15), fdi_anual_tipo(2001.0, 1.27), fdi_anual_tipo(2002.0, 1.34),
-        fdi_anual_tipo(2003.0, 1.24),  fdi_anual_tipo(2004.0, 1.11), fdi_anual_tipo(2005.0, 1.97),
-        fdi_anual_tipo(2006.0, 2.91), fdi_anual_tipo(2007.0, 2.97), fdi_anual_tipo(2008.0, -0.39),
-        fdi_anual_tipo(2009.0, 0.75),  fdi_anual_tipo(2010.0, 0.46), fdi_anual_tipo(2011.0, 1.49),
-        fdi_anual_tipo(2012.0, 0.0), fdi_anual_tipo(2013.0, 0.91), fdi_anual_tipo(2014.0, 0.78),
-        fdi_anual_tipo(2015.0, 0.72), fdi_anual_tipo(2016.0, 1.36), fdi_anual_tipo(2017.0, 0.44),
-        fdi_anual_tipo(2018.0, 2.11), fdi_anual_tipo(2019.0, 1.77), fdi_anual_tipo(2020.0, -0.89),
-        fdi_anual_tipo(2021.0, 1.14), fdi_anual_tipo(2022.0, 2.98)
-        )
-    );
-COMMIT;
-
--- Polonia
-INSERT INTO fdi_pais_objeto VALUES (
-        'Polonia',
-        'POL',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, 5.4), fdi_anual_tipo(2001.0, 2.96), fdi_anual_tipo(2002.0, 2.05),
-        fdi_anual_tipo(2003.0, 2.46), fdi_anual_tipo(2004.0, 5.41), fdi_anual_tipo(2005.0, 3.6),
-        fdi_anual_tipo(2006.0, 6.21), fdi_anual_tipo(2007.0, 5.83), fdi_anual_tipo(2008.0, 2.72),
-        fdi_anual_tipo(2009.0, 3.18), fdi_anual_tipo(2010.0, 3.94), fdi_anual_tipo(2011.0, 3.57),
-        fdi_anual_tipo(2012.0, 1.53), fdi_anual_tipo(2013.0, 0.26), fdi_anual_tipo(2014.0, 3.85),
-        fdi_anual_tipo(2015.0, 3.3), fdi_anual_tipo(2016.0, 3.82), fdi_anual_tipo(2017.0, 2.38),
-        fdi_anual_tipo(2018.0, 3.35), fdi_anual_tipo(2019.0, 3.15), fdi_anual_tipo(2020.0, 3.31),
-        fdi_anual_tipo(2021.0, 5.44), fdi_anual_tipo(2022.0, 6.01)
-        )
-    );
-COMMIT;
-
--- Países Bajos
-INSERT INTO fdi_pais_objeto VALUES (
-        'Países Bajos',
-        'NLD',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, 15.11), fdi_anual_tipo(2001.0, 12.02), fdi_anual_tipo(2002.0, 5.36),
-        fdi_anual_tipo(2003.0, 3.51), fdi_anual_tipo(2004.0, 21.16), fdi_anual_tipo(2005.0, 30.5),
-        fdi_anual_tipo(2006.0, 50.91), fdi_anual_tipo(2007.0, 85.98), fdi_anual_tipo(2008.0, 20.41),
-        fdi_anual_tipo(2009.0, 23.12), fdi_anual_tipo(2010.0, 6.25), fdi_anual_tipo(2011.0, 38.81),
-        fdi_anual_tipo(2012.0, 30.7), fdi_anual_tipo(2013.0, 35.13), fdi_anual_tipo(2014.0, 15.87),
-        fdi_anual_tipo(2015.0, 48.5), fdi_anual_tipo(2016.0, 34.57), fdi_anual_tipo(2017.0, 23.52),
-        fdi_anual_tipo(2018.0, -30.78), fdi_anual_tipo(2019.0, -13.67), fdi_anual_tipo(2020.0, -23.71),
-        fdi_anual_tipo(2021.0, -10.95), fdi_anual_tipo(2022.0, 1.49)
-        )
-    );
-COMMIT;
-
--- Bélgica
-INSERT INTO fdi_pais_objeto VALUES (
-        'Bélgica',
-        'BEL',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, 37.48), fdi_anual_tipo(2001.0, 37.26), fdi_anual_tipo(2002.0, 7.01),
-        fdi_anual_tipo(2003.0, 10.86), fdi_anual_tipo(2004.0, 12.05), fdi_anual_tipo(2005.0, 8.73),
-        fdi_anual_tipo(2006.0, 14.41), fdi_anual_tipo(2007.0, 20.5), fdi_anual_tipo(2008.0, 36.8),
-        fdi_anual_tipo(2009.0, 15.95), fdi_anual_tipo(2010.0, 26.06), fdi_anual_tipo(2011.0, 31.04),
-        fdi_anual_tipo(2012.0, 2.37), fdi_anual_tipo(2013.0, -5.66), fdi_anual_tipo(2014.0, -2.83), 
-        fdi_anual_tipo(2015.0, -4.23), fdi_anual_tipo(2016.0, 12.13), fdi_anual_tipo(2017.0, -7.44),
-        fdi_anual_tipo(2018.0, -7.67), fdi_anual_tipo(2019.0, -1.97), fdi_anual_tipo(2020.0, -5.74),
-        fdi_anual_tipo(2021.0, 5.91), fdi_anual_tipo(2022.0, 2.0)
-        )
-    );
-COMMIT;
+  Los registros de fdi_pais_objeto no se insertan desde este fichero.
+  El panel limpio del Banco Mundial se carga (o se actualiza por
+  codigo_pais) con un único MERGE por lotes que enlaza cada serie como
+  objeto fdi_lista_tipo:
 
--- Pórtugal
- INSERT INTO fdi_pais_objeto VALUES (
-        'Portugal',
-        'PRT',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, 6.15), fdi_anual_tipo(2001.0, 5.03), fdi_anual_tipo(2002.0, 0.44),
-        fdi_anual_tipo(2003.0, 6.27), fdi_anual_tipo(2004.0, 1.31), fdi_anual_tipo(2005.0, 1.71),
-        fdi_anual_tipo(2006.0, 6.42), fdi_anual_tipo(2007.0, 2.5), fdi_anual_tipo(2008.0, 2.97),
-        fdi_anual_tipo(2009.0, 2.35), fdi_anual_tipo(2010.0, 3.77), fdi_anual_tipo(2011.0, 4.24),
-        fdi_anual_tipo(2012.0, 7.22), fdi_anual_tipo(2013.0, 6.44), fdi_anual_tipo(2014.0, 5.44),
-        fdi_anual_tipo(2015.0, 0.64), fdi_anual_tipo(2016.0, 3.56), fdi_anual_tipo(2017.0, 5.02),
-        fdi_anual_tipo(2018.0, 3.47), fdi_anual_tipo(2019.0, 4.5), fdi_anual_tipo(2020.0, 1.81),
-        fdi_anual_tipo(2021.0, 3.61), fdi_anual_tipo(2022.0, 4.99)
-        )
-    );
-COMMIT;
+      python scripts/carga_panel_fdi.py usuario/contraseña@host:puerto/SID
 
--- Grecia
-INSERT INTO fdi_pais_objeto VALUES (
-        'Grecia',
-        'GRC',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, -0.01), fdi_anual_tipo(2001.0, 0.0), fdi_anual_tipo(2002.0, 0.02),
-        fdi_anual_tipo(2003.0, 0.72), fdi_anual_tipo(2004.0, 0.91), fdi_anual_tipo(2005.0, 0.28),
-        fdi_anual_tipo(2006.0, 2.01), fdi_anual_tipo(2007.0, 0.62), fdi_anual_tipo(2008.0, 1.63),
-        fdi_anual_tipo(2009.0, 0.85), fdi_anual_tipo(2010.0, 0.18), fdi_anual_tipo(2011.0, 0.39),
-        fdi_anual_tipo(2012.0, 0.7), fdi_anual_tipo(2013.0, 1.25), fdi_anual_tipo(2014.0, 1.15),
-        fdi_anual_tipo(2015.0, 0.65), fdi_anual_tipo(2016.0, 1.4), fdi_anual_tipo(2017.0, 1.72),
-        fdi_anual_tipo(2018.0, 1.89), fdi_anual_tipo(2019.0, 2.41), fdi_anual_tipo(2020.0, 1.73),
-        fdi_anual_tipo(2021.0, 2.81), fdi_anual_tipo(2022.0, 3.63)
-        )
-    );
-COMMIT;
-
--- China
-INSERT INTO fdi_pais_objeto VALUES (
-        'China',
-        'CHN',
-        fdi_lista_tipo(
-            fdi_anual_tipo(2000.0, 3.48), fdi_anual_tipo(2001.0, 3.51), fdi_anual_tipo(2002.0, 3.61),
-        fdi_anual_tipo(2003.0, 3.49), fdi_anual_tipo(2004.0, 3.48), fdi_anual_tipo(2005.0, 4.55),
-        fdi_anual_tipo(2006.0, 4.51), fdi_anual_tipo(2007.0, 4.4), fdi_anual_tipo(2008.0, 3.73),
-        fdi_anual_tipo(2009.0, 2.57), fdi_anual_tipo(2010.0, 4.0), fdi_anual_tipo(2011.0, 3.71),
-        fdi_anual_tipo(2012.0, 2.83), fdi_anual_tipo(2013.0, 3.04), fdi_anual_tipo(2014.0, 2.56),
-        fdi_anual_tipo(2015.0, 2.19), fdi_anual_tipo(2016.0, 1.56), fdi_anual_tipo(2017.0, 1.35),
-        fdi_anual_tipo(2018.0, 1.69), fdi_anual_tipo(2019.0, 1.31), fdi_anual_tipo(2015.0, 2.19),
-        fdi_anual_tipo(2016.0, 1.56), fdi_anual_tipo(2017.0, 1.35), fdi_anual_tipo(2018.0, 1.69),
-        fdi_anual_tipo(2015.0, 2.19), fdi_anual_tipo(2016.0, 1.56), fdi_anual_tipo(2017.0, 1.35),
-        fdi_anual_tipo(2015.0, 2.19), fdi_anual_tipo(2016.0, 1.56), fdi_anual_tipo(2015.0, 2.19), 
-        fdi_anual_tipo(2015.0, 2.19), fdi_anual_tipo(2015.0, 2.19), fdi_anual_tipo(2016.0, 1.56),
-        fdi_anual_tipo(2017.0, 1.35), fdi_anual_tipo(2018.0, 1.69),  fdi_anual_tipo(2019.0, 1.31),
-        fdi_anual_tipo(2020.0, 1.72), fdi_anual_tipo(2021.0, 1.93), fdi_anual_tipo(2022.0, 1.06)
-        )
-    );
-COMMIT;
+  Con --paises ESP IRL ... se limita a los países indicados.
+*/
 
 -- Consulta de análisis para identificar los 5 países con mayor promedio de FDI.
 -- Utilizada para alimentar visualizaciones comparativas en Python/Power BI.
@@ -302,6 +79,71 @@ ORDER BY
 FETCH FIRST 5 ROWS ONLY;
 
 
+/*
+Registro de cargas masivas. Cada carga (de simulaciones o de Z-Scores)
+etiqueta sus filas con su id_carga, y al terminar se generan sus alertas
+con un único INSERT ... SELECT (scripts/generacion_alertas.py) en lugar de
+un trigger por fila.
+*/
+
+CREATE TABLE cargas (
+    id_carga NUMBER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    tabla VARCHAR2(30),
+    fecha_carga DATE DEFAULT SYSDATE
+);
+
+/*
+Umbrales de las alertas:
+  - 'zscore': alerta si z_score < minimo. La fila con sector NULL es el
+    umbral general; las filas con sector lo sustituyen para ese sector.
+  - 'fdi': alerta si el valor simulado queda fuera de [minimo, maximo].
+*/
+
+CREATE TABLE umbrales_alerta (
+    tipo VARCHAR2(10),
+    sector VARCHAR2(30),
+    minimo FLOAT,
+    maximo FLOAT
+);
+
+INSERT INTO umbrales_alerta (tipo, sector, minimo, maximo) VALUES ('zscore', NULL, 1.8, NULL);
+INSERT INTO umbrales_alerta (tipo, sector, minimo, maximo) VALUES ('fdi', NULL, 0, 10);
+COMMIT;
+
+/*
+Control de los triggers de alertas por sesión. Una carga masiva los
+desactiva solo en su propia sesión (pkg_control_alertas.fijar) y genera
+después sus alertas por conjuntos; las demás sesiones, incluidas otras
+cargas simultáneas, no se ven afectadas. A diferencia de ALTER TRIGGER no
+es DDL, así que tampoco confirma la transacción en curso.
+*/
+
+CREATE OR REPLACE PACKAGE pkg_control_alertas AS
+    PROCEDURE fijar(p_trigger VARCHAR2, p_activo NUMBER);
+    FUNCTION activo(p_trigger VARCHAR2) RETURN BOOLEAN;
+END pkg_control_alertas;
+/
+
+CREATE OR REPLACE PACKAGE BODY pkg_control_alertas AS
+    TYPE t_inactivos IS TABLE OF BOOLEAN INDEX BY VARCHAR2(30);
+    g_inactivos t_inactivos;
+
+    PROCEDURE fijar(p_trigger VARCHAR2, p_activo NUMBER) IS
+    BEGIN
+        IF p_activo = 1 THEN
+            g_inactivos.DELETE(UPPER(p_trigger));
+        ELSE
+            g_inactivos(UPPER(p_trigger)) := TRUE;
+        END IF;
+    END fijar;
+
+    FUNCTION activo(p_trigger VARCHAR2) RETURN BOOLEAN IS
+    BEGIN
+        RETURN NOT g_inactivos.EXISTS(UPPER(p_trigger));
+    END activo;
+END pkg_control_alertas;
+/
+
 -- Tabla que almacena los resultados generados por la simulación Monte Carlo
 -- Cada fila representa un valor FDI simulado para un país, año y escenario.
 
@@ -311,9 +153,12 @@ CREATE TABLE simulaciones_montecarlo (
     año NUMBER,
     valor_simulado FLOAT,
     escenario_id NUMBER,
-    fecha_generacion DATE DEFAULT SYSDATE
+    fecha_generacion DATE DEFAULT SYSDATE,
+    id_carga NUMBER
 );
 
+CREATE INDEX idx_simulaciones_carga ON simulaciones_montecarlo (id_carga);
+
 /*Tabla que registra alertas de riesgo detectadas automáticamente.
 Se utiliza para almacenar casos donde el valor simulado está fuera de un rango 
 lógico (por ejemplo, FDI negativo).*/
@@ -323,25 +168,76 @@ CREATE TABLE alertas_simulacion (
     pais VARCHAR2(10),
     año NUMBER,
     valor_detectado FLOAT,
-    fecha_alerta DATE DEFAULT SYSDATE
+    fecha_alerta DATE DEFAULT SYSDATE,
+    id_carga NUMBER
 );
 
 
 /*Trigger que se activa tras cada inserción en la tabla de simulaciones.
-Si el valor simulado es menor a 0 o mayor a 10, se genera automáticamente 
-una alerta en la tabla `alertas_simulacion*/
+Si el valor simulado queda fuera del rango 'fdi' de `umbrales_alerta`
+(0 a 10 por defecto), se genera automáticamente una alerta en la tabla
+`alertas_simulacion`*/
+
+/*Las cargas masivas lo desactivan en su sesión (pkg_control_alertas)
+mientras insertan y generan después las alertas por conjuntos con los
+mismos umbrales; queda activo para inserciones sueltas.
+
+Es un trigger compuesto: el umbral se lee una vez por sentencia (no por
+fila) y las alertas se acumulan y se insertan con FORALL en bloques de
+1000. La alerta lleva el id_carga de la fila que la origina.*/
 
 CREATE OR REPLACE TRIGGER trg_alerta_montecarlo
-AFTER INSERT ON simulaciones_montecarlo
-FOR EACH ROW
-WHEN (NEW.valor_simulado < 0 OR NEW.valor_simulado > 10)
-BEGIN
-    INSERT INTO alertas_simulacion (
-        pais, año, valor_detectado, fecha_alerta
-    ) VALUES (
-        :NEW.pais, :NEW.año, :NEW.valor_simulado, SYSDATE
-    );
-END;
+FOR INSERT ON simulaciones_montecarlo
+COMPOUND TRIGGER
+    TYPE t_alertas IS TABLE OF alertas_simulacion%ROWTYPE INDEX BY PLS_INTEGER;
+    g_alertas t_alertas;
+    g_activo BOOLEAN;
+    g_minimo umbrales_alerta.minimo%TYPE;
+    g_maximo umbrales_alerta.maximo%TYPE;
+
+    PROCEDURE volcar IS
+    BEGIN
+        FORALL i IN 1 .. g_alertas.COUNT
+            INSERT INTO alertas_simulacion (
+                pais, año, valor_detectado, fecha_alerta, id_carga
+            ) VALUES (
+                g_alertas(i).pais, g_alertas(i).año, g_alertas(i).valor_detectado,
+                g_alertas(i).fecha_alerta, g_alertas(i).id_carga
+            );
+        g_alertas.DELETE;
+    END volcar;
+
+    BEFORE STATEMENT IS
+    BEGIN
+        g_activo := pkg_control_alertas.activo('TRG_ALERTA_MONTECARLO');
+        IF g_activo THEN
+            SELECT MAX(minimo), MAX(maximo) INTO g_minimo, g_maximo
+            FROM umbrales_alerta
+            WHERE tipo = 'fdi' AND sector IS NULL;
+        END IF;
+    END BEFORE STATEMENT;
+
+    AFTER EACH ROW IS
+        v_i PLS_INTEGER;
+    BEGIN
+        IF g_activo AND (:NEW.valor_simulado < g_minimo OR :NEW.valor_simulado > g_maximo) THEN
+            v_i := g_alertas.COUNT + 1;
+            g_alertas(v_i).pais := :NEW.pais;
+            g_alertas(v_i).año := :NEW.año;
+            g_alertas(v_i).valor_detectado := :NEW.valor_simulado;
+            g_alertas(v_i).fecha_alerta := SYSDATE;
+            g_alertas(v_i).id_carga := :NEW.id_carga;
+            IF v_i >= 1000 THEN
+                volcar;
+            END IF;
+        END IF;
+    END AFTER EACH ROW;
+
+    AFTER STATEMENT IS
+    BEGIN
+        volcar;
+    END AFTER STATEMENT;
+END trg_alerta_montecarlo;
 /
 
 -- Consults de prueba sobre tablas. 
@@ -415,8 +311,11 @@ CREATE TABLE zscore_empresas (
     escenario_id NUMBER,
     ingreso_simulado FLOAT,
     z_score FLOAT,
-    fecha_generacion DATE DEFAULT SYSDATE
+    fecha_generacion DATE DEFAULT SYSDATE,
+    id_carga NUMBER
 );
+
+CREATE INDEX idx_zscore_carga ON zscore_empresas (id_carga);
 COMMIT;
 
 
@@ -433,38 +332,153 @@ CREATE TABLE alertas_empresas (
     escenario_id NUMBER,
     z_score FLOAT,
     mensaje VARCHAR2(200),
-    fecha_alerta DATE DEFAULT SYSDATE
+    fecha_alerta DATE DEFAULT SYSDATE,
+    id_carga NUMBER
 );
 
+/*
+Índices para la paginación por cursor de la API (/alertas-quiebra):
+el orden (fecha_alerta, id_alerta) descendente se resuelve recorriendo
+el índice en lugar de ordenar toda la tabla.
+*/
+
+CREATE INDEX idx_alertas_empresas_fecha
+    ON alertas_empresas (fecha_alerta DESC, id_alerta DESC);
+
+CREATE INDEX idx_alertas_empresas_empresa
+    ON alertas_empresas (id_empresa, fecha_alerta DESC, id_alerta DESC);
+
 
 /*
-Trigger que detecta automáticamente valores críticos de Z-Score (< 1.8)
-e inserta una alerta en la tabla `alertas_empresas`, indicando posible 
-riesgo de quiebra.
+Trigger que detecta automáticamente valores críticos de Z-Score (por
+debajo del umbral de `umbrales_alerta` del sector de la empresa o, si no
+tiene, del general, 1.8 por defecto) e inserta una alerta en la tabla
+`alertas_empresas`, indicando posible riesgo de quiebra.
+
+Como trg_alerta_montecarlo, se desactiva en la sesión de las cargas
+masivas de Z-Scores, cuyas alertas se generan al final por id_carga, y es
+compuesto: el umbral de cada empresa (su sector o el general) se consulta
+la primera vez que aparece en la sentencia y se reutiliza en el resto de
+sus filas, en lugar de un SELECT con join por fila.
 */
 
 CREATE OR REPLACE TRIGGER trg_alerta_zscore
-AFTER INSERT ON zscore_empresas
-FOR EACH ROW
-WHEN (NEW.z_score < 1.8)
-BEGIN
-    INSERT INTO alertas_empresas (
-        id_empresa, año, escenario_id, z_score, mensaje
-    ) VALUES (
-        :NEW.id_empresa,
-        :NEW.año,
-        :NEW.escenario_id,
-        :NEW.z_score,
-        'Riesgo de quiebra detectado: Z-Score por debajo del umbral crítico'
-    );
-END;
+FOR INSERT ON zscore_empresas
+COMPOUND TRIGGER
+    TYPE t_alertas IS TABLE OF alertas_empresas%ROWTYPE INDEX BY PLS_INTEGER;
+    TYPE t_umbrales IS TABLE OF umbrales_alerta.minimo%TYPE INDEX BY PLS_INTEGER;
+    g_alertas t_alertas;
+    g_umbrales t_umbrales;
+    g_activo BOOLEAN;
+
+    PROCEDURE volcar IS
+    BEGIN
+        FORALL i IN 1 .. g_alertas.COUNT
+            INSERT INTO alertas_empresas (
+                id_empresa, año, escenario_id, z_score, mensaje, id_carga
+            ) VALUES (
+                g_alertas(i).id_empresa, g_alertas(i).año, g_alertas(i).escenario_id,
+                g_alertas(i).z_score, g_alertas(i).mensaje, g_alertas(i).id_carga
+            );
+        g_alertas.DELETE;
+    END volcar;
+
+    FUNCTION umbral(p_id_empresa NUMBER) RETURN NUMBER IS
+        v_umbral umbrales_alerta.minimo%TYPE;
+    BEGIN
+        IF NOT g_umbrales.EXISTS(p_id_empresa) THEN
+            SELECT MAX(COALESCE(s.minimo, g.minimo)) INTO v_umbral
+            FROM umbrales_alerta g
+            LEFT JOIN empresas_ficticias e ON e.id_empresa = p_id_empresa
+            LEFT JOIN umbrales_alerta s ON s.tipo = 'zscore' AND s.sector = e.sector
+            WHERE g.tipo = 'zscore' AND g.sector IS NULL;
+            g_umbrales(p_id_empresa) := v_umbral;
+        END IF;
+        RETURN g_umbrales(p_id_empresa);
+    END umbral;
+
+    BEFORE STATEMENT IS
+    BEGIN
+        g_activo := pkg_control_alertas.activo('TRG_ALERTA_ZSCORE');
+        g_umbrales.DELETE;
+    END BEFORE STATEMENT;
+
+    AFTER EACH ROW IS
+        v_i PLS_INTEGER;
+    BEGIN
+        IF g_activo AND :NEW.z_score < umbral(:NEW.id_empresa) THEN
+            v_i := g_alertas.COUNT + 1;
+            g_alertas(v_i).id_empresa := :NEW.id_empresa;
+            g_alertas(v_i).año := :NEW.año;
+            g_alertas(v_i).escenario_id := :NEW.escenario_id;
+            g_alertas(v_i).z_score := :NEW.z_score;
+            g_alertas(v_i).mensaje :=
+                'Riesgo de quiebra detectado: Z-Score por debajo del umbral crítico';
+            g_alertas(v_i).id_carga := :NEW.id_carga;
+            IF v_i >= 1000 THEN
+                volcar;
+            END IF;
+        END IF;
+    END AFTER EACH ROW;
+
+    AFTER STATEMENT IS
+    BEGIN
+        volcar;
+    END AFTER STATEMENT;
+END trg_alerta_zscore;
 /
 commit;
 
+
+/*
+Resumen por escenarios: media y percentiles (p5/p50/p95) del ingreso y del
+Z-Score, y proporción de escenarios con Z-Score bajo el umbral de alerta
+de la empresa (umbrales_alerta), por (empresa, año)
+y por (país, año). Se recalcula tras cada carga de Z-Scores
+(scripts/resumen_escenarios.py) y es la tabla que consultan Power BI y
+el endpoint /resumen-escenarios, en lugar de agregar zscore_empresas.
+id_empresa es NULL en las filas de nivel 'pais'.
+*/
+
+CREATE TABLE resumen_escenarios (
+    nivel VARCHAR2(10),
+    id_empresa NUMBER,
+    pais VARCHAR2(5),
+    año NUMBER,
+    escenarios NUMBER,
+    ingreso_medio FLOAT,
+    ingreso_p5 FLOAT,
+    ingreso_p50 FLOAT,
+    ingreso_p95 FLOAT,
+    z_medio FLOAT,
+    z_p5 FLOAT,
+    z_p50 FLOAT,
+    z_p95 FLOAT,
+    proporcion_riesgo FLOAT,
+    fecha_generacion DATE DEFAULT SYSDATE
+);
+
+CREATE INDEX idx_resumen_escenarios
+    ON resumen_escenarios (nivel, pais, id_empresa, año);
+commit;
+
+/*
+Para una base ya creada, las columnas y tablas de las cargas se añaden con:
+
+    ALTER TABLE simulaciones_montecarlo ADD (id_carga NUMBER);
+    ALTER TABLE alertas_simulacion ADD (id_carga NUMBER);
+    ALTER TABLE zscore_empresas ADD (id_carga NUMBER);
+    ALTER TABLE alertas_empresas ADD (id_carga NUMBER);
+
+más los CREATE TABLE cargas / umbrales_alerta, el paquete pkg_control_alertas,
+los índices y los triggers de arriba.
+*/
+
 -- Consultas de prueba sobre tablas.
 
 SELECT * FROM zscore_empresas;
 SELECT * FROM alertas_empresas;
+SELECT * FROM resumen_escenarios;
 
 
 SELECT
@@ -0,0 +1,1043 @@
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from itertools import islice
+
+try:
+    import cx_Oracle
+except ImportError:  # Sin cliente Oracle solo está disponible el backend SQLite.
+    cx_Oracle = None
+
+try:
+    from carga_oracle import cargar_por_lotes
+    from instrumentacion import instrumentar, medir
+except ImportError:  # Importado como scripts.almacenamiento (p. ej. desde la API).
+    from scripts.carga_oracle import cargar_por_lotes
+    from scripts.instrumentacion import instrumentar, medir
+
+"""
+Capa de almacenamiento del proyecto.
+
+Define una interfaz común sobre las tablas de oracle/create_fdi_structure.sql
+(panel FDI, simulaciones, empresas, Z-Scores, alertas y resumen por
+escenarios) con dos
+implementaciones:
+    - AlmacenamientoOracle: la base de datos real (cx_Oracle).
+    - AlmacenamientoSQLite: base embebida que reproduce el esquema y los
+      triggers de alertas, para perfilar y hacer pruebas de carga sin Oracle.
+
+Los scripts eligen el backend por la cadena de conexión: las que empiezan
+por 'sqlite:///' abren un fichero SQLite y el resto se pasan a cx_Oracle.
+"""
+
+
+PREFIJO_SQLITE = "sqlite:///"
+
+
+class ErrorAlmacenamiento(Exception):
+    """Error propio de la capa de almacenamiento (p. ej. pool no disponible)."""
+
+
+ERRORES_BD = (ErrorAlmacenamiento, sqlite3.Error) + ((cx_Oracle.Error,) if cx_Oracle else ())
+
+
+# Número de filas de cada llamada, para los spans de instrumentacion.py.
+
+def _num_filas(args, resultado):
+    return len(args[1])
+
+
+def _num_paises(args, resultado):
+    return len(args[1]) if hasattr(args[1], "__len__") else 0
+
+
+def _filas_insertadas(args, resultado):
+    return resultado["insertadas"]
+
+
+def _filas_resultado(args, resultado):
+    return len(resultado)
+
+
+def _filas_afectadas(args, resultado):
+    return resultado
+
+
+def _con_carga(filas, id_carga):
+    """Añade id_carga al final de cada fila."""
+    return (tuple(fila) + (id_carga,) for fila in filas)
+
+
+# =====================================
+# Interfaz común
+# =====================================
+
+class Almacenamiento:
+    """
+    Interfaz de acceso a las tablas del modelo. Cada instancia envuelve
+    una conexión DB-API abierta; se cierra con cerrar() o usando `with`.
+    """
+
+    # Cláusula que limita el número de filas en las consultas paginadas.
+    SQL_LIMITE = ""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def confirmar(self):
+        self.conexion.commit()
+
+    def revertir(self):
+        self.conexion.rollback()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    # ---- Panel FDI (fdi_pais_objeto) ----
+
+    def guardar_panel_fdi(self, paises):
+        """paises: iterable de (nombre_pais, codigo_pais, [(anio, fdi), ...])."""
+        raise NotImplementedError
+
+    def actualizar_panel_fdi(self, paises):
+        """
+        Inserta o sustituye (por codigo_pais) la serie completa de cada país.
+
+        Returns:
+            dict: {"cargados": int, "rechazados": [(codigo_pais, mensaje), ...]}
+        """
+        raise NotImplementedError
+
+    def leer_panel_fdi(self):
+        """Devuelve filas (nombre_pais, codigo_pais, anio, fdi_porcentaje)."""
+        raise NotImplementedError
+
+    # ---- Simulaciones por país (simulaciones_montecarlo) ----
+
+    def insertar_simulaciones_pais(self, filas, tam_lote=10_000, commit_cada=10, desde=0,
+                                   id_carga=None):
+        """
+        filas: (pais, año, valor_simulado, escenario_id). Todas se etiquetan
+        con `id_carga` (ver nueva_carga). Devuelve un resumen.
+        """
+        raise NotImplementedError
+
+    # ---- Empresas (empresas_ficticias / simulaciones_empresas) ----
+
+    def insertar_empresas(self, filas):
+        """filas: (nombre, pais, sector, ingresos_base, sensibilidad_fdi)."""
+        raise NotImplementedError
+
+    @instrumentar("bd.obtener_empresas", filas=_filas_resultado)
+    def obtener_empresas(self):
+        """Devuelve filas (id_empresa, nombre, pais, ingresos_base, sensibilidad_fdi)."""
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute("""
+                SELECT id_empresa, nombre, pais, ingresos_base, sensibilidad_fdi
+                FROM empresas_ficticias
+                ORDER BY id_empresa
+            """)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @instrumentar("bd.obtener_sensibilidades", filas=_filas_resultado)
+    def obtener_sensibilidades(self):
+        """Devuelve filas (id_empresa, sensibilidad_fdi)."""
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute("SELECT id_empresa, sensibilidad_fdi FROM empresas_ficticias")
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def insertar_simulaciones_empresas(self, filas):
+        """filas: (id_empresa, pais, año, escenario_id, ingreso_simulado)."""
+        raise NotImplementedError
+
+    def leer_simulaciones_empresas(self, tam_lote=50_000):
+        """Recorre 'simulaciones_empresas' devolviendo listas de hasta tam_lote filas."""
+        cursor = self.conexion.cursor()
+        self._preparar_lectura(cursor, tam_lote)
+        try:
+            cursor.execute("""
+                SELECT id_empresa, pais, año, escenario_id, ingreso_simulado
+                FROM simulaciones_empresas
+            """)
+            yield from self._recorrer(cursor, tam_lote)
+        finally:
+            cursor.close()
+
+    def leer_simulaciones_pais(self, tam_lote=50_000):
+        """Recorre 'simulaciones_montecarlo' como (pais, escenario_id, año, valor_simulado)."""
+        cursor = self.conexion.cursor()
+        self._preparar_lectura(cursor, tam_lote)
+        try:
+            cursor.execute("""
+                SELECT pais, escenario_id, año, valor_simulado
+                FROM simulaciones_montecarlo
+            """)
+            yield from self._recorrer(cursor, tam_lote)
+        finally:
+            cursor.close()
+
+    # ---- Z-Scores y alertas ----
+
+    def insertar_zscores(self, filas, id_carga=None):
+        """
+        filas: (id_empresa, pais, año, escenario_id, ingreso_simulado, z_score),
+        etiquetadas con `id_carga`.
+        """
+        raise NotImplementedError
+
+    def leer_zscores_empresas(self, tam_lote=50_000):
+        """Recorre 'zscore_empresas' devolviendo listas de hasta tam_lote filas."""
+        cursor = self.conexion.cursor()
+        self._preparar_lectura(cursor, tam_lote)
+        try:
+            cursor.execute("""
+                SELECT id_empresa, pais, año, escenario_id, ingreso_simulado, z_score
+                FROM zscore_empresas
+            """)
+            yield from self._recorrer(cursor, tam_lote)
+        finally:
+            cursor.close()
+
+    def version_alertas(self):
+        """Identificador que cambia cuando se generan alertas nuevas."""
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute("SELECT MAX(id_alerta) FROM alertas_empresas")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    COLUMNAS_ALERTAS = ("id_alerta", "id_empresa", "año", "escenario_id", "z_score",
+                        "mensaje", "fecha_alerta")
+
+    def _filtros_alertas(self, id_empresa=None, anio=None, escenario_id=None):
+        """Condiciones WHERE y variables bind de los filtros de alertas."""
+        condiciones = []
+        binds = {}
+
+        if id_empresa is not None:
+            condiciones.append("id_empresa = :id_empresa")
+            binds["id_empresa"] = id_empresa
+        if anio is not None:
+            condiciones.append("año = :anio")
+            binds["anio"] = anio
+        if escenario_id is not None:
+            condiciones.append("escenario_id = :escenario_id")
+            binds["escenario_id"] = escenario_id
+
+        return condiciones, binds
+
+    @instrumentar("bd.obtener_alertas", filas=_filas_resultado)
+    def obtener_alertas(self, limite, id_empresa=None, anio=None, escenario_id=None,
+                        despues_de=None):
+        """
+        Devuelve una página de 'alertas_empresas' ordenada por
+        (fecha_alerta, id_alerta) descendente como lista de diccionarios.
+
+        Solo se concatenan fragmentos fijos de SQL; todos los valores van como
+        variables bind, así la base de datos reutiliza el plan entre llamadas.
+        """
+        condiciones, binds = self._filtros_alertas(id_empresa, anio, escenario_id)
+        binds["limite"] = limite
+
+        if despues_de is not None:
+            condiciones.append(
+                "(fecha_alerta < :fecha OR (fecha_alerta = :fecha AND id_alerta < :id_alerta))"
+            )
+            binds["fecha"], binds["id_alerta"] = despues_de
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        query = f"""
+            SELECT {', '.join(self.COLUMNAS_ALERTAS)}
+            FROM alertas_empresas
+            {where}
+            ORDER BY fecha_alerta DESC, id_alerta DESC
+            {self.SQL_LIMITE}
+        """
+
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute(query, binds)
+            columnas = [col[0].lower() for col in cursor.description]
+            return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def leer_alertas(self, tam_lote=5_000, id_empresa=None, anio=None, escenario_id=None):
+        """
+        Recorre 'alertas_empresas' devolviendo listas de hasta tam_lote tuplas
+        en el orden de COLUMNAS_ALERTAS, para exportaciones completas.
+        """
+        condiciones, binds = self._filtros_alertas(id_empresa, anio, escenario_id)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        cursor = self.conexion.cursor()
+        self._preparar_lectura(cursor, tam_lote)
+        try:
+            cursor.execute(f"""
+                SELECT {', '.join(self.COLUMNAS_ALERTAS)}
+                FROM alertas_empresas
+                {where}
+                ORDER BY fecha_alerta DESC, id_alerta DESC
+            """, binds)
+            yield from self._recorrer(cursor, tam_lote)
+        finally:
+            cursor.close()
+
+    # ---- Cargas y generación de alertas por conjuntos ----
+
+    # Triggers de fila que generan alertas al insertar en cada tabla.
+    TRIGGERS_ALERTAS = {
+        "simulaciones_montecarlo": "trg_alerta_montecarlo",
+        "zscore_empresas": "trg_alerta_zscore",
+    }
+
+    MENSAJE_ALERTA_ZSCORE = "Riesgo de quiebra detectado: Z-Score por debajo del umbral crítico"
+
+    def nueva_carga(self, tabla):
+        """Registra una carga en 'cargas' y devuelve su id_carga."""
+        raise NotImplementedError
+
+    def activar_triggers_alertas(self, activos, tabla=None):
+        """
+        Activa o desactiva los triggers de fila de alertas (de `tabla` o de
+        todas) solo para esta sesión: las demás conexiones siguen generando
+        sus alertas por fila. No confirma la transacción en curso.
+        """
+        raise NotImplementedError
+
+    def _triggers_alertas(self, tabla=None):
+        return [self.TRIGGERS_ALERTAS[tabla]] if tabla else list(self.TRIGGERS_ALERTAS.values())
+
+    @instrumentar("bd.obtener_umbrales_zscore", filas=lambda args, res: len(res[1]))
+    def obtener_umbrales_zscore(self):
+        """
+        Umbral de Z-Score de cada empresa según 'umbrales_alerta': el de su
+        sector o, si no tiene, el general.
+
+        Returns:
+            tuple: (umbral general o None, {id_empresa: umbral})
+        """
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute("""
+                SELECT minimo FROM umbrales_alerta WHERE tipo = 'zscore' AND sector IS NULL
+            """)
+            fila = cursor.fetchone()
+            cursor.execute("""
+                SELECT e.id_empresa, COALESCE(s.minimo, g.minimo)
+                FROM empresas_ficticias e
+                JOIN umbrales_alerta g ON g.tipo = 'zscore' AND g.sector IS NULL
+                LEFT JOIN umbrales_alerta s ON s.tipo = 'zscore' AND s.sector = e.sector
+            """)
+            return (fila[0] if fila else None), dict(cursor.fetchall())
+        finally:
+            cursor.close()
+
+    def fijar_umbral_alerta(self, tipo, minimo=None, maximo=None, sector=None):
+        """
+        Fija el umbral de 'umbrales_alerta'. tipo 'zscore': alerta si
+        z_score < minimo (por sector, o general con sector None); tipo 'fdi':
+        alerta si el valor simulado queda fuera de [minimo, maximo].
+        """
+        binds = {"tipo": tipo, "sector": sector}
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute("""
+                DELETE FROM umbrales_alerta
+                WHERE tipo = :tipo
+                  AND (sector = :sector OR (sector IS NULL AND :sector IS NULL))
+            """, binds)
+            cursor.execute("""
+                INSERT INTO umbrales_alerta (tipo, sector, minimo, maximo)
+                VALUES (:tipo, :sector, :minimo, :maximo)
+            """, dict(binds, minimo=minimo, maximo=maximo))
+        finally:
+            cursor.close()
+
+    @instrumentar("bd.generar_alertas_zscore", filas=_filas_afectadas)
+    def generar_alertas_zscore(self, id_carga):
+        """
+        Inserta en una sola sentencia las alertas de los Z-Scores de una carga,
+        con el umbral del sector de cada empresa o, si no tiene, el general.
+
+        Returns:
+            int: Alertas generadas.
+        """
+        return self._ejecutar_conjunto("""
+            INSERT INTO alertas_empresas (id_empresa, año, escenario_id, z_score, mensaje, id_carga)
+            SELECT z.id_empresa, z.año, z.escenario_id, z.z_score, :mensaje, z.id_carga
+            FROM zscore_empresas z
+            JOIN umbrales_alerta g ON g.tipo = 'zscore' AND g.sector IS NULL
+            LEFT JOIN empresas_ficticias e ON e.id_empresa = z.id_empresa
+            LEFT JOIN umbrales_alerta s ON s.tipo = 'zscore' AND s.sector = e.sector
+            WHERE z.id_carga = :id_carga
+              AND z.z_score < COALESCE(s.minimo, g.minimo)
+        """, {"id_carga": id_carga, "mensaje": self.MENSAJE_ALERTA_ZSCORE})
+
+    @instrumentar("bd.generar_alertas_simulacion", filas=_filas_afectadas)
+    def generar_alertas_simulacion(self, id_carga):
+        """
+        Inserta en una sola sentencia las alertas de las simulaciones de FDI de
+        una carga que quedan fuera del rango [minimo, maximo].
+
+        Returns:
+            int: Alertas generadas.
+        """
+        return self._ejecutar_conjunto("""
+            INSERT INTO alertas_simulacion (pais, año, valor_detectado, id_carga)
+            SELECT m.pais, m.año, m.valor_simulado, m.id_carga
+            FROM simulaciones_montecarlo m
+            JOIN umbrales_alerta u ON u.tipo = 'fdi' AND u.sector IS NULL
+            WHERE m.id_carga = :id_carga
+              AND (m.valor_simulado < u.minimo OR m.valor_simulado > u.maximo)
+        """, {"id_carga": id_carga})
+
+    def _ejecutar_conjunto(self, sql, binds):
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute(sql, binds)
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    # ---- Resumen por escenarios ----
+
+    def reemplazar_resumen_escenarios(self, filas):
+        """
+        Sustituye el contenido de 'resumen_escenarios'.
+
+        filas: (nivel, id_empresa, pais, año, escenarios, ingreso_medio,
+        ingreso_p5, ingreso_p50, ingreso_p95, z_medio, z_p5, z_p50, z_p95,
+        proporcion_riesgo).
+        """
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute("DELETE FROM resumen_escenarios")
+        finally:
+            cursor.close()
+        self._insertar_resumen(filas)
+
+    def _insertar_resumen(self, filas):
+        raise NotImplementedError
+
+    @instrumentar("bd.obtener_resumen_escenarios", filas=_filas_resultado)
+    def obtener_resumen_escenarios(self, limite, nivel="empresa", id_empresa=None, pais=None,
+                                   anio=None):
+        """Filas de 'resumen_escenarios' filtradas, como lista de diccionarios."""
+        condiciones = ["nivel = :nivel"]
+        binds = {"limite": limite, "nivel": nivel}
+
+        if id_empresa is not None:
+            condiciones.append("id_empresa = :id_empresa")
+            binds["id_empresa"] = id_empresa
+        if pais is not None:
+            condiciones.append("pais = :pais")
+            binds["pais"] = pais
+        if anio is not None:
+            condiciones.append("año = :anio")
+            binds["anio"] = anio
+
+        query = f"""
+            SELECT nivel, id_empresa, pais, año, escenarios,
+                   ingreso_medio, ingreso_p5, ingreso_p50, ingreso_p95,
+                   z_medio, z_p5, z_p50, z_p95, proporcion_riesgo
+            FROM resumen_escenarios
+            WHERE {' AND '.join(condiciones)}
+            ORDER BY pais, id_empresa, año
+            {self.SQL_LIMITE}
+        """
+
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute(query, binds)
+            columnas = [col[0].lower() for col in cursor.description]
+            return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _recorrer(self, cursor, tam_lote):
+        """Devuelve los resultados del cursor en bloques, midiendo cada fetchmany."""
+        while True:
+            with medir("bd.fetchmany") as span:
+                filas = cursor.fetchmany(tam_lote)
+                span.filas = len(filas)
+            if not filas:
+                break
+            yield filas
+
+    def _preparar_lectura(self, cursor, tam_lote):
+        cursor.arraysize = tam_lote
+
+
+# =====================================
+# Implementación Oracle
+# =====================================
+
+class AlmacenamientoOracle(Almacenamiento):
+
+    SQL_LIMITE = "FETCH FIRST :limite ROWS ONLY"
+
+    def _filas_panel(self, paises):
+        """Convierte cada serie en un objeto FDI_LISTA_TIPO para enlazarlo como bind."""
+        tipo_lista = self.conexion.gettype("FDI_LISTA_TIPO")
+        tipo_anual = self.conexion.gettype("FDI_ANUAL_TIPO")
+
+        filas = []
+        for nombre, codigo, serie in paises:
+            lista = tipo_lista.newobject()
+            for anio, fdi in serie:
+                elemento = tipo_anual.newobject()
+                elemento.ANIO = anio
+                elemento.FDI_PORCENTAJE = fdi
+                lista.append(elemento)
+            filas.append((nombre, codigo, lista))
+        return filas, (100, 10, tipo_lista)
+
+    @instrumentar("bd.guardar_panel_fdi", filas=_num_paises)
+    def guardar_panel_fdi(self, paises):
+        filas, tipos = self._filas_panel(paises)
+        self._insertar("INSERT INTO fdi_pais_objeto VALUES (:1, :2, :3)", filas, tipos)
+
+    @instrumentar("bd.actualizar_panel_fdi", filas=_num_paises)
+    def actualizar_panel_fdi(self, paises):
+        # Un único executemany con las colecciones como binds: todos los
+        # países viajan en la misma llamada y los que fallan (p. ej. un valor
+        # fuera de NUMBER(5,2)) se devuelven sin abortar al resto.
+        filas, tipos = self._filas_panel(paises)
+        cursor = self.conexion.cursor()
+        try:
+            cursor.setinputsizes(*tipos)
+            cursor.executemany("""
+                MERGE INTO fdi_pais_objeto p
+                USING (SELECT :1 AS nombre_pais, :2 AS codigo_pais, :3 AS fdi_anual
+                       FROM dual) s
+                ON (p.codigo_pais = s.codigo_pais)
+                WHEN MATCHED THEN
+                    UPDATE SET p.nombre_pais = s.nombre_pais, p.fdi_anual = s.fdi_anual
+                WHEN NOT MATCHED THEN
+                    INSERT (nombre_pais, codigo_pais, fdi_anual)
+                    VALUES (s.nombre_pais, s.codigo_pais, s.fdi_anual)
+            """, filas, batcherrors=True)
+            rechazados = [(filas[error.offset][1], error.message)
+                          for error in cursor.getbatcherrors()]
+        finally:
+            cursor.close()
+
+        return {"cargados": len(filas) - len(rechazados), "rechazados": rechazados}
+
+    @instrumentar("bd.leer_panel_fdi", filas=_filas_resultado)
+    def leer_panel_fdi(self):
+        cursor = self.conexion.cursor()
+        cursor.arraysize = 5_000
+        try:
+            cursor.execute("""
+                SELECT p.nombre_pais, p.codigo_pais, f.anio, f.fdi_porcentaje
+                FROM fdi_pais_objeto p,
+                     TABLE(p.fdi_anual) f
+                ORDER BY p.codigo_pais, f.anio
+            """)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @instrumentar("bd.insertar_simulaciones_pais", filas=_filas_insertadas)
+    def insertar_simulaciones_pais(self, filas, tam_lote=10_000, commit_cada=10, desde=0,
+                                   id_carga=None):
+        insert_sql = """
+            INSERT INTO simulaciones_montecarlo
+            (pais, año, valor_simulado, escenario_id, id_carga)
+            VALUES (:1, :2, :3, :4, :5)
+        """
+        return cargar_por_lotes(self.conexion, insert_sql, _con_carga(filas, id_carga),
+                                tipos=(10, int, float, int, int), tam_lote=tam_lote,
+                                commit_cada=commit_cada, desde=desde)
+
+    @instrumentar("bd.insertar_empresas", filas=_num_filas)
+    def insertar_empresas(self, filas):
+        self._insertar("""
+            INSERT INTO empresas_ficticias (nombre, pais, sector, ingresos_base, sensibilidad_fdi)
+            VALUES (:1, :2, :3, :4, :5)
+        """, filas, (50, 5, 30, float, float))
+
+    @instrumentar("bd.insertar_simulaciones_empresas", filas=_num_filas)
+    def insertar_simulaciones_empresas(self, filas):
+        self._insertar("""
+            INSERT INTO simulaciones_empresas (id_empresa, pais, año, escenario_id, ingreso_simulado)
+            VALUES (:1, :2, :3, :4, :5)
+        """, filas, (int, 5, int, int, float))
+
+    @instrumentar("bd.insertar_zscores", filas=_num_filas)
+    def insertar_zscores(self, filas, id_carga=None):
+        self._insertar("""
+            INSERT INTO zscore_empresas (
+                id_empresa, pais, año, escenario_id, ingreso_simulado, z_score, id_carga
+            ) VALUES (:1, :2, :3, :4, :5, :6, :7)
+        """, list(_con_carga(filas, id_carga)), (int, 5, int, int, float, float, int))
+
+    def nueva_carga(self, tabla):
+        cursor = self.conexion.cursor()
+        try:
+            id_carga = cursor.var(int)
+            cursor.execute("INSERT INTO cargas (tabla) VALUES (:1) RETURNING id_carga INTO :2",
+                           [tabla, id_carga])
+            return id_carga.getvalue()[0]
+        finally:
+            cursor.close()
+
+    def activar_triggers_alertas(self, activos, tabla=None):
+        # Estado en una variable del paquete pkg_control_alertas, propia de
+        # cada sesión. A diferencia de ALTER TRIGGER no es DDL: no confirma
+        # la transacción ni afecta a otras cargas en curso.
+        cursor = self.conexion.cursor()
+        try:
+            for trigger in self._triggers_alertas(tabla):
+                cursor.callproc("pkg_control_alertas.fijar", [trigger, int(activos)])
+        finally:
+            cursor.close()
+
+    @instrumentar("bd.insertar_resumen", filas=_num_filas)
+    def _insertar_resumen(self, filas):
+        self._insertar("""
+            INSERT INTO resumen_escenarios (
+                nivel, id_empresa, pais, año, escenarios,
+                ingreso_medio, ingreso_p5, ingreso_p50, ingreso_p95,
+                z_medio, z_p5, z_p50, z_p95, proporcion_riesgo
+            ) VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14)
+        """, filas, (10, int, 5, int, int) + (float,) * 9)
+
+    def _insertar(self, insert_sql, filas, tipos):
+        cursor = self.conexion.cursor()
+        try:
+            cursor.setinputsizes(*tipos)
+            cursor.executemany(insert_sql, filas)
+        finally:
+            cursor.close()
+
+    def _preparar_lectura(self, cursor, tam_lote):
+        cursor.arraysize = tam_lote
+        cursor.prefetchrows = tam_lote + 1
+
+
+# =====================================
+# Implementación SQLite (embebida)
+# =====================================
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS fdi_pais_objeto (
+    nombre_pais TEXT,
+    codigo_pais TEXT PRIMARY KEY
+);
+
+-- Equivalente plano de la tabla anidada fdi_anual (fdi_lista_tipo).
+CREATE TABLE IF NOT EXISTS fdi_anual (
+    codigo_pais TEXT REFERENCES fdi_pais_objeto (codigo_pais),
+    anio INTEGER,
+    fdi_porcentaje REAL,
+    PRIMARY KEY (codigo_pais, anio)
+);
+
+-- Registro de cargas: cada carga masiva etiqueta sus filas con su id_carga
+-- para generar después sus alertas en una sola sentencia.
+CREATE TABLE IF NOT EXISTS cargas (
+    id_carga INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabla TEXT,
+    fecha_carga TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+-- Umbrales de alerta: 'zscore' (general con sector NULL o por sector) y 'fdi'.
+CREATE TABLE IF NOT EXISTS umbrales_alerta (
+    tipo TEXT,
+    sector TEXT,
+    minimo REAL,
+    maximo REAL
+);
+
+INSERT INTO umbrales_alerta (tipo, sector, minimo, maximo)
+SELECT 'zscore', NULL, 1.8, NULL
+WHERE NOT EXISTS (SELECT 1 FROM umbrales_alerta WHERE tipo = 'zscore' AND sector IS NULL);
+
+INSERT INTO umbrales_alerta (tipo, sector, minimo, maximo)
+SELECT 'fdi', NULL, 0, 10
+WHERE NOT EXISTS (SELECT 1 FROM umbrales_alerta WHERE tipo = 'fdi' AND sector IS NULL);
+
+CREATE TABLE IF NOT EXISTS simulaciones_montecarlo (
+    id_simulacion INTEGER PRIMARY KEY AUTOINCREMENT,
+    pais TEXT,
+    año INTEGER,
+    valor_simulado REAL,
+    escenario_id INTEGER,
+    fecha_generacion TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    id_carga INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_simulaciones_carga ON simulaciones_montecarlo (id_carga);
+
+CREATE TABLE IF NOT EXISTS alertas_simulacion (
+    id_alerta INTEGER PRIMARY KEY AUTOINCREMENT,
+    pais TEXT,
+    año INTEGER,
+    valor_detectado REAL,
+    fecha_alerta TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    id_carga INTEGER
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_alerta_montecarlo
+AFTER INSERT ON simulaciones_montecarlo
+FOR EACH ROW
+WHEN alerta_activa('trg_alerta_montecarlo')
+    AND EXISTS (SELECT 1 FROM umbrales_alerta
+                WHERE tipo = 'fdi' AND sector IS NULL
+                  AND (NEW.valor_simulado < minimo OR NEW.valor_simulado > maximo))
+BEGIN
+    INSERT INTO alertas_simulacion (pais, año, valor_detectado, id_carga)
+    VALUES (NEW.pais, NEW.año, NEW.valor_simulado, NEW.id_carga);
+END;
+
+CREATE TABLE IF NOT EXISTS empresas_ficticias (
+    id_empresa INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT,
+    pais TEXT,
+    sector TEXT,
+    ingresos_base REAL,
+    sensibilidad_fdi REAL
+);
+
+CREATE TABLE IF NOT EXISTS simulaciones_empresas (
+    id_simulacion_empresa INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_empresa INTEGER,
+    pais TEXT,
+    año INTEGER,
+    escenario_id INTEGER,
+    ingreso_simulado REAL,
+    fecha_generacion TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS zscore_empresas (
+    id_zscore INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_empresa INTEGER,
+    pais TEXT,
+    año INTEGER,
+    escenario_id INTEGER,
+    ingreso_simulado REAL,
+    z_score REAL,
+    fecha_generacion TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    id_carga INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_zscore_carga ON zscore_empresas (id_carga);
+
+CREATE TABLE IF NOT EXISTS alertas_empresas (
+    id_alerta INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_empresa INTEGER,
+    año INTEGER,
+    escenario_id INTEGER,
+    z_score REAL,
+    mensaje TEXT,
+    fecha_alerta TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    id_carga INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_alertas_empresas_fecha
+    ON alertas_empresas (fecha_alerta DESC, id_alerta DESC);
+
+CREATE INDEX IF NOT EXISTS idx_alertas_empresas_empresa
+    ON alertas_empresas (id_empresa, fecha_alerta DESC, id_alerta DESC);
+
+CREATE TRIGGER IF NOT EXISTS trg_alerta_zscore
+AFTER INSERT ON zscore_empresas
+FOR EACH ROW
+WHEN alerta_activa('trg_alerta_zscore')
+    AND NEW.z_score < (
+        SELECT COALESCE(s.minimo, g.minimo)
+        FROM umbrales_alerta g
+        LEFT JOIN empresas_ficticias e ON e.id_empresa = NEW.id_empresa
+        LEFT JOIN umbrales_alerta s ON s.tipo = 'zscore' AND s.sector = e.sector
+        WHERE g.tipo = 'zscore' AND g.sector IS NULL)
+BEGIN
+    INSERT INTO alertas_empresas (id_empresa, año, escenario_id, z_score, mensaje, id_carga)
+    VALUES (
+        NEW.id_empresa,
+        NEW.año,
+        NEW.escenario_id,
+        NEW.z_score,
+        'Riesgo de quiebra detectado: Z-Score por debajo del umbral crítico',
+        NEW.id_carga
+    );
+END;
+
+CREATE TABLE IF NOT EXISTS resumen_escenarios (
+    nivel TEXT,
+    id_empresa INTEGER,
+    pais TEXT,
+    año INTEGER,
+    escenarios INTEGER,
+    ingreso_medio REAL,
+    ingreso_p5 REAL,
+    ingreso_p50 REAL,
+    ingreso_p95 REAL,
+    z_medio REAL,
+    z_p5 REAL,
+    z_p50 REAL,
+    z_p95 REAL,
+    proporcion_riesgo REAL,
+    fecha_generacion TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_resumen_escenarios
+    ON resumen_escenarios (nivel, pais, id_empresa, año);
+"""
+
+
+def _adaptar_fecha(fecha):
+    # Mismo formato que el DEFAULT de las columnas, para que las
+    # comparaciones de la paginación por cursor sean coherentes.
+    return fecha.strftime("%Y-%m-%d %H:%M:%S.") + f"{fecha.microsecond // 1000:03d}"
+
+
+sqlite3.register_adapter(datetime, _adaptar_fecha)
+sqlite3.register_converter("TIMESTAMP", lambda valor: datetime.fromisoformat(valor.decode()))
+
+
+def _registrar_control_alertas(conexion):
+    """
+    Funciones alerta_activa(trigger) y fijar_alerta_activa(trigger, activo)
+    que consultan los triggers de alertas. El estado vive en la conexión,
+    como la variable de paquete de Oracle: desactivar los triggers durante
+    una carga no afecta a las demás conexiones.
+    """
+    inactivos = set()
+
+    def fijar(trigger, activo):
+        if activo:
+            inactivos.discard(trigger)
+        else:
+            inactivos.add(trigger)
+        return activo
+
+    conexion.create_function("alerta_activa", 1, lambda trigger: int(trigger not in inactivos))
+    conexion.create_function("fijar_alerta_activa", 2, fijar)
+
+
+def _migrar_sqlite(conexion):
+    """
+    Adapta bases creadas antes de id_carga y del control de triggers por
+    sesión, y recrea los triggers de alertas que no copian el id_carga.
+    """
+    for tabla in ("simulaciones_montecarlo", "alertas_simulacion", "zscore_empresas",
+                  "alertas_empresas"):
+        columnas = [fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")]
+        if columnas and "id_carga" not in columnas:
+            conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN id_carga INTEGER")
+
+    for nombre, sql in conexion.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall():
+        if (nombre in Almacenamiento.TRIGGERS_ALERTAS.values()
+                and ("alerta_activa" not in sql or "NEW.id_carga" not in sql)):
+            conexion.execute(f"DROP TRIGGER {nombre}")
+    conexion.execute("DROP TABLE IF EXISTS control_alertas")
+
+
+def conectar_sqlite(ruta, check_same_thread=True):
+    """Abre (y crea si hace falta) la base SQLite con el esquema del proyecto."""
+    conexion = sqlite3.connect(ruta, detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=check_same_thread)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    _registrar_control_alertas(conexion)
+    _migrar_sqlite(conexion)
+    conexion.executescript(ESQUEMA_SQLITE)
+    return conexion
+
+
+class AlmacenamientoSQLite(Almacenamiento):
+
+    SQL_LIMITE = "LIMIT :limite"
+
+    @instrumentar("bd.guardar_panel_fdi", filas=_num_paises)
+    def guardar_panel_fdi(self, paises):
+        paises = list(paises)
+        self.conexion.executemany("INSERT INTO fdi_pais_objeto VALUES (?, ?)",
+                                  [(nombre, codigo) for nombre, codigo, _ in paises])
+        self.conexion.executemany("INSERT INTO fdi_anual VALUES (?, ?, ?)",
+                                  [(codigo, anio, fdi) for _, codigo, serie in paises
+                                   for anio, fdi in serie])
+
+    @instrumentar("bd.actualizar_panel_fdi", filas=_num_paises)
+    def actualizar_panel_fdi(self, paises):
+        # Igual que el MERGE de Oracle: la serie nueva sustituye a la anterior.
+        paises = list(paises)
+        self.conexion.executemany("""
+            INSERT INTO fdi_pais_objeto VALUES (?, ?)
+            ON CONFLICT (codigo_pais) DO UPDATE SET nombre_pais = excluded.nombre_pais
+        """, [(nombre, codigo) for nombre, codigo, _ in paises])
+        self.conexion.executemany("DELETE FROM fdi_anual WHERE codigo_pais = ?",
+                                  [(codigo,) for _, codigo, _ in paises])
+        self.conexion.executemany("INSERT INTO fdi_anual VALUES (?, ?, ?)",
+                                  [(codigo, anio, fdi) for _, codigo, serie in paises
+                                   for anio, fdi in serie])
+        return {"cargados": len(paises), "rechazados": []}
+
+    @instrumentar("bd.leer_panel_fdi", filas=_filas_resultado)
+    def leer_panel_fdi(self):
+        cursor = self.conexion.cursor()
+        try:
+            cursor.execute("""
+                SELECT p.nombre_pais, p.codigo_pais, f.anio, f.fdi_porcentaje
+                FROM fdi_pais_objeto p
+                JOIN fdi_anual f ON f.codigo_pais = p.codigo_pais
+                ORDER BY p.codigo_pais, f.anio
+            """)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @instrumentar("bd.insertar_simulaciones_pais", filas=_filas_insertadas)
+    def insertar_simulaciones_pais(self, filas, tam_lote=10_000, commit_cada=10, desde=0,
+                                   id_carga=None):
+        # SQLite no tiene batcherrors: un lote con errores se aborta entero,
+        # así que la lista de rechazadas siempre vuelve vacía.
+        iterador = islice(_con_carga(filas, id_carga), desde, None)
+        filas_confirmadas = desde
+        lotes = 0
+
+        while True:
+            lote = list(islice(iterador, tam_lote))
+            if not lote:
+                break
+            self.conexion.executemany("""
+                INSERT INTO simulaciones_montecarlo (pais, año, valor_simulado, escenario_id,
+                                                     id_carga)
+                VALUES (?, ?, ?, ?, ?)
+            """, lote)
+            filas_confirmadas += len(lote)
+            lotes += 1
+            if lotes % commit_cada == 0:
+                self.conexion.commit()
+
+        self.conexion.commit()
+        return {
+            "insertadas": filas_confirmadas - desde,
+            "rechazadas": [],
+            "filas_confirmadas": filas_confirmadas,
+        }
+
+    @instrumentar("bd.insertar_empresas", filas=_num_filas)
+    def insertar_empresas(self, filas):
+        self.conexion.executemany("""
+            INSERT INTO empresas_ficticias (nombre, pais, sector, ingresos_base, sensibilidad_fdi)
+            VALUES (?, ?, ?, ?, ?)
+        """, filas)
+
+    @instrumentar("bd.insertar_simulaciones_empresas", filas=_num_filas)
+    def insertar_simulaciones_empresas(self, filas):
+        self.conexion.executemany("""
+            INSERT INTO simulaciones_empresas (id_empresa, pais, año, escenario_id, ingreso_simulado)
+            VALUES (?, ?, ?, ?, ?)
+        """, filas)
+
+    @instrumentar("bd.insertar_zscores", filas=_num_filas)
+    def insertar_zscores(self, filas, id_carga=None):
+        self.conexion.executemany("""
+            INSERT INTO zscore_empresas (
+                id_empresa, pais, año, escenario_id, ingreso_simulado, z_score, id_carga
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, _con_carga(filas, id_carga))
+
+    def nueva_carga(self, tabla):
+        return self.conexion.execute("INSERT INTO cargas (tabla) VALUES (?)", (tabla,)).lastrowid
+
+    def activar_triggers_alertas(self, activos, tabla=None):
+        # SQLite no puede desactivar triggers: cada uno consulta
+        # alerta_activa() en la condición WHEN (ver _registrar_control_alertas).
+        for trigger in self._triggers_alertas(tabla):
+            self.conexion.execute("SELECT fijar_alerta_activa(?, ?)", (trigger, int(activos)))
+
+    @instrumentar("bd.insertar_resumen", filas=_num_filas)
+    def _insertar_resumen(self, filas):
+        self.conexion.executemany("""
+            INSERT INTO resumen_escenarios (
+                nivel, id_empresa, pais, año, escenarios,
+                ingreso_medio, ingreso_p5, ingreso_p50, ingreso_p95,
+                z_medio, z_p5, z_p50, z_p95, proporcion_riesgo
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, filas)
+
+
+class PoolSQLite:
+    """
+    Pool mínimo de conexiones SQLite con la misma interfaz que el
+    SessionPool de cx_Oracle (acquire/release/close), usado por la API.
+    """
+
+    def __init__(self, ruta, maximo=10, espera=None):
+        self.ruta = ruta
+        # Segundos que acquire espera una conexión libre (None = sin límite),
+        # como waitTimeout con SPOOL_ATTRVAL_TIMEDWAIT.
+        self.espera = espera
+        self._libres = queue.LifoQueue()
+        self._cupo = threading.BoundedSemaphore(maximo)
+        # Mismos contadores que SessionPool.busy / SessionPool.opened.
+        self.busy = 0
+        self.opened = 0
+        self._contadores = threading.Lock()
+
+    def acquire(self):
+        if not self._cupo.acquire(timeout=self.espera):
+            raise ErrorAlmacenamiento(f"Sin conexiones libres tras {self.espera} s")
+        with self._contadores:
+            self.busy += 1
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            with self._contadores:
+                self.opened += 1
+            return conectar_sqlite(self.ruta, check_same_thread=False)
+
+    def release(self, conexion):
+        self._libres.put(conexion)
+        with self._contadores:
+            self.busy -= 1
+        self._cupo.release()
+
+    def close(self, force=False):
+        while not self._libres.empty():
+            self._libres.get_nowait().close()
+
+
+# =====================================
+# Selección del backend
+# =====================================
+
+def abrir_almacenamiento(connection_string):
+    """
+    Abre el backend que corresponde a la cadena de conexión.
+
+    Args:
+        connection_string (str): 'usuario/contraseña@host:puerto/SID' para
+            Oracle o 'sqlite:///ruta/fichero.db' para la base embebida.
+
+    Returns:
+        Almacenamiento: Backend con la conexión abierta.
+    """
+    if connection_string.startswith(PREFIJO_SQLITE):
+        return AlmacenamientoSQLite(conectar_sqlite(connection_string[len(PREFIJO_SQLITE):]))
+
+    if cx_Oracle is None:
+        raise ErrorAlmacenamiento(
+            "cx_Oracle no está instalado; usa una cadena 'sqlite:///ruta.db' para el backend local."
+        )
+    return AlmacenamientoOracle(cx_Oracle.connect(connection_string))
@@ -0,0 +1,72 @@
+from itertools import islice
+
+""" Carga masiva en Oracle mediante array DML (executemany por lotes)."""
+
+# ===========================
+# Carga por lotes con registro de errores
+# ===========================
+
+def cargar_por_lotes(conexion, insert_sql, filas, tipos=None, tam_lote=10_000,
+                     commit_cada=10, desde=0):
+    """
+    Inserta filas en lotes con executemany(batcherrors=True).
+
+    Las filas rechazadas por Oracle se registran y la carga continúa con el
+    resto del lote. Se confirma cada `commit_cada` lotes, de modo que si la
+    carga se interrumpe puede reanudarse desde `filas_confirmadas`.
+
+    Args:
+        conexion: Conexión cx_Oracle abierta.
+        insert_sql (str): Sentencia INSERT con variables posicionales.
+        filas (iterable): Tuplas con los valores de cada fila.
+        tipos (tuple | None): Tipos/tamaños para cursor.setinputsizes.
+        tam_lote (int): Filas por executemany.
+        commit_cada (int): Lotes entre cada commit.
+        desde (int): Índice de la primera fila a cargar (para reanudar).
+
+    Returns:
+        dict: insertadas, rechazadas [(índice_fila, mensaje)] y filas_confirmadas.
+    """
+    cursor = conexion.cursor()
+    if tipos:
+        cursor.setinputsizes(*tipos)
+
+    iterador = islice(iter(filas), desde, None)
+    inicio_lote = desde
+    insertadas = 0
+    rechazadas = []
+    filas_confirmadas = desde
+    lotes = 0
+
+    try:
+        while True:
+            lote = list(islice(iterador, tam_lote))
+            if not lote:
+                break
+
+            cursor.executemany(insert_sql, lote, batcherrors=True)
+            errores = cursor.getbatcherrors()
+            for error in errores:
+                rechazadas.append((inicio_lote + error.offset, error.message))
+
+            insertadas += len(lote) - len(errores)
+            inicio_lote += len(lote)
+            lotes += 1
+
+            if lotes % commit_cada == 0:
+                conexion.commit()
+                filas_confirmadas = inicio_lote
+
+        conexion.commit()
+        filas_confirmadas = inicio_lote
+    except Exception:
+        print(f"❌ Carga interrumpida. Puede reanudarse con desde={filas_confirmadas}.")
+        raise
+    finally:
+        cursor.close()
+
+    return {
+        "insertadas": insertadas,
+        "rechazadas": rechazadas,
+        "filas_confirmadas": filas_confirmadas,
+    }
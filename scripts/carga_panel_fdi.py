@@ -0,0 +1,109 @@
+import argparse
+import time
+
+from almacenamiento import abrir_almacenamiento
+from fdi_analysis_preprocessing import cargar_fdi_limpio, construir_panel_largo
+from instrumentacion import instrumentar
+
+"""
+Carga del panel FDI limpio en 'fdi_pais_objeto'.
+
+Sustituye a generar las sentencias INSERT con fdi_lista_tipo(...) y pegarlas
+a mano: cada serie se enlaza como un objeto FDI_LISTA_TIPO y todos los
+países se cargan (o actualizan, por codigo_pais) en una sola llamada
+executemany.
+
+Uso:
+    python scripts/carga_panel_fdi.py usuario/contraseña@host:puerto/SID
+    python scripts/carga_panel_fdi.py sqlite:///data/fdi.db --paises ESP IRL CHN
+"""
+
+# Nombres en español con los que el proyecto guarda sus países de estudio;
+# el resto de países se cargan con el nombre del Banco Mundial.
+NOMBRES_PAIS = {
+    "ESP": "España",
+    "IRL": "Irlanda",
+    "EUU": "Unión Europea",
+    "USA": "Estados Unidos",
+    "DEU": "Alemania",
+    "FRA": "Francia",
+    "ITA": "Italia",
+    "POL": "Polonia",
+    "NLD": "Países Bajos",
+    "BEL": "Bélgica",
+    "PRT": "Portugal",
+    "GRC": "Grecia",
+    "CHN": "China",
+}
+
+
+def paises_desde_panel(panel, codigos=None, nombres=NOMBRES_PAIS):
+    """
+    Agrupa el panel largo en series por país.
+
+    Args:
+        panel (pd.DataFrame): Salida de construir_panel_largo.
+        codigos (iterable | None): Códigos de país a incluir (None = todos).
+        nombres (dict): Nombre con el que guardar cada código.
+
+    Returns:
+        list: [(nombre_pais, codigo_pais, [(anio, fdi), ...]), ...]
+    """
+    datos = panel.reset_index()
+    if codigos is not None:
+        datos = datos[datos["Country Code"].isin(list(codigos))]
+
+    paises = []
+    for (nombre, codigo), grupo in datos.groupby(["Country Name", "Country Code"], sort=False):
+        serie = list(zip(grupo["Año"].tolist(), grupo["FDI"].round(2).tolist()))
+        paises.append((nombres.get(codigo, nombre), codigo, serie))
+    return paises
+
+
+@instrumentar("cargar_panel_fdi", filas=lambda args, res: res["cargados"])
+def cargar_panel_fdi(connection_string, ruta_csv="data/fdi_inflows.csv", codigos=None,
+                     año_inicio=2000, año_fin=None):
+    """
+    Inserta o actualiza en 'fdi_pais_objeto' las series limpias del CSV.
+
+    Args:
+        connection_string (str): Cadena de conexión Oracle o 'sqlite:///ruta.db'.
+        ruta_csv (str): CSV del Banco Mundial.
+        codigos (iterable | None): Códigos de país a cargar (None = todos).
+        año_inicio (int): Primer año del panel.
+        año_fin (int | None): Último año del panel (None = el último del CSV).
+
+    Returns:
+        dict: {"cargados": int, "rechazados": [(codigo_pais, mensaje), ...]}
+    """
+    df_limpio = cargar_fdi_limpio(ruta_csv, año_inicio=año_inicio, año_fin=año_fin)
+    paises = paises_desde_panel(construir_panel_largo(df_limpio, año_inicio, año_fin), codigos)
+
+    inicio = time.perf_counter()
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        resumen = almacenamiento.actualizar_panel_fdi(paises)
+        almacenamiento.confirmar()
+
+    print(f"✅ Panel FDI cargado: {resumen['cargados']} países "
+          f"({time.perf_counter() - inicio:.2f} s).")
+    for codigo, mensaje in resumen["rechazados"]:
+        print(f"⚠️ {codigo} rechazado: {mensaje}")
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga el panel FDI en fdi_pais_objeto")
+    parser.add_argument("connection_string")
+    parser.add_argument("--csv", default="data/fdi_inflows.csv")
+    parser.add_argument("--paises", nargs="*", help="Códigos de país (por defecto, todos)")
+    parser.add_argument("--año-inicio", type=int, default=2000)
+    parser.add_argument("--año-fin", type=int, default=None,
+                        help="Último año (por defecto, el último del CSV)")
+    args = parser.parse_args()
+
+    cargar_panel_fdi(args.connection_string, args.csv, args.paises,
+                     args.año_inicio, args.año_fin)
+
+
+if __name__ == "__main__":
+    main()
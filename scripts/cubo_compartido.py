@@ -0,0 +1,144 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from simulacion_conjunta import EscenariosPaises
+
+"""
+Cubo de escenarios de país en memoria compartida.
+
+Los ingresos de cada empresa se derivan de las trayectorias de FDI ya
+simuladas para su país, en lugar de generar ruido nuevo por empresa:
+
+    ingreso = base * (1 + sensibilidad * z)
+
+donde z es la trayectoria del país estandarizada (media 0 y desviación 1
+sobre todos sus escenarios y años), de modo que el factor conserva la
+distribución N(1, sensibilidad) de la simulación independiente.
+
+El cubo estandarizado (países x escenarios x años) se copia una sola vez a
+un bloque de multiprocessing.shared_memory. Las tareas solo llevan el
+descriptor (nombre, códigos, forma) y cada proceso abre el bloque una vez y
+lee las trayectorias sin copiarlas ni deserializarlas.
+"""
+
+# Cubos abiertos en este proceso, por nombre del bloque de memoria.
+_ABIERTOS = {}
+
+
+def estandarizar(valores):
+    """(x - media) / desviación de cada país sobre todos sus escenarios y años."""
+    media = valores.mean(axis=(1, 2), keepdims=True)
+    desviacion = valores.std(axis=(1, 2), keepdims=True)
+    return (valores - media) / np.where(desviacion > 0, desviacion, 1.0)
+
+
+class CuboCompartido:
+    """Trayectorias estandarizadas por país en memoria compartida."""
+
+    __slots__ = ("memoria", "codigos", "forma", "valores", "propietario", "_posicion")
+
+    def __init__(self, memoria, codigos, forma, propietario=False):
+        self.memoria = memoria
+        self.codigos = tuple(codigos)
+        self.forma = tuple(forma)
+        self.valores = np.ndarray(self.forma, dtype=np.float64, buffer=memoria.buf)
+        self.propietario = propietario
+        self._posicion = {c: i for i, c in enumerate(self.codigos)}
+
+    def __repr__(self):
+        paises, escenarios, años = self.forma
+        return (f"CuboCompartido({paises} países x {escenarios} escenarios x {años} años, "
+                f"{self.valores.nbytes / 1e6:.1f} MB, {self.memoria.name})")
+
+    def __contains__(self, codigo):
+        return codigo in self._posicion
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    @classmethod
+    def crear(cls, escenarios):
+        """
+        Copia a memoria compartida las trayectorias estandarizadas.
+
+        Args:
+            escenarios (EscenariosPaises): Tensor de simulacion_conjunta o de
+                leer_escenarios_pais.
+
+        Returns:
+            CuboCompartido: Propietario del bloque; cerrar() lo libera.
+        """
+        valores = estandarizar(escenarios.valores)
+        memoria = shared_memory.SharedMemory(create=True, size=max(valores.nbytes, 1))
+        cubo = cls(memoria, escenarios.codigos, valores.shape, propietario=True)
+        cubo.valores[...] = valores
+        _ABIERTOS[memoria.name] = cubo
+        return cubo
+
+    @classmethod
+    def abrir(cls, descriptor):
+        """Cubo de `descriptor` en este proceso; el bloque se abre solo la primera vez."""
+        nombre, codigos, forma = descriptor
+        cubo = _ABIERTOS.get(nombre)
+        if cubo is None:
+            cubo = _ABIERTOS[nombre] = cls(shared_memory.SharedMemory(name=nombre), codigos, forma)
+        return cubo
+
+    @property
+    def descriptor(self):
+        """(nombre, códigos, forma): lo único que viaja con cada tarea."""
+        return self.memoria.name, self.codigos, self.forma
+
+    def pais(self, codigo):
+        """Matriz (escenarios, años) estandarizada de un país (vista, sin copia)."""
+        return self.valores[self._posicion[codigo]]
+
+    def cerrar(self):
+        _ABIERTOS.pop(self.memoria.name, None)
+        self.valores = None  # La vista debe soltarse antes de cerrar el bloque.
+        self.memoria.close()
+        if self.propietario:
+            self.memoria.unlink()
+
+
+def leer_escenarios_pais(almacenamiento, codigos=None, tam_lote=50_000):
+    """
+    Reconstruye el tensor de escenarios a partir de 'simulaciones_montecarlo'.
+
+    Si un país tiene varias simulaciones para el mismo (escenario, año) se
+    usa la última leída. Todos los países se recortan a los escenarios que
+    tienen en común.
+
+    Args:
+        almacenamiento (Almacenamiento): Conexión abierta.
+        codigos (iterable | None): Países a leer (None = todos).
+        tam_lote (int): Filas por bloque de lectura.
+
+    Returns:
+        EscenariosPaises: Tensor (países, escenarios, años).
+    """
+    columnas = ["pais", "escenario_id", "año", "valor_simulado"]
+    codigos = set(codigos) if codigos is not None else None
+    bloques = []
+    for filas in almacenamiento.leer_simulaciones_pais(tam_lote):
+        bloque = pd.DataFrame(filas, columns=columnas)
+        if codigos is not None:
+            bloque = bloque[bloque["pais"].isin(codigos)]
+        bloques.append(bloque)
+
+    datos = pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame(columns=columnas)
+    if datos.empty:
+        raise ValueError("No hay escenarios de país en 'simulaciones_montecarlo'.")
+
+    tabla = (datos.drop_duplicates(["pais", "escenario_id", "año"], keep="last")
+             .pivot(index=["pais", "escenario_id"], columns="año", values="valor_simulado")
+             .dropna(axis=1))
+    paises = tabla.index.get_level_values("pais").unique().tolist()
+    escenarios = int(tabla.groupby(level="pais").size().min())
+    valores = np.stack([tabla.loc[p].to_numpy(dtype=np.float64)[:escenarios] for p in paises])
+    return EscenariosPaises(paises, valores, año_inicio=int(tabla.columns.min()))
@@ -0,0 +1,72 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+"""
+Ejecución de simulaciones en varios procesos.
+
+Cada tarea (un país o una empresa) recibe su propia semilla derivada con
+SeedSequence.spawn a partir de una semilla común. La semilla depende del
+orden de la tarea y no del proceso que la ejecuta, así que los resultados
+son idénticos con 1 o con 32 procesos.
+"""
+
+# Tope de tareas por fragmento. Con 2 * procesos fragmentos en vuelo, como
+# mucho hay 2 * procesos * TAM_FRAGMENTO_MAXIMO resultados en memoria a la
+# vez, sea cual sea el número total de tareas.
+TAM_FRAGMENTO_MAXIMO = 64
+
+
+def _ejecutar_fragmento(funcion, fragmento):
+    return [funcion(tarea, semilla) for tarea, semilla in fragmento]
+
+
+def ejecutar_en_paralelo(funcion, tareas, semilla=None, procesos=None, tam_fragmento=None):
+    """
+    Aplica `funcion(tarea, semilla)` a cada tarea repartiendo el trabajo
+    entre procesos, y devuelve los resultados en el orden de las tareas.
+
+    Las tareas se agrupan en fragmentos para que el coste de comunicación
+    entre procesos no domine cuando cada tarea es pequeña. Los fragmentos
+    tienen como mucho TAM_FRAGMENTO_MAXIMO tareas y solo se mantienen en
+    vuelo 2 * procesos, de modo que los resultados retenidos no crecen con
+    el número total de tareas.
+
+    Args:
+        funcion (callable): Función de nivel de módulo (serializable) que
+            recibe la tarea y una np.random.SeedSequence propia.
+        tareas (iterable): Parámetros de cada tarea.
+        semilla (int | None): Semilla común de la que se derivan las demás.
+        procesos (int | None): Número de procesos; 1 ejecuta en el proceso
+            actual y None usa todos los núcleos.
+        tam_fragmento (int | None): Tareas por envío a un proceso (por
+            defecto, un cuarto del reparto por proceso, hasta
+            TAM_FRAGMENTO_MAXIMO).
+
+    Yields:
+        Resultado de cada tarea, en el mismo orden que `tareas`.
+    """
+    tareas = list(tareas)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tareas))
+    pares = list(zip(tareas, semillas))
+
+    if procesos == 1:
+        for tarea, semilla_tarea in pares:
+            yield funcion(tarea, semilla_tarea)
+        return
+
+    procesos = procesos or os.cpu_count() or 1
+    if tam_fragmento is None:
+        tam_fragmento = max(1, min(-(-len(pares) // (procesos * 4)), TAM_FRAGMENTO_MAXIMO))
+    fragmentos = (pares[i:i + tam_fragmento] for i in range(0, len(pares), tam_fragmento))
+
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        pendientes = deque()
+        for fragmento in fragmentos:
+            pendientes.append(executor.submit(_ejecutar_fragmento, funcion, fragmento))
+            if len(pendientes) >= 2 * procesos:
+                yield from pendientes.popleft().result()
+        while pendientes:
+            yield from pendientes.popleft().result()
@@ -1,14 +1,25 @@
 import random
-import cx_Oracle
+from itertools import repeat
 import numpy as np
 from datetime import datetime
 
+from almacenamiento import abrir_almacenamiento
+from cubo_compartido import CuboCompartido, leer_escenarios_pais
+from ejecucion_paralela import ejecutar_en_paralelo
+from escenarios import CuboEscenarios
+from instrumentacion import instrumentar
+from muestreo import (imprimir_informe_convergencia, muestrear_normales, resumen_error,
+                      simular_hasta_convergencia)
+
 """Este script realiza la creación de empresas ficticias, 
 simula como el FDI impactaria en los ingresos futuros bajo un análisis
  de sensibilidad. Realiza la inserción tanto de las empresas como de
  los ingresos simulados a la BBDD de Oracle."""
 
 class Empresa:
+    # Sin __dict__ por instancia: ocupa menos al generar miles de empresas.
+    __slots__ = ("nombre", "pais", "sector", "ingresos_base", "sensibilidad_fdi")
+
     def __init__(self, nombre, pais, sector, ingresos_base, sensibilidad_fdi):
         self.nombre = nombre
         self.pais = pais  # Código tipo "ESP", "USA", etc.
@@ -39,39 +50,289 @@ def generar_empresas_ficticias():
 
     return empresas
 
+
+def insertar_empresas(connection_string, empresas):
+    """
+    Inserta en 'empresas_ficticias' la lista de objetos Empresa.
+
+    Args:
+        connection_string (str): Cadena de conexión Oracle o 'sqlite:///ruta.db'.
+        empresas (list[Empresa]): Empresas a insertar.
+    """
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        almacenamiento.insertar_empresas([
+            (e.nombre, e.pais, e.sector, e.ingresos_base, e.sensibilidad_fdi)
+            for e in empresas
+        ])
+        almacenamiento.confirmar()
+
+    print(f"Se insertaron {len(empresas)} empresas ficticias.")
+
 # Insertar simulaciones
 
-def simular_ingresos_empresa(base, sensibilidad, años, escenarios):
-    # Simula ingresos año a año en función del FDI y sensibilidad.
-    
-    simulaciones = []
-    for esc in range(1, escenarios + 1):
-        for j in range(años):
-            año = 2023 + j
-            factor = np.random.normal(loc=1.0, scale=sensibilidad)
-            ingreso = round(base * factor, 2)
-            simulaciones.append((año, esc, ingreso))
-    return simulaciones
-
-def insertar_simulaciones_empresas(connection_string, años=8, escenarios=1000):
-    conn = cx_Oracle.connect(connection_string)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT id_empresa, nombre, pais, ingresos_base, sensibilidad_fdi FROM empresas_ficticias")
-    empresas = cursor.fetchall()
-
-    insert_sql = """
-        INSERT INTO simulaciones_empresas (id_empresa, pais, año, escenario_id, ingreso_simulado)
-        VALUES (:1, :2, :3, :4, :5)
+def generar_ingresos_empresa(base, sensibilidad, años, escenarios, rng=None, metodo="iid",
+                             replicas=1):
+    """
+    Genera de una sola vez la matriz escenario x año de ingresos simulados
+    de una empresa.
+
+    Args:
+        base (float): Ingresos base de la empresa.
+        sensibilidad (float): Sensibilidad al FDI (desviación del factor).
+        años (int): Años a proyectar.
+        escenarios (int): Número de escenarios a simular.
+        rng (np.random.Generator | int | None): Generador o semilla.
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol".
+        replicas (int): Bloques independientes del diseño (para el error estándar).
+
+    Returns:
+        np.ndarray: Matriz (escenarios, años) con los ingresos redondeados.
+    """
+    rng = np.random.default_rng(rng)
+    if metodo == "iid":
+        factores = rng.normal(loc=1.0, scale=sensibilidad, size=(escenarios, años))
+    else:
+        factores = 1.0 + sensibilidad * muestrear_normales(escenarios, años, metodo, rng,
+                                                           replicas)
+    return np.round(base * factores, 2)
+
+
+def ingresos_desde_trayectorias(base, sensibilidad, trayectorias):
     """
+    Ingresos a partir de las trayectorias estandarizadas del FDI del país:
+    base * (1 + sensibilidad * z), con la misma distribución marginal que
+    generar_ingresos_empresa pero ligada a los escenarios del país.
+
+    Args:
+        base (float): Ingresos base de la empresa.
+        sensibilidad (float): Sensibilidad al FDI.
+        trayectorias (np.ndarray): Matriz (escenarios, años) estandarizada
+            (CuboCompartido.pais).
+
+    Returns:
+        np.ndarray: Matriz (escenarios, años) con los ingresos redondeados.
+    """
+    return np.round(base * (1.0 + sensibilidad * trayectorias), 2)
+
+
+def generar_ingresos_adaptativo(base, sensibilidad, años, maximo=20_000, rng=None, metodo="iid",
+                                precision=0.01, tam_bloque=100):
+    """
+    Ingresos simulados por bloques hasta que la media y el VaR 5% de cada año
+    se conocen con una semiamplitud (intervalo del 95%) de `precision`
+    veces los ingresos base, con `maximo` escenarios como tope.
+
+    Returns:
+        tuple: (matriz (escenarios, años), informe de convergencia).
+    """
+    return simular_hasta_convergencia(
+        lambda n, rng_bloque: generar_ingresos_empresa(base, sensibilidad, años, n, rng_bloque,
+                                                       metodo),
+        tam_bloque, maximo, precision, tolerancia=precision * base, rng=rng,
+    )
+
+
+def iterar_lotes_ingresos(base, sensibilidad, años, escenarios, tam_lote=50_000, rng=None,
+                          metodo="iid"):
+    """
+    Recorre la simulación de una empresa en lotes de como máximo `tam_lote`
+    filas, de modo que la memoria depende del lote y no del total. Con
+    muestreo estratificado (lhs, sobol) cada lote es un diseño completo.
+
+    Yields:
+        tuple: Arrays (años, escenario_id, ingreso_simulado) del lote.
+    """
+    rng = np.random.default_rng(rng)
+    escenarios_lote = max(1, tam_lote // años)
+    años_lote = np.arange(2023, 2023 + años)
+
+    for inicio in range(0, escenarios, escenarios_lote):
+        n = min(escenarios_lote, escenarios - inicio)
+        ingresos = generar_ingresos_empresa(base, sensibilidad, años, n, rng, metodo)
+        yield (
+            np.tile(años_lote, n),
+            np.repeat(np.arange(inicio + 1, inicio + n + 1), años),
+            ingresos.ravel(),
+        )
+
+
+def _lotes_matriz_ingresos(ingresos, tam_lote):
+    # Mismo formato que iterar_lotes_ingresos, a partir de una matriz ya simulada.
+    escenarios, años = ingresos.shape
+    escenarios_lote = max(1, tam_lote // años)
+    años_lote = np.arange(2023, 2023 + años)
+
+    for inicio in range(0, escenarios, escenarios_lote):
+        bloque = ingresos[inicio:inicio + escenarios_lote]
+        n = len(bloque)
+        yield (
+            np.tile(años_lote, n),
+            np.repeat(np.arange(inicio + 1, inicio + n + 1), años),
+            bloque.ravel(),
+        )
+
+
+def _tarea_ingresos_cubo(tarea, semilla):
+    base, sensibilidad, años, escenarios, pais, descriptor, metodo = tarea
+    cubo = CuboCompartido.abrir(descriptor)
+    if pais not in cubo:
+        return generar_ingresos_empresa(base, sensibilidad, años, escenarios, semilla,
+                                        metodo), None
+    trayectorias = cubo.pais(pais)[:escenarios, :años]
+    return ingresos_desde_trayectorias(base, sensibilidad, trayectorias), None
+
+
+def _tarea_simular_empresa(tarea, semilla):
+    base, sensibilidad, años, escenarios, metodo, precision = tarea
+    if precision is None:
+        return generar_ingresos_empresa(base, sensibilidad, años, escenarios, semilla, metodo), None
+    return generar_ingresos_adaptativo(base, sensibilidad, años, escenarios, semilla, metodo,
+                                       precision)
+
+
+@instrumentar("simular_ingresos_empresa", filas=lambda args, cubo: len(cubo))
+def simular_ingresos_empresa(base, sensibilidad, años, escenarios, rng=None,
+                             id_empresa=0, pais=None, metodo="iid", replicas=10,
+                             cubo_paises=None):
+    """
+    Simula ingresos año a año en función del FDI y sensibilidad.
+
+    Args:
+        base (float): Ingresos base de la empresa.
+        sensibilidad (float): Sensibilidad al FDI.
+        años (int): Años a proyectar.
+        escenarios (int): Número de escenarios a simular.
+        rng (np.random.Generator | int | None): Generador o semilla.
+        id_empresa (int): Identificador con el que se etiquetan las filas.
+        pais (str | None): Código de país de la empresa.
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol".
+        replicas (int): Bloques independientes para el error estándar.
+        cubo_paises (CuboCompartido | None): Si se indica, los ingresos se
+            derivan de las trayectorias del país `pais` en lugar de simularse
+            (escenarios y años actúan como máximo).
+
+    Returns:
+        CuboEscenarios: Filas (escenario, año) en formato compacto; se unen
+        con CuboEscenarios.concatenar y se pasan a calcular_z_score con
+        a_dataframe(). En cubo.meta["error_estandar"] van la media y el
+        VaR 5% de cada año con su error estándar.
+    """
+    if cubo_paises is None:
+        ingresos = generar_ingresos_empresa(base, sensibilidad, años, escenarios, rng, metodo,
+                                            replicas)
+    elif pais in cubo_paises:
+        ingresos = ingresos_desde_trayectorias(
+            base, sensibilidad, cubo_paises.pais(pais)[:escenarios, :años])
+        metodo, replicas = "cubo_paises", min(replicas, len(ingresos))
+    else:
+        raise ValueError(f"El país {pais!r} no está en el cubo de escenarios.")
+
+    cubo = CuboEscenarios.desde_matriz(ingresos, id_empresa=id_empresa, pais=pais)
+    cubo.meta["error_estandar"] = resumen_error(ingresos, replicas, metodo)
+    return cubo
+
+
+@instrumentar("insertar_simulaciones_empresas", filas=lambda args, total: total)
+def insertar_simulaciones_empresas(connection_string, años=8, escenarios=1000,
+                                   tam_lote=50_000, semilla=None, procesos=1, metodo="iid",
+                                   precision=None, cubo_paises=None):
+    """
+    Simula e inserta los ingresos de todas las empresas en
+    'simulaciones_empresas' mediante array DML por lotes de tamaño fijo.
+
+    Cada empresa usa su propio flujo aleatorio derivado de `semilla`
+    (SeedSequence.spawn), por lo que el resultado es el mismo con
+    cualquier número de procesos.
+
+    Args:
+        connection_string (str): Cadena de conexión Oracle o 'sqlite:///ruta.db'.
+        años (int): Años a proyectar.
+        escenarios (int): Escenarios por empresa.
+        tam_lote (int): Filas máximas enviadas en cada executemany.
+        semilla (int | None): Semilla para reproducir la simulación.
+        procesos (int | None): Procesos que simulan en paralelo (None = todos
+            los núcleos). Con 1 se simula por lotes en el propio proceso.
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol".
+        precision (float | None): Modo adaptativo: cada empresa se simula por
+            bloques hasta conocer la media y el VaR 5% de cada año con esa
+            precisión relativa a sus ingresos base, y `escenarios` pasa a ser
+            el tope. Al terminar se informa de los escenarios usados.
+        cubo_paises (EscenariosPaises | str | None): Escenarios de FDI por país
+            de los que derivar los ingresos (ingresos_desde_trayectorias), p. ej.
+            de simular_panel_correlacionado, o "bd" para usar los guardados en
+            'simulaciones_montecarlo'. Se copian una vez a memoria compartida
+            que leen todos los procesos; escenarios y años actúan como máximo
+            y no se aplica el modo adaptativo. Las empresas de países sin
+            escenarios se simulan de forma independiente, con `metodo`.
+
+    Returns:
+        int: Filas insertadas.
+    """
+    total = 0
+    informes = {}
+    compartido = None
+    resultados = None
+
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        empresas = almacenamiento.obtener_empresas()
+
+        if cubo_paises is not None:
+            if isinstance(cubo_paises, str):
+                cubo_paises = leer_escenarios_pais(almacenamiento, {e[2] for e in empresas})
+            compartido = CuboCompartido.crear(cubo_paises)
+            sin_escenarios = sorted({e[2] for e in empresas if e[2] not in compartido})
+            if sin_escenarios:
+                print(f"⚠️ Sin escenarios de país para {', '.join(map(str, sin_escenarios))}: "
+                      f"esas empresas se simulan de forma independiente ({metodo}).")
+            precision = None
+
+        if compartido is None and procesos == 1 and precision is None:
+            semillas = np.random.SeedSequence(semilla).spawn(len(empresas))
+            lotes_empresas = (
+                iterar_lotes_ingresos(base, sensibilidad, años, escenarios, tam_lote, semilla_emp,
+                                      metodo)
+                for (_, _, _, base, sensibilidad), semilla_emp in zip(empresas, semillas)
+            )
+        else:
+            # Cubo de países, modo adaptativo o varios procesos: la matriz de
+            # cada empresa se obtiene entera y después se trocea en lotes.
+            if compartido is not None:
+                funcion = _tarea_ingresos_cubo
+                tareas = [(base, sensibilidad, años, escenarios, pais, compartido.descriptor,
+                           metodo)
+                          for _, _, pais, base, sensibilidad in empresas]
+            else:
+                funcion = _tarea_simular_empresa
+                tareas = [(base, sensibilidad, años, escenarios, metodo, precision)
+                          for _, _, _, base, sensibilidad in empresas]
+            resultados = ejecutar_en_paralelo(funcion, tareas, semilla, procesos)
+
+            def matrices_en_lotes():
+                for emp, (ingresos, informe) in zip(empresas, resultados):
+                    informes[emp[0]] = informe
+                    yield _lotes_matriz_ingresos(ingresos, tam_lote)
+
+            lotes_empresas = matrices_en_lotes()
+
+        try:
+            for emp, lotes in zip(empresas, lotes_empresas):
+                id_emp, _, pais, _, _ = emp
+                for años_lote, esc_lote, ingresos_lote in lotes:
+                    registros = list(zip(repeat(id_emp), repeat(pais), años_lote.tolist(),
+                                         esc_lote.tolist(), ingresos_lote.tolist()))
+                    almacenamiento.insertar_simulaciones_empresas(registros)
+                    total += len(registros)
+        finally:
+            # Primero se cierra el generador, que espera a los procesos que
+            # aún leen el cubo; después se libera la memoria compartida.
+            if resultados is not None:
+                resultados.close()
+            if compartido is not None:
+                compartido.cerrar()
 
-    for emp in empresas:
-        id_emp, _, pais, base, sensibilidad = emp
-        datos = simular_ingresos_empresa(base, sensibilidad, años, escenarios)
-        registros = [(id_emp, pais, año, esc, ingreso) for (año, esc, ingreso) in datos]
-        cursor.executemany(insert_sql, registros)
+        almacenamiento.confirmar()
 
-    conn.commit()
-    print(f"✅ Se insertaron simulaciones para {len(empresas)} empresas.")
-    cursor.close()
-    conn.close()
\ No newline at end of file
+    print(f"✅ Se insertaron simulaciones para {len(empresas)} empresas ({total} filas).")
+    if precision is not None:
+        imprimir_informe_convergencia(informes, "Escenarios por empresa")
+    return total
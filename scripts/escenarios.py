@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+"""
+Contenedor compacto de escenarios simulados.
+
+Guarda el cubo empresa x escenario x año como columnas de NumPy con el tipo
+mínimo necesario (estructura de arrays), en lugar de listas de tuplas o
+DataFrames con columnas object:
+
+    columna         tipo      bytes/fila
+    id_empresa      int32     4
+    codigo_pais     int16     2   (índice en `paises`, -1 = sin país)
+    año             int16     2
+    escenario_id    int32     4
+    valor           float32   4
+
+Son 16 bytes por fila frente a los ~150 de una tupla de Python con sus
+objetos, así que el cubo completo cabe en una fracción de la memoria y
+pasa de una etapa a otra sin conversiones.
+"""
+
+
+class CuboEscenarios:
+    __slots__ = ("id_empresa", "codigo_pais", "paises", "año", "escenario_id", "valor", "meta")
+
+    def __init__(self, id_empresa, codigo_pais, paises, año, escenario_id, valor, meta=None):
+        self.id_empresa = np.asarray(id_empresa, dtype=np.int32)
+        self.codigo_pais = np.asarray(codigo_pais, dtype=np.int16)
+        self.paises = tuple(paises)
+        self.año = np.asarray(año, dtype=np.int16)
+        self.escenario_id = np.asarray(escenario_id, dtype=np.int32)
+        self.valor = np.asarray(valor, dtype=np.float32)
+        # Información de la simulación (p. ej. método de muestreo y error estándar).
+        self.meta = meta if meta is not None else {}
+
+    def __len__(self):
+        return len(self.valor)
+
+    def __repr__(self):
+        return f"CuboEscenarios({len(self)} filas, {self.nbytes / 1e6:.1f} MB)"
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, c).nbytes
+                   for c in ("id_empresa", "codigo_pais", "año", "escenario_id", "valor"))
+
+    @classmethod
+    def desde_matriz(cls, valores, id_empresa=0, pais=None, año_inicio=2023):
+        """
+        Crea el cubo de una empresa a partir de su matriz (escenarios, años),
+        recorrida escenario a escenario como las simulaciones originales.
+        """
+        escenarios, años = valores.shape
+        n = escenarios * años
+        return cls(
+            id_empresa=np.full(n, id_empresa, dtype=np.int32),
+            codigo_pais=np.full(n, 0 if pais is not None else -1, dtype=np.int16),
+            paises=(pais,) if pais is not None else (),
+            año=np.tile(np.arange(año_inicio, año_inicio + años, dtype=np.int16), escenarios),
+            escenario_id=np.repeat(np.arange(1, escenarios + 1, dtype=np.int32), años),
+            valor=valores.ravel(),
+        )
+
+    @classmethod
+    def concatenar(cls, cubos):
+        """Une varios cubos unificando los códigos de país."""
+        cubos = list(cubos)
+        paises = list(dict.fromkeys(p for c in cubos for p in c.paises))
+        posicion = {p: i for i, p in enumerate(paises)}
+
+        codigos = []
+        for cubo in cubos:
+            # Traducción de los códigos locales de cada cubo a los comunes
+            # (el último elemento atiende al código -1 = sin país).
+            traduccion = np.array([posicion[p] for p in cubo.paises] + [-1], dtype=np.int16)
+            codigos.append(traduccion[cubo.codigo_pais])
+
+        return cls(
+            id_empresa=np.concatenate([c.id_empresa for c in cubos]),
+            codigo_pais=np.concatenate(codigos),
+            paises=paises,
+            año=np.concatenate([c.año for c in cubos]),
+            escenario_id=np.concatenate([c.escenario_id for c in cubos]),
+            valor=np.concatenate([c.valor for c in cubos]),
+        )
+
+    def a_dataframe(self):
+        """
+        DataFrame con las columnas de 'simulaciones_empresas' que comparte los
+        arrays numéricos del cubo; 'pais' es categórica.
+        """
+        return pd.DataFrame({
+            "id_empresa": self.id_empresa,
+            "pais": pd.Categorical.from_codes(self.codigo_pais, categories=self.paises),
+            "año": self.año,
+            "escenario_id": self.escenario_id,
+            "ingreso_simulado": self.valor,
+        }, copy=False)
+
+    def filas(self):
+        """Tuplas (id_empresa, pais, año, escenario_id, ingreso_simulado) para executemany."""
+        paises = list(self.paises) + [None]
+        return zip(self.id_empresa.tolist(),
+                   [paises[c] for c in self.codigo_pais.tolist()],
+                   self.año.tolist(),
+                   self.escenario_id.tolist(),
+                   self.valor.astype(np.float64).round(2).tolist())
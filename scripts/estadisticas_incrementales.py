@@ -0,0 +1,315 @@
+"""
+Estadísticas incrementales del FDI por país.
+
+Cuando el Banco Mundial publica un año nuevo basta con añadir esa
+observación al estado guardado de cada país, sin recalcular la serie
+completa. Los estados son combinables, de modo que los agregados de un
+bloque (p. ej. la UE) se obtienen fusionando los estados de sus países.
+
+Métricas equivalentes a resumen_estadistico_fdi:
+    - promedio y desviación estándar: momentos de Welford.
+    - rango: mínimo y máximo acumulados.
+    - mediana, VaR 5% y Best Case 95%: sketch de cuantiles combinable.
+    - variación interanual media: primer y último valor de la serie.
+
+El almacén se guarda en data/cache/ (ver cargar_estadisticas_fdi en
+fdi_analysis_preprocessing.py).
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# =====================================
+# Momentos (Welford / Chan)
+# =====================================
+
+class MomentosWelford:
+    def __init__(self, n=0, media=0.0, m2=0.0, minimo=math.inf, maximo=-math.inf):
+        self.n = n
+        self.media = media
+        self.m2 = m2
+        self.minimo = minimo
+        self.maximo = maximo
+
+    def actualizar(self, valor):
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+    def fusionar(self, otro):
+        """Combina dos conjuntos de momentos (fórmula de Chan et al.)."""
+        if otro.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.media, self.m2 = otro.n, otro.media, otro.m2
+            self.minimo, self.maximo = otro.minimo, otro.maximo
+            return
+
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.media += delta * otro.n / n
+        self.m2 += otro.m2 + delta * delta * self.n * otro.n / n
+        self.n = n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    @property
+    def desviacion(self):
+        # ddof=1, igual que pd.Series.std()
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+
+    def a_dict(self):
+        return {"n": self.n, "media": self.media, "m2": self.m2,
+                "minimo": self.minimo, "maximo": self.maximo}
+
+
+# =====================================
+# Sketch de cuantiles combinable
+# =====================================
+
+class SketchCuantiles:
+    """
+    Sketch de cuantiles tipo KLL con niveles de compactación.
+
+    Mientras haya menos de `capacidad` valores guarda la muestra completa y
+    los percentiles coinciden con np.percentile. Al superarla, cada nivel
+    lleno se ordena y conserva uno de cada dos valores, que pasan al nivel
+    siguiente con el doble de peso. Dos sketches se combinan uniendo sus
+    niveles.
+    """
+
+    def __init__(self, capacidad=256, niveles=None, alternancia=0):
+        self.capacidad = capacidad
+        self.niveles = niveles if niveles is not None else [[]]
+        self._alternancia = alternancia
+
+    def actualizar(self, valor):
+        self.niveles[0].append(valor)
+        if len(self.niveles[0]) >= self.capacidad:
+            self._compactar()
+
+    def extender(self, valores):
+        """Añade un bloque de valores de una vez (p. ej. un lote leído de la BBDD)."""
+        self.niveles[0].extend(valores)
+        if len(self.niveles[0]) >= self.capacidad:
+            self._compactar()
+
+    def fusionar(self, otro):
+        for nivel, valores in enumerate(otro.niveles):
+            if nivel == len(self.niveles):
+                self.niveles.append([])
+            self.niveles[nivel].extend(valores)
+        self._compactar()
+
+    def _compactar(self):
+        nivel = 0
+        while nivel < len(self.niveles):
+            if len(self.niveles[nivel]) >= self.capacidad:
+                valores = sorted(self.niveles[nivel])
+                # Se alterna el desplazamiento para no sesgar hacia un extremo.
+                inicio = self._alternancia
+                self._alternancia ^= 1
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append([])
+                self.niveles[nivel + 1].extend(valores[inicio::2])
+                self.niveles[nivel] = []
+            nivel += 1
+
+    @property
+    def exacto(self):
+        return all(not valores for valores in self.niveles[1:])
+
+    def percentil(self, q):
+        """Percentil q (0-100) con interpolación lineal como np.percentile."""
+        if self.exacto:
+            return float(np.percentile(self.niveles[0], q)) if self.niveles[0] else math.nan
+
+        valores = np.concatenate([np.asarray(v, dtype="float64") for v in self.niveles])
+        pesos = np.concatenate([np.full(len(v), 2.0 ** nivel)
+                                for nivel, v in enumerate(self.niveles)])
+        orden = np.argsort(valores)
+        valores, pesos = valores[orden], pesos[orden]
+        # Posición de cada valor en la muestra original (centro de su peso).
+        posiciones = np.cumsum(pesos) - pesos / 2
+        objetivo = q / 100 * pesos.sum()
+        return float(np.interp(objetivo, posiciones, valores))
+
+    def a_dict(self):
+        return {"capacidad": self.capacidad, "niveles": self.niveles,
+                "alternancia": self._alternancia}
+
+
+# =====================================
+# Estado por país
+# =====================================
+
+class EstadisticasPais:
+    def __init__(self, momentos=None, sketch=None, primero=None, ultimo=None,
+                 ultimo_año=None, suma_variaciones=0.0, fusionado=False):
+        self.momentos = momentos or MomentosWelford()
+        self.sketch = sketch or SketchCuantiles()
+        self.primero = primero
+        self.ultimo = ultimo
+        self.ultimo_año = ultimo_año
+        # Suma de (último - primero) de cada serie fusionada; en un único
+        # país equivale a la suma de las variaciones interanuales.
+        self.suma_variaciones = suma_variaciones
+        # Un estado fusionado mezcla varias series: no tiene un único último
+        # valor ni último año, así que solo admite lecturas.
+        self.fusionado = fusionado
+
+    def actualizar(self, año, valor):
+        """
+        Añade una observación en O(1). Ignora años ya incorporados y nulos.
+
+        Raises:
+            ValueError: Si el estado es el resultado de una fusión.
+        """
+        if self.fusionado:
+            raise ValueError("Un estado fusionado es de solo lectura: "
+                             "actualiza los países y vuelve a fusionarlos.")
+        if valor is None or math.isnan(valor):
+            return False
+        if self.ultimo_año is not None and año <= self.ultimo_año:
+            return False
+
+        if self.primero is None:
+            self.primero = valor
+        else:
+            self.suma_variaciones += valor - self.ultimo
+        self.ultimo = valor
+        self.ultimo_año = año
+        self.momentos.actualizar(valor)
+        self.sketch.actualizar(valor)
+        return True
+
+    def fusionar(self, otro):
+        """
+        Combina otro estado en este. El resultado queda de solo lectura:
+        primero, ultimo y ultimo_año pasan a None porque ya no corresponden
+        a una única serie.
+        """
+        self.momentos.fusionar(otro.momentos)
+        self.sketch.fusionar(otro.sketch)
+        self.suma_variaciones += otro.suma_variaciones
+        self.primero = self.ultimo = self.ultimo_año = None
+        self.fusionado = True
+        return self
+
+    def resumen(self):
+        """Mismas claves que devuelve resumen_estadistico_fdi."""
+        n = self.momentos.n
+        return {
+            "promedio": self.momentos.media if n else math.nan,
+            "mediana": self.sketch.percentil(50),
+            "rango": self.momentos.maximo - self.momentos.minimo if n else math.nan,
+            "desviacion_estandar": self.momentos.desviacion,
+            "VaR_5": self.sketch.percentil(5),
+            "BestCase_95": self.sketch.percentil(95),
+            # diff().fillna(0).mean(): la primera diferencia cuenta como 0.
+            "variacion_yoy_promedio": self.suma_variaciones / n if n else math.nan,
+        }
+
+    def parametros_montecarlo(self):
+        """(media, desviación) que usa simular_fdi."""
+        return self.momentos.media, self.momentos.desviacion
+
+    def a_dict(self):
+        return {
+            "momentos": self.momentos.a_dict(),
+            "sketch": self.sketch.a_dict(),
+            "primero": self.primero,
+            "ultimo": self.ultimo,
+            "ultimo_año": self.ultimo_año,
+            "suma_variaciones": self.suma_variaciones,
+            "fusionado": self.fusionado,
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        sketch = datos["sketch"]
+        return cls(
+            momentos=MomentosWelford(**datos["momentos"]),
+            sketch=SketchCuantiles(sketch["capacidad"], sketch["niveles"], sketch["alternancia"]),
+            primero=datos["primero"],
+            ultimo=datos["ultimo"],
+            ultimo_año=datos["ultimo_año"],
+            suma_variaciones=datos["suma_variaciones"],
+            fusionado=datos.get("fusionado", False),
+        )
+
+
+# =====================================
+# Almacén de estados
+# =====================================
+
+class AlmacenEstadisticas:
+    """Estado incremental de todos los países, serializable a JSON."""
+
+    def __init__(self, paises=None):
+        self.paises = paises or {}
+
+    def actualizar_desde_panel(self, panel):
+        """
+        Incorpora del panel largo (construir_panel_largo) solo los años
+        posteriores al último ya procesado de cada país.
+
+        Si los años ya procesados de un país no coinciden con el panel
+        (número de observaciones o suma distintos, p. ej. porque el Banco
+        Mundial ha revisado la serie o cambia el año de inicio), su estado
+        se descarta y se reconstruye desde el panel.
+
+        Returns:
+            int: Observaciones nuevas incorporadas.
+        """
+        nombres = panel.index.get_level_values(0)
+        años = np.asarray(panel.index.get_level_values(1))
+        valores = panel["FDI"].to_numpy(dtype="float64")
+
+        ultimo = np.array([
+            self.paises[n].ultimo_año if n in self.paises and self.paises[n].ultimo_año is not None
+            else -1
+            for n in nombres
+        ])
+        procesados = años <= ultimo
+        comprobacion = (pd.Series(valores[procesados], index=nombres[procesados])
+                        .groupby(level=0, sort=False).agg(["count", "sum"]))
+        for nombre, estado in list(self.paises.items()):
+            if estado.momentos.n == 0:
+                continue
+            n, suma = comprobacion.loc[nombre] if nombre in comprobacion.index else (0, 0.0)
+            if n != estado.momentos.n or not math.isclose(
+                    suma, estado.momentos.media * estado.momentos.n,
+                    rel_tol=1e-9, abs_tol=1e-9):
+                del self.paises[nombre]
+                ultimo[nombres == nombre] = -1
+        nuevos = años > ultimo
+
+        añadidas = 0
+        for nombre, año, valor in zip(nombres[nuevos], años[nuevos], valores[nuevos]):
+            estado = self.paises.setdefault(nombre, EstadisticasPais())
+            añadidas += estado.actualizar(int(año), float(valor))
+        return añadidas
+
+    def agregado(self, nombres):
+        """
+        Estado combinado (de solo lectura) de varios países, p. ej. un
+        bloque, sin releer datos.
+        """
+        total = EstadisticasPais()
+        for nombre in nombres:
+            total.fusionar(self.paises[nombre])
+        return total
+
+    def a_dict(self):
+        return {n: e.a_dict() for n, e in self.paises.items()}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls({n: EstadisticasPais.desde_dict(e) for n, e in datos.items()})
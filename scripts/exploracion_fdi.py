@@ -1,8 +1,9 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import cx_Oracle
-from scripts.fdi_analysis_preprocessing import (limpiar_datos_fdi, analizar_fdi, procesar_pais,
-                       graficar_comparativo, generar_resumen,)
+from scripts.fdi_analysis_preprocessing import (cargar_fdi_limpio, analizar_fdi, procesar_pais,
+                       construir_panel_largo, analizar_fdi_lote, serie_pais,
+                       parametros_montecarlo_fdi, graficar_comparativo, generar_resumen,)
+from scripts.graficos import renderizar_paises
 from empresas import generar_empresas_ficticias, insertar_simulaciones_empresas
 
 """
@@ -12,17 +13,6 @@ en Oracle.
 
 """
 
-#Cargar archivo
-df = pd.read_csv("data/fdi_inflows.csv", skiprows=4)
-
-# Limpieza de datos.
-
-df_limpio= limpiar_datos_fdi(df)
-print(df_limpio)
-# df individuales por país.
-
-
-
 top5_mejoresFDI = {
     "Italia" : "Italy",
     "Irlanda" : "Ireland",
@@ -47,31 +37,46 @@ bloques_geopoliticos = {
     "China": "China"
 }
 
-# Resúmenes estadísticos por país
-paises_data = {}
-resumenes_data = {}
 
-for nombre_visible, filtro in bloques_geopoliticos.items():
-    df_pais, resumen = analizar_fdi(df_limpio, filtro, nombre_visible)
-    paises_data[nombre_visible] = df_pais
-    resumenes_data[nombre_visible] = resumen
+def main():
+    # Carga y limpieza de datos (desde la caché si el CSV no ha cambiado).
+
+    df_limpio = cargar_fdi_limpio("data/fdi_inflows.csv")
+    print(df_limpio)
 
+    # Resúmenes estadísticos por país desde el almacén incremental
+    # (data/cache/estadisticas_fdi.json): solo se procesan los años nuevos.
+    panel = construir_panel_largo(df_limpio)
 
+    resumenes = analizar_fdi_lote(panel, bloques_geopoliticos)
+    print(resumenes)
 
-# Gráfico comparativo
-graficar_comparativo(paises_data, "img/fdi_comparativo_bloque3png")
+    # Media y desviación de cada bloque para la simulación de Monte Carlo,
+    # del mismo almacén.
+    parametros = parametros_montecarlo_fdi(panel, bloques_geopoliticos)
+    for nombre_visible, (media, std) in parametros.items():
+        print(f"{nombre_visible}: media {media:.2f}, desviación {std:.2f}")
 
-# Crear resumen
-generar_resumen(resumenes_data, ruta_archivo="docs/resumen_fdi_bloque3.txt")
+    paises_data = {nombre_visible: serie_pais(panel, filtro)
+                   for nombre_visible, filtro in bloques_geopoliticos.items()}
+    resumenes_data = resumenes.to_dict("index")
+
+    # Gráfico comparativo
+    graficar_comparativo(paises_data, "img/fdi_comparativo_bloque3png")
+
+    # Gráfico de cada país; los que no han cambiado se saltan. Con solo tres
+    # países se dibujan en este proceso (ver MINIMO_GRAFICOS_PARALELO).
+    renderizar_paises(paises_data, "img")
+
+    # Crear resumen
+    generar_resumen(resumenes_data, ruta_archivo="docs/resumen_fdi_bloque3.txt")
 
 
 # ==========================================
 # Simulación Monte Carlo para China
 # ==========================================
 
-# df_china = procesar_pais(df_limpio, "China")
-# media_china = df_china["FDI"].mean()
-# std_china = df_china["FDI"].std()
+# media_china, std_china = parametros_montecarlo_fdi(panel, ["China"])["China"]
 
 # df_simulado = simular_fdi("CHN", media_china, std_china, años=8, iteraciones=500)
 # print(df_simulado)
@@ -102,12 +107,10 @@ fdi_pais_objeto en Oracle"""
 # Conexión Oracle (Inserta los datos reales de la BBDD que quieras conectar)
 # connection_string = "usuario/contraseña@host:puerto/SID"
 
-# for nombre, codigo in paises_dict.items():
-#     df_pais = procesar_pais(df_limpio, "European Union")
-#     media = df_pais["FDI"].mean()
-#     std = df_pais["FDI"].std()
-
-#     df_simulado = simular_fdi("EUU", media, std, años=8, iteraciones=1000)
+# parametros = parametros_montecarlo_fdi(panel, {codigo: nombre for nombre, codigo
+#                                                 in paises_dict.items()})
+# for codigo, (media, std) in parametros.items():
+#     df_simulado = simular_fdi(codigo, media, std, años=8, iteraciones=1000)
     
 #     insertar_simulacion_oracle(df_simulado, connection_string)
 
@@ -140,3 +143,9 @@ fdi_pais_objeto en Oracle"""
 # # Insertar simulaciones
 # connection_string = "usuario/contraseña@host:puerto/SID"
 # insertar_simulaciones_empresas(connection_string, años=8, escenarios=1000)
+
+
+# Los gráficos se generan en procesos aparte: sin esta guarda, con spawn
+# (Windows, macOS) cada proceso volvería a ejecutar el script.
+if __name__ == "__main__":
+    main()
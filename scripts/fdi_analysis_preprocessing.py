@@ -1,7 +1,20 @@
+import hashlib
+import json
+import os
+import tempfile
+
 import pandas as pd
-import matplotlib.pyplot as plt 
 import numpy as np
 
+try:
+    from estadisticas_incrementales import AlmacenEstadisticas
+    from graficos import renderizar_comparativo, renderizar_fdi
+    from instrumentacion import instrumentar
+except ImportError:  # Importado como scripts.fdi_analysis_preprocessing.
+    from scripts.estadisticas_incrementales import AlmacenEstadisticas
+    from scripts.graficos import renderizar_comparativo, renderizar_fdi
+    from scripts.instrumentacion import instrumentar
+
 """
 En este script se realizarán las siguientes acciones:
     - Limpieza del DataFrame FDI
@@ -16,13 +29,32 @@ En este script se realizarán las siguientes acciones:
 # Funciones de limpieza de datos
 # =====================================
 
-def limpiar_datos_fdi(df):
+def columnas_años(df, año_inicio=2000, año_fin=None):
+    """
+    Columnas de año presentes en el DataFrame dentro del rango, en orden.
+
+    Args:
+        df (pd.DataFrame): DataFrame con un año por columna ('2000', '2001', ...).
+        año_inicio (int): Primer año a incluir.
+        año_fin (int | None): Último año a incluir; None = el último que
+            traiga el CSV.
+
+    Returns:
+        list: Nombres de columna (str) ordenados por año.
+    """
+    años = sorted(int(col) for col in df.columns if str(col).isdigit())
+    return [str(a) for a in años if a >= año_inicio and (año_fin is None or a <= año_fin)]
+
+
+@instrumentar("limpiar_datos_fdi", filas=lambda args, df: len(df))
+def limpiar_datos_fdi(df, año_inicio=2000, año_fin=None):
     """
     Limpia el DataFrame original del CSV:
     - Elimina columnas completamente vacías.
     - Convierte los valores FDI a float.
     - Elimina filas con todos los valores FDI nulos.
-    - Mantiene solo los años entre 2000 y 2022 (si están presentes).
+    - Mantiene solo los años entre año_inicio y año_fin (si están presentes);
+      con año_fin=None, hasta el último año con datos del CSV.
     """
 
     print(f"Shape original: {df.shape}")
@@ -31,8 +63,7 @@ def limpiar_datos_fdi(df):
     df = df.dropna(axis=1, how='all')
 
     # 2. Verifica qué columnas de año realmente están presentes
-    columnas_esperadas = [str(año) for año in range(2000, 2023)]
-    columnas_presentes = [col for col in columnas_esperadas if col in df.columns]
+    columnas_presentes = columnas_años(df, año_inicio, año_fin)
 
     # 3. Selecciona solo columnas válidas
     columnas_validas = ["Country Name", "Country Code"] + columnas_presentes
@@ -51,6 +82,141 @@ def limpiar_datos_fdi(df):
     return df
 
 
+# =====================================
+# Carga del panel limpio con caché columnar
+# =====================================
+
+# Se incrementa si cambia la lógica de limpiar_datos_fdi, para invalidar
+# las cachés generadas con la versión anterior.
+VERSION_LIMPIEZA = 1
+
+
+def _hash_fichero(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _escribir_atomico(ruta, escribir, binario=False):
+    """
+    Escribe con `escribir(f)` en un temporal del mismo directorio y lo
+    renombra a `ruta`: un fallo o una ejecución simultánea nunca deja el
+    fichero a medias.
+    """
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta) or ".", prefix=".tmp_")
+    try:
+        with (os.fdopen(descriptor, "wb") if binario
+              else os.fdopen(descriptor, "w", encoding="utf-8")) as f:
+            escribir(f)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _leer_json(ruta):
+    """Contenido de un JSON de la caché, o None si falta o está dañado."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _leer_cache_fdi(ruta_valores, ruta_meta):
+    """DataFrame de la caché, o None si falta o está dañada (se regenera)."""
+    meta = _leer_json(ruta_meta)
+    try:
+        valores = np.load(ruta_valores, mmap_mode="r")
+        if valores.shape != (len(meta["indice"]), len(meta["columnas"])):
+            return None
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+    df = pd.DataFrame(valores, columns=meta["columnas"], index=meta["indice"], copy=False)
+    df.insert(0, "Country Name", meta["paises"])
+    df.insert(1, "Country Code", meta["codigos"])
+    return df
+
+
+@instrumentar("cargar_fdi_limpio", filas=lambda args, df: len(df))
+def cargar_fdi_limpio(ruta_csv="data/fdi_inflows.csv", directorio_cache="data/cache",
+                      año_inicio=2000, año_fin=None):
+    """
+    Devuelve el DataFrame limpio del CSV del Banco Mundial usando una caché
+    en disco (.npy + metadatos JSON).
+
+    La caché se identifica por el hash del CSV y los parámetros de limpieza,
+    y solo se regenera cuando alguno cambia. Si el tamaño y la fecha de
+    modificación del CSV no han cambiado ni siquiera se recalcula el hash.
+    Los valores se abren como memmap, sin copiar ni parsear el CSV.
+
+    Cada fichero se escribe en un temporal y se renombra, con los metadatos
+    en último lugar; una caché incompleta o dañada se trata como un fallo
+    de caché y se regenera.
+
+    Args:
+        ruta_csv (str): Ruta del CSV original (con 4 filas de cabecera).
+        directorio_cache (str): Carpeta donde guardar la caché.
+        año_inicio (int): Primer año a conservar.
+        año_fin (int | None): Último año a conservar (None = el último del CSV).
+
+    Returns:
+        pd.DataFrame: Mismo resultado que limpiar_datos_fdi sobre el CSV.
+    """
+    os.makedirs(directorio_cache, exist_ok=True)
+    parametros = {"año_inicio": año_inicio, "año_fin": año_fin, "version": VERSION_LIMPIEZA}
+    estado = os.stat(ruta_csv)
+    ruta_indice = os.path.join(directorio_cache, "indice.json")
+
+    indice = _leer_json(ruta_indice)
+    if not isinstance(indice, dict):
+        indice = {}
+
+    # Índice: ruta del CSV -> tamaño, mtime y hash ya calculados.
+    origen = indice.get(os.path.abspath(ruta_csv))
+    if (isinstance(origen, dict) and origen.get("tamaño") == estado.st_size
+            and origen.get("mtime_ns") == estado.st_mtime_ns and origen.get("sha256")):
+        hash_csv = origen["sha256"]
+    else:
+        hash_csv = _hash_fichero(ruta_csv)
+
+    texto_clave = hash_csv + json.dumps(parametros, sort_keys=True)
+    clave = hashlib.sha256(texto_clave.encode()).hexdigest()[:16]
+    ruta_valores = os.path.join(directorio_cache, f"fdi_{clave}.npy")
+    ruta_meta = os.path.join(directorio_cache, f"fdi_{clave}.json")
+
+    df = _leer_cache_fdi(ruta_valores, ruta_meta)
+    if df is None:
+        limpio = limpiar_datos_fdi(pd.read_csv(ruta_csv, skiprows=4), año_inicio, año_fin)
+        columnas = [c for c in limpio.columns if c not in ("Country Name", "Country Code")]
+        valores = np.ascontiguousarray(limpio[columnas].to_numpy(dtype="float64"))
+        meta = {
+            "columnas": columnas,
+            "paises": limpio["Country Name"].tolist(),
+            "codigos": limpio["Country Code"].tolist(),
+            "indice": limpio.index.tolist(),
+            "parametros": parametros,
+        }
+        # Los metadatos al final: si existen, los valores ya están completos.
+        _escribir_atomico(ruta_valores, lambda f: np.save(f, valores), binario=True)
+        _escribir_atomico(ruta_meta, lambda f: json.dump(meta, f, ensure_ascii=False))
+        print(f"📦 Caché del panel FDI regenerada: {ruta_valores}")
+        df = _leer_cache_fdi(ruta_valores, ruta_meta)
+        if df is None:  # Sustituida entretanto por otra ejecución.
+            df = limpio
+
+    actual = {"tamaño": estado.st_size, "mtime_ns": estado.st_mtime_ns, "sha256": hash_csv}
+    if origen != actual:
+        indice[os.path.abspath(ruta_csv)] = actual
+        _escribir_atomico(ruta_indice, lambda f: json.dump(indice, f, ensure_ascii=False))
+
+    return df
+
+
 # =====================================
 # Funcion para la creacion de df por país.
 # =====================================
@@ -79,6 +245,132 @@ def procesar_pais(df, nombre_pais):
 
     return pais
 
+# =====================================
+# Panel largo (país, año) construido en una sola pasada.
+# =====================================
+
+@instrumentar("construir_panel_largo", filas=lambda args, panel: len(panel))
+def construir_panel_largo(df, año_inicio=2000, año_fin=None):
+    """
+    Convierte el DataFrame limpio (un país por fila, un año por columna) en
+    un panel largo indexado por (país, año), sin valores nulos.
+
+    Sustituye a llamar procesar_pais una vez por país: el reshape se hace
+    una sola vez para todos los países.
+
+    Args:
+        df (pd.DataFrame): DataFrame limpio (salida de limpiar_datos_fdi).
+        año_inicio (int): Primer año a incluir.
+        año_fin (int | None): Último año a incluir (None = el último presente).
+
+    Returns:
+        pd.DataFrame: Índice ['Country Name', 'Año'] y columnas
+        ['Country Code', 'FDI'], ordenado por país y año.
+    """
+    columnas = columnas_años(df, año_inicio, año_fin)
+    valores = df[columnas].to_numpy(dtype="float64")
+    presentes = ~np.isnan(valores)
+    filas, posiciones = np.nonzero(presentes)
+
+    panel = pd.DataFrame({
+        "Country Name": df["Country Name"].to_numpy()[filas],
+        "Año": np.array(columnas, dtype=int)[posiciones],
+        "Country Code": df["Country Code"].to_numpy()[filas],
+        "FDI": valores[presentes],
+    })
+    return panel.set_index(["Country Name", "Año"])
+
+
+def serie_pais(panel, nombre_pais):
+    """
+    Extrae un país del panel largo con el mismo formato que procesar_pais.
+
+    Returns:
+        pd.DataFrame: DataFrame con columnas 'Año' y 'FDI'.
+    """
+    return panel.loc[nombre_pais, ["FDI"]].reset_index()
+
+
+# =====================================
+# Estadísticas incrementales persistidas
+# =====================================
+
+# Se incrementa si cambia el formato de estadisticas_incrementales, para
+# descartar el estado guardado con la versión anterior.
+VERSION_ESTADISTICAS = 1
+
+
+def cargar_estadisticas_fdi(panel, directorio_cache="data/cache"):
+    """
+    Devuelve el almacén de estadísticas incrementales al día con el panel.
+
+    Lee el estado guardado en `directorio_cache`, le añade solo los años
+    nuevos de cada país (los revisados se reconstruyen, ver
+    AlmacenEstadisticas.actualizar_desde_panel) y, si ha cambiado, lo
+    vuelve a escribir de forma atómica. Un fichero dañado o de otra
+    versión se trata como vacío.
+
+    Args:
+        panel (pd.DataFrame): Panel largo completo (construir_panel_largo).
+        directorio_cache (str): Carpeta de la caché.
+
+    Returns:
+        AlmacenEstadisticas: Estado de todos los países del panel.
+    """
+    os.makedirs(directorio_cache, exist_ok=True)
+    ruta = os.path.join(directorio_cache, "estadisticas_fdi.json")
+
+    datos = _leer_json(ruta)
+    almacen = None
+    if isinstance(datos, dict) and datos.get("version") == VERSION_ESTADISTICAS:
+        try:
+            almacen = AlmacenEstadisticas.desde_dict(datos["paises"])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            almacen = None
+    regenerado = almacen is None
+    if regenerado:
+        almacen = AlmacenEstadisticas()
+
+    paises_antes = set(almacen.paises)
+    añadidas = almacen.actualizar_desde_panel(panel)
+    if regenerado or añadidas or set(almacen.paises) != paises_antes:
+        contenido = {"version": VERSION_ESTADISTICAS, "paises": almacen.a_dict()}
+        _escribir_atomico(ruta, lambda f: json.dump(contenido, f, ensure_ascii=False))
+        print(f"📦 Estadísticas incrementales: {añadidas} observaciones nuevas ({ruta}).")
+    return almacen
+
+
+def parametros_montecarlo_fdi(panel, paises=None, directorio_cache="data/cache"):
+    """
+    Media y desviación estándar (ddof=1, como df["FDI"].std()) de cada país
+    para simular_fdi / simular_paises_paralelo, desde el almacén incremental.
+
+    Args:
+        panel (pd.DataFrame): Panel largo completo (construir_panel_largo).
+        paises (dict | list | None): {clave: nombre en el panel} (p. ej.
+            {"ESP": "Spain"}), lista de nombres o None para todos.
+        directorio_cache (str): Carpeta de la caché.
+
+    Returns:
+        dict: {clave: (media, desviacion)}.
+
+    Raises:
+        KeyError: Si algún país no tiene datos en el panel.
+    """
+    almacen = cargar_estadisticas_fdi(panel, directorio_cache)
+    if paises is None:
+        paises = list(almacen.paises)
+    if not isinstance(paises, dict):
+        paises = {nombre: nombre for nombre in paises}
+
+    parametros = {}
+    for clave, nombre in paises.items():
+        if nombre not in almacen.paises:
+            raise KeyError(f"Sin datos FDI para {nombre!r} en el panel.")
+        parametros[clave] = almacen.paises[nombre].parametros_montecarlo()
+    return parametros
+
+
 # =====================================
 # Funciones para el cálculo estadístico por país.
 # =====================================
@@ -137,6 +429,69 @@ def analizar_fdi(df, nombre_filtro, nombre_visible):
     resumen = resumen_estadistico_fdi(df_pais, nombre_visible)
     return df_pais, resumen  
 
+
+COLUMNAS_RESUMEN = ["promedio", "mediana", "rango", "desviacion_estandar", "VaR_5",
+                    "BestCase_95", "variacion_yoy_promedio"]
+
+
+@instrumentar("analizar_fdi_lote", filas=lambda args, resumen: len(resumen))
+def analizar_fdi_lote(df, paises=None, directorio_cache="data/cache"):
+    """
+    Calcula las métricas de resumen_estadistico_fdi para muchos países.
+
+    Por defecto se leen del almacén incremental (cargar_estadisticas_fdi),
+    que solo procesa los años nuevos desde la última ejecución; con
+    directorio_cache=None se recalculan en una sola pasada agrupada y
+    vectorizada sobre todo el panel.
+
+    Args:
+        df (pd.DataFrame): DataFrame limpio o panel largo (construir_panel_largo).
+        paises (dict | list | None): {nombre_visible: nombre_filtro}, lista de
+            nombres o None para todos los países del panel.
+        directorio_cache (str | None): Carpeta del almacén incremental.
+
+    Returns:
+        pd.DataFrame: Una fila por país con las columnas promedio, mediana,
+        rango, desviacion_estandar, VaR_5, BestCase_95 y
+        variacion_yoy_promedio. `resultado.to_dict("index")` tiene el formato
+        que espera generar_resumen.
+    """
+    panel = df if isinstance(df.index, pd.MultiIndex) else construir_panel_largo(df)
+
+    if paises is None:
+        filtros = panel.index.get_level_values(0).unique()
+        visibles = filtros
+    else:
+        if not isinstance(paises, dict):
+            paises = {nombre: nombre for nombre in paises}
+        visibles = list(paises.keys())
+        filtros = list(paises.values())
+
+    if directorio_cache is not None:
+        almacen = cargar_estadisticas_fdi(panel, directorio_cache)
+        resumen = pd.DataFrame.from_dict(
+            {f: almacen.paises[f].resumen() for f in filtros if f in almacen.paises},
+            orient="index", columns=COLUMNAS_RESUMEN,
+        )
+    else:
+        panel = panel[panel.index.get_level_values(0).isin(filtros)]
+        grupos = panel["FDI"].groupby(level=0, sort=False)
+        diff_yoy = grupos.diff().fillna(0)
+
+        resumen = pd.DataFrame({
+            "promedio": grupos.mean(),
+            "mediana": grupos.median(),
+            "rango": grupos.max() - grupos.min(),
+            "desviacion_estandar": grupos.std(),
+            "VaR_5": grupos.quantile(0.05),
+            "BestCase_95": grupos.quantile(0.95),
+            "variacion_yoy_promedio": diff_yoy.groupby(level=0, sort=False).mean(),
+        })
+
+    resumen = resumen.reindex(index=filtros, columns=COLUMNAS_RESUMEN)
+    resumen.index = pd.Index(visibles, name="pais")
+    return resumen
+
 """Funciones para la creación de gráficos"""
 
 # =====================================
@@ -148,22 +503,18 @@ def graficar_fdi(df_pais, nombre_pais, ruta_salida):
     """
     Genera un gráfico de líneas con la evolución del FDI.
 
+    Si la imagen ya existe y se dibujó con los mismos datos no se vuelve a
+    generar (ver graficos.py).
+
     Args:
         df_pais (pd.DataFrame): DataFrame con columnas 'Año' y 'FDI'.
         nombre_pais (str): Nombre del país.
         ruta_salida (str): Ruta donde guardar la imagen .png.
+
+    Returns:
+        bool: True si se ha generado la imagen, False si estaba al día.
     """
-    plt.figure(figsize=(10, 6))
-    plt.plot(df_pais["Año"], df_pais["FDI"], marker='o', label=nombre_pais)
-    plt.axhline(df_pais["FDI"].mean(), color='red', linestyle='--', label='Promedio')
-    plt.title(f"Flujo de Inversión Extranjera Directa (% PIB) - {nombre_pais}")
-    plt.xlabel("Año")
-    plt.ylabel("FDI (% PIB)")
-    plt.legend()
-    plt.grid(True)
-    print(f"📁 Guardando gráfica en: {ruta_salida}")
-    plt.savefig(ruta_salida)
-    plt.close()
+    return renderizar_fdi(df_pais, nombre_pais, ruta_salida)
 
 
 
@@ -179,20 +530,11 @@ def graficar_comparativo(paises_data, ruta_salida):
     Args:
         paises_data (dict): Diccionario con clave el nombre visible del país y valor su DataFrame.
         ruta_salida (str): Ruta para guardar la imagen comparativa.
+
+    Returns:
+        bool: True si se ha generado la imagen, False si estaba al día.
     """
-    plt.figure(figsize=(12, 6))
-    
-    for nombre_pais, df in paises_data.items():
-        plt.plot(df["Año"], df["FDI"], marker='o', label=nombre_pais)
-
-    plt.title("Comparación FDI (% del PIB) - 2000 a 2022")
-    plt.xlabel("Año")
-    plt.ylabel("FDI (% PIB)")
-    plt.legend()
-    plt.grid(True)
-    print(f"📊 Guardando gráfico comparativo en: {ruta_salida}")
-    plt.savefig(ruta_salida)
-    plt.close()
+    return renderizar_comparativo(paises_data, ruta_salida)
 
 """Función para almacenar el resumen estadístico"""
 
@@ -0,0 +1,115 @@
+import argparse
+from contextlib import contextmanager
+
+from almacenamiento import abrir_almacenamiento
+
+"""
+Generación de alertas por conjuntos, tras cada carga.
+
+Los triggers FOR EACH ROW trg_alerta_zscore y trg_alerta_montecarlo lanzan
+un INSERT por cada fila cargada, lo que anula buena parte de la ventaja del
+array DML. Durante una carga masiva se desactivan en la sesión de la carga
+(pkg_control_alertas en Oracle, alerta_activa() en SQLite); las filas se etiquetan
+con el id_carga de la tabla 'cargas' y al terminar se generan todas sus
+alertas con un único INSERT ... SELECT, usando los umbrales de
+'umbrales_alerta' (Z-Score general o por sector y rango del FDI).
+
+Uso:
+    python scripts/generacion_alertas.py sqlite:///data/fdi.db --carga 12 --tabla zscore_empresas
+    python scripts/generacion_alertas.py usuario/contraseña@host:puerto/SID --umbral-zscore 1.5 --sector Energía
+    python scripts/generacion_alertas.py usuario/contraseña@host:puerto/SID --umbral-fdi -1 12
+"""
+
+# Método de Almacenamiento que genera las alertas de cada tabla.
+GENERADORES = {
+    "zscore_empresas": "generar_alertas_zscore",
+    "simulaciones_montecarlo": "generar_alertas_simulacion",
+}
+
+
+def generar_alertas(almacenamiento, tabla, id_carga):
+    """
+    Genera en una sola sentencia las alertas de una carga.
+
+    Args:
+        almacenamiento (Almacenamiento): Conexión abierta.
+        tabla (str): 'zscore_empresas' o 'simulaciones_montecarlo'.
+        id_carga (int): Carga cuyas filas se evalúan.
+
+    Returns:
+        int: Alertas generadas.
+    """
+    return getattr(almacenamiento, GENERADORES[tabla])(id_carga)
+
+
+@contextmanager
+def carga_con_alertas(almacenamiento, tabla, triggers_fila=False):
+    """
+    Registra una carga en `tabla` y, si termina sin errores, genera sus
+    alertas por conjuntos. Mientras dura, los triggers de fila de la tabla
+    están desactivados solo en esta sesión, así que otras cargas simultáneas
+    no se ven afectadas.
+
+    Args:
+        almacenamiento (Almacenamiento): Conexión abierta.
+        tabla (str): 'zscore_empresas' o 'simulaciones_montecarlo'.
+        triggers_fila (bool): Si es True se mantienen los triggers de fila y
+            no se genera nada al final (comportamiento anterior).
+
+    Yields:
+        dict: {"id_carga": int, "alertas": int | None}; "alertas" se rellena
+        al salir del bloque.
+    """
+    carga = {"id_carga": almacenamiento.nueva_carga(tabla), "alertas": None}
+    if triggers_fila:
+        yield carga
+        return
+
+    almacenamiento.activar_triggers_alertas(False, tabla)
+    try:
+        yield carga
+        carga["alertas"] = generar_alertas(almacenamiento, tabla, carga["id_carga"])
+        almacenamiento.confirmar()
+    except Exception:
+        # Las filas de la carga aún no confirmadas siguen en la transacción
+        # de esta conexión, que sobrevive al bloque (el que llama sigue
+        # usándola o vuelve al pool de la API): el siguiente confirmar()
+        # las guardaría sin alertas. Los lotes ya confirmados por commit_cada
+        # se quedan y sus alertas se generan con --carga.
+        almacenamiento.revertir()
+        print(f"❌ Carga {carga['id_carga']} interrumpida: sus alertas no se han generado "
+              f"(python scripts/generacion_alertas.py ... --carga {carga['id_carga']} "
+              f"--tabla {tabla}).")
+        raise
+    finally:
+        almacenamiento.activar_triggers_alertas(True, tabla)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alertas por carga y umbrales de alerta")
+    parser.add_argument("connection_string")
+    parser.add_argument("--carga", type=int, help="id_carga cuyas alertas se generan")
+    parser.add_argument("--tabla", choices=sorted(GENERADORES), default="zscore_empresas")
+    parser.add_argument("--umbral-zscore", type=float, help="Alerta si el Z-Score es menor")
+    parser.add_argument("--sector", help="Sector al que se aplica --umbral-zscore")
+    parser.add_argument("--umbral-fdi", type=float, nargs=2, metavar=("MINIMO", "MAXIMO"),
+                        help="Alerta si el FDI simulado queda fuera del rango")
+    args = parser.parse_args(argv)
+
+    with abrir_almacenamiento(args.connection_string) as almacenamiento:
+        if args.umbral_zscore is not None:
+            almacenamiento.fijar_umbral_alerta("zscore", minimo=args.umbral_zscore,
+                                               sector=args.sector)
+            print(f"✅ Umbral de Z-Score {'de ' + args.sector if args.sector else 'general'}: "
+                  f"{args.umbral_zscore}")
+        if args.umbral_fdi is not None:
+            almacenamiento.fijar_umbral_alerta("fdi", *args.umbral_fdi)
+            print(f"✅ Rango de FDI sin alerta: {args.umbral_fdi[0]} a {args.umbral_fdi[1]}")
+        if args.carga is not None:
+            alertas = generar_alertas(almacenamiento, args.tabla, args.carga)
+            print(f"✅ Carga {args.carga}: {alertas} alertas generadas.")
+        almacenamiento.confirmar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+
+try:
+    from ejecucion_paralela import ejecutar_en_paralelo
+    from instrumentacion import instrumentar
+except ImportError:  # Importado como scripts.graficos.
+    from scripts.ejecucion_paralela import ejecutar_en_paralelo
+    from scripts.instrumentacion import instrumentar
+
+"""
+Generación de los gráficos de los informes FDI.
+
+    - Usa la API orientada a objetos de matplotlib (Figure + lienzo Agg) en
+      lugar del estado global de pyplot, así que es segura en procesos
+      trabajadores y permite dibujar muchos países en paralelo.
+    - Junto a cada imagen guarda un fichero .sha256 con la huella de los
+      datos y etiquetas con que se dibujó; si no han cambiado, la imagen no
+      se vuelve a generar.
+    - matplotlib solo se importa al dibujar la primera figura, no al
+      importar este módulo ni fdi_analysis_preprocessing.
+"""
+
+# Cambiar al modificar el estilo de los gráficos, para invalidar las huellas.
+VERSION_GRAFICOS = 1
+
+# Por debajo de este número de gráficos pendientes se dibujan en el propio
+# proceso: arrancar el pool cuesta más que lo que se ahorra.
+MINIMO_GRAFICOS_PARALELO = 8
+
+
+# =====================================
+# Huella de los datos
+# =====================================
+
+def huella_grafico(tipo, series, **etiquetas):
+    """
+    Huella SHA-256 de lo que se dibuja en un gráfico.
+
+    Args:
+        tipo (str): Tipo de gráfico ('pais', 'comparativo').
+        series (dict): {etiqueta: DataFrame con columnas 'Año' y 'FDI'}.
+        **etiquetas: Textos adicionales que aparecen en la imagen.
+
+    Returns:
+        str: Huella hexadecimal.
+    """
+    sha = hashlib.sha256()
+    sha.update(json.dumps([VERSION_GRAFICOS, tipo, etiquetas], sort_keys=True,
+                          ensure_ascii=False).encode("utf-8"))
+    for nombre, df in series.items():
+        sha.update(str(nombre).encode("utf-8"))
+        sha.update(df["Año"].to_numpy(dtype="int64").tobytes())
+        sha.update(df["FDI"].to_numpy(dtype="float64").tobytes())
+    return sha.hexdigest()
+
+
+def _ruta_huella(ruta_salida):
+    return ruta_salida + ".sha256"
+
+
+def esta_actualizado(ruta_salida, huella):
+    """True si la imagen existe y se dibujó con los mismos datos."""
+    if not os.path.exists(ruta_salida):
+        return False
+    try:
+        with open(_ruta_huella(ruta_salida), encoding="utf-8") as f:
+            return f.read().strip() == huella
+    except OSError:
+        return False
+
+
+def _guardar(figura, ruta_salida, huella):
+    figura.savefig(ruta_salida)
+    with open(_ruta_huella(ruta_salida), "w", encoding="utf-8") as f:
+        f.write(huella)
+
+
+def _figura(figsize):
+    # Import diferido: solo los procesos que dibujan cargan matplotlib.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figura = Figure(figsize=figsize)
+    FigureCanvasAgg(figura)
+    return figura, figura.add_subplot()
+
+
+# =====================================
+# Gráficos
+# =====================================
+
+def renderizar_fdi(df_pais, nombre_pais, ruta_salida, forzar=False):
+    """
+    Gráfico de líneas con la evolución del FDI de un país.
+
+    Args:
+        df_pais (pd.DataFrame): DataFrame con columnas 'Año' y 'FDI'.
+        nombre_pais (str): Nombre del país.
+        ruta_salida (str): Ruta donde guardar la imagen .png.
+        forzar (bool): Dibujar aunque los datos no hayan cambiado.
+
+    Returns:
+        bool: True si se ha generado la imagen, False si estaba al día.
+    """
+    huella = huella_grafico("pais", {nombre_pais: df_pais})
+    if not forzar and esta_actualizado(ruta_salida, huella):
+        return False
+
+    figura, ax = _figura((10, 6))
+    ax.plot(df_pais["Año"], df_pais["FDI"], marker='o', label=nombre_pais)
+    ax.axhline(df_pais["FDI"].mean(), color='red', linestyle='--', label='Promedio')
+    ax.set_title(f"Flujo de Inversión Extranjera Directa (% PIB) - {nombre_pais}")
+    ax.set_xlabel("Año")
+    ax.set_ylabel("FDI (% PIB)")
+    ax.legend()
+    ax.grid(True)
+    print(f"📁 Guardando gráfica en: {ruta_salida}")
+    _guardar(figura, ruta_salida, huella)
+    return True
+
+
+def renderizar_comparativo(paises_data, ruta_salida, titulo=None, forzar=False):
+    """
+    Gráfico comparativo de FDI para múltiples países.
+
+    Args:
+        paises_data (dict): Diccionario con clave el nombre visible del país y valor su DataFrame.
+        ruta_salida (str): Ruta para guardar la imagen comparativa.
+        titulo (str | None): Título del gráfico; por defecto indica los años
+            que abarcan los datos.
+        forzar (bool): Dibujar aunque los datos no hayan cambiado.
+
+    Returns:
+        bool: True si se ha generado la imagen, False si estaba al día.
+    """
+    if titulo is None:
+        años = [a for df in paises_data.values() for a in (df["Año"].min(), df["Año"].max())]
+        titulo = "Comparación FDI (% del PIB)"
+        if años:
+            titulo += f" - {min(años)} a {max(años)}"
+    huella = huella_grafico("comparativo", paises_data, titulo=titulo)
+    if not forzar and esta_actualizado(ruta_salida, huella):
+        return False
+
+    figura, ax = _figura((12, 6))
+    for nombre_pais, df in paises_data.items():
+        ax.plot(df["Año"], df["FDI"], marker='o', label=nombre_pais)
+
+    ax.set_title(titulo)
+    ax.set_xlabel("Año")
+    ax.set_ylabel("FDI (% PIB)")
+    ax.legend()
+    ax.grid(True)
+    print(f"📊 Guardando gráfico comparativo en: {ruta_salida}")
+    _guardar(figura, ruta_salida, huella)
+    return True
+
+
+def _tarea_renderizar(tarea, semilla):
+    df_pais, nombre_pais, ruta_salida = tarea
+    return renderizar_fdi(df_pais, nombre_pais, ruta_salida, forzar=True)
+
+
+@instrumentar("renderizar_paises", filas=lambda args, res: res["generadas"])
+def renderizar_paises(paises_data, directorio="img", procesos=None, forzar=False,
+                      plantilla="fdi_{nombre}.png"):
+    """
+    Dibuja el gráfico de cada país en paralelo, saltando los que no han cambiado.
+
+    Las huellas se comprueban en el proceso principal y solo se reparten
+    entre procesos los gráficos que hay que volver a generar (si son menos
+    de MINIMO_GRAFICOS_PARALELO se dibujan en este proceso). Con procesos,
+    el script que llama debe estar protegido con if __name__ == "__main__".
+
+    Args:
+        paises_data (dict): {nombre del país: DataFrame con 'Año' y 'FDI'}.
+        directorio (str): Carpeta de salida.
+        procesos (int | None): Procesos a usar (None = todos los núcleos).
+        forzar (bool): Dibujar todos aunque los datos no hayan cambiado.
+        plantilla (str): Nombre de fichero de cada país.
+
+    Returns:
+        dict: {"generadas": int, "sin_cambios": int}
+    """
+    os.makedirs(directorio, exist_ok=True)
+    pendientes = []
+    for nombre_pais, df in paises_data.items():
+        ruta = os.path.join(directorio, plantilla.format(nombre=nombre_pais.replace(" ", "_")))
+        if forzar or not esta_actualizado(ruta, huella_grafico("pais", {nombre_pais: df})):
+            pendientes.append((df, nombre_pais, ruta))
+
+    if len(pendientes) < MINIMO_GRAFICOS_PARALELO:
+        procesos = 1
+    generadas = sum(ejecutar_en_paralelo(_tarea_renderizar, pendientes, procesos=procesos))
+    sin_cambios = len(paises_data) - len(pendientes)
+    print(f"✅ Gráficos: {generadas} generados, {sin_cambios} sin cambios.")
+    return {"generadas": generadas, "sin_cambios": sin_cambios}
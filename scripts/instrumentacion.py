@@ -0,0 +1,229 @@
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+"""
+Instrumentación ligera del pipeline y de la API.
+
+Registra spans (tiempo y filas) de cada etapa y de cada llamada a la BBDD
+como histogramas, que se exponen en formato Prometheus (/metrics de la API)
+o se vuelcan como perfil JSON al terminar un proceso por lotes.
+
+Se activa con FDI_METRICAS=1 (o llamando a activar()). Desactivada, medir()
+devuelve un span nulo compartido y instrumentar() llama directamente a la
+función, así que el coste es una comprobación de un booleano.
+
+Con FDI_PERFIL=ruta.json el perfil del proceso se guarda al salir.
+"""
+
+# Límites (segundos) de los histogramas, como los de los clientes de Prometheus.
+LIMITES_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_activa = os.getenv("FDI_METRICAS", "0").lower() in ("1", "true", "si", "sí")
+_lock = threading.Lock()
+_histogramas = {}
+_filas = {}
+_indicadores = {}
+
+
+class Histograma:
+    """Histograma acumulativo con límites fijos."""
+
+    __slots__ = ("limites", "cubetas", "suma", "cuenta", "maximo")
+
+    def __init__(self, limites=LIMITES_SEGUNDOS):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.cuenta = 0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+        self.maximo = max(self.maximo, valor)
+
+
+def activar(activa=True):
+    global _activa
+    _activa = activa
+
+
+def esta_activa():
+    return _activa
+
+
+def observar(nombre, segundos, filas=0, **etiquetas):
+    """Añade una observación al histograma `nombre` con sus etiquetas."""
+    if not _activa:
+        return
+    clave = (nombre, tuple(sorted(etiquetas.items())))
+    with _lock:
+        histograma = _histogramas.get(clave)
+        if histograma is None:
+            histograma = _histogramas[clave] = Histograma()
+        histograma.observar(segundos)
+        if filas:
+            _filas[clave] = _filas.get(clave, 0) + filas
+
+
+class Span:
+    __slots__ = ("nombre", "etiquetas", "filas", "_inicio")
+
+    def __init__(self, nombre, etiquetas, filas=0):
+        self.nombre = nombre
+        self.etiquetas = etiquetas
+        self.filas = filas
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observar(self.nombre, time.perf_counter() - self._inicio, self.filas, **self.etiquetas)
+
+
+class _SpanNulo:
+    __slots__ = ()
+    filas = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def __setattr__(self, nombre, valor):
+        pass  # `span.filas += n` no hace nada con la instrumentación desactivada.
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+def medir(nombre, filas=0, **etiquetas):
+    """
+    Span de tiempo para usar con `with`. El número de filas puede fijarse al
+    crearlo o acumularse dentro del bloque con `span.filas += n`.
+    """
+    if not _activa:
+        return _SPAN_NULO
+    return Span(nombre, etiquetas, filas)
+
+
+def instrumentar(nombre, filas=None):
+    """
+    Decorador que mide cada llamada a la función como un span `nombre`.
+
+    Args:
+        nombre (str): Nombre del span.
+        filas (callable | None): Función (args, resultado) -> nº de filas.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activa:
+                return funcion(*args, **kwargs)
+            with medir(nombre) as span:
+                resultado = funcion(*args, **kwargs)
+                if filas is not None:
+                    span.filas = filas(args, resultado)
+            return resultado
+        return envoltura
+    return decorador
+
+
+def registrar_indicador(nombre, funcion):
+    """Valor instantáneo (gauge) que se lee al exportar, p. ej. conexiones ocupadas."""
+    _indicadores[nombre] = funcion
+
+
+def _escapar_valor_etiqueta(valor):
+    # Formato de exposición: en los valores de etiqueta solo se escapan
+    # la barra invertida, las comillas dobles y el salto de línea.
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas_prometheus(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar_valor_etiqueta(v)}"' for k, v in pares) + "}"
+
+
+def exportar_prometheus():
+    """Texto en el formato de exposición de Prometheus (0.0.4)."""
+    with _lock:
+        histogramas = {clave: (list(h.cubetas), h.suma, h.cuenta, h.limites)
+                       for clave, h in _histogramas.items()}
+        filas = dict(_filas)
+
+    lineas = []
+    tipos_emitidos = set()
+    for (nombre, etiquetas), (cubetas, suma, cuenta, limites) in sorted(histogramas.items()):
+        metrica = f"fdi_{nombre.replace('.', '_')}_segundos"
+        if metrica not in tipos_emitidos:
+            lineas.append(f"# TYPE {metrica} histogram")
+            tipos_emitidos.add(metrica)
+        acumulado = 0
+        for limite, n in zip(list(limites) + ["+Inf"], cubetas):
+            acumulado += n
+            lineas.append(f"{metrica}_bucket"
+                          f"{_etiquetas_prometheus(etiquetas, [('le', limite)])} {acumulado}")
+        lineas.append(f"{metrica}_sum{_etiquetas_prometheus(etiquetas)} {suma}")
+        lineas.append(f"{metrica}_count{_etiquetas_prometheus(etiquetas)} {cuenta}")
+
+    for (nombre, etiquetas), total in sorted(filas.items()):
+        metrica = f"fdi_{nombre.replace('.', '_')}_filas_total"
+        if metrica not in tipos_emitidos:
+            lineas.append(f"# TYPE {metrica} counter")
+            tipos_emitidos.add(metrica)
+        lineas.append(f"{metrica}{_etiquetas_prometheus(etiquetas)} {total}")
+
+    for nombre, funcion in sorted(_indicadores.items()):
+        valor = funcion()
+        if valor is not None:
+            lineas.append(f"# TYPE fdi_{nombre} gauge")
+            lineas.append(f"fdi_{nombre} {valor}")
+
+    return "\n".join(lineas) + "\n"
+
+
+def perfil():
+    """Resumen por span: llamadas, tiempo total, medio y máximo, y filas."""
+    with _lock:
+        resultado = {}
+        for (nombre, etiquetas), h in sorted(_histogramas.items()):
+            clave = nombre + _etiquetas_prometheus(etiquetas)
+            filas = _filas.get((nombre, etiquetas), 0)
+            resultado[clave] = {
+                "llamadas": h.cuenta,
+                "segundos": round(h.suma, 6),
+                "medio_s": round(h.suma / h.cuenta, 6) if h.cuenta else 0.0,
+                "maximo_s": round(h.maximo, 6),
+                "filas": filas,
+                "filas_s": round(filas / h.suma, 1) if filas and h.suma > 0 else None,
+            }
+        return resultado
+
+
+def volcar_perfil(ruta):
+    """Guarda el perfil de la ejecución en JSON, de la etapa más lenta a la más rápida."""
+    datos = dict(sorted(perfil().items(), key=lambda par: -par[1]["segundos"]))
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    print(f"📁 Perfil de la ejecución guardado en: {ruta}")
+
+
+def reiniciar():
+    with _lock:
+        _histogramas.clear()
+        _filas.clear()
+
+
+if _activa and os.getenv("FDI_PERFIL"):
+    atexit.register(volcar_perfil, os.getenv("FDI_PERFIL"))
@@ -0,0 +1,219 @@
+import warnings
+from statistics import NormalDist
+
+import numpy as np
+
+"""
+Estrategias de muestreo para las simulaciones de Monte Carlo.
+
+Todas devuelven normales estándar N(0, 1) con forma (escenarios, años); cada
+motor las escala con su media y desviación:
+    - "iid": muestreo independiente (el comportamiento original).
+    - "antitetico": cada escenario z se acompaña de su opuesto -z.
+    - "lhs": hipercubo latino, un valor por estrato de probabilidad en cada año.
+    - "sobol": secuencia de Sobol aleatorizada (quasi-Monte Carlo; requiere scipy).
+
+Los escenarios se generan en `replicas` bloques independientes con el mismo
+diseño. El error estándar de cualquier estimador (media, VaR 5%) se obtiene
+de la dispersión de su valor entre bloques, lo que vale también para LHS y
+Sobol, donde la fórmula iid no es aplicable.
+
+simular_hasta_convergencia usa esos mismos bloques (medias por lotes) para
+decidir cuántos escenarios hacen falta: añade bloques hasta que el intervalo
+de confianza de la media y del VaR 5% de cada año es lo bastante estrecho.
+"""
+
+METODOS = ("iid", "antitetico", "lhs", "sobol")
+
+
+def _inversa_normal(u):
+    """Inversa de la función de distribución N(0, 1) sobre un array."""
+    try:
+        from scipy.special import ndtri
+    except ImportError:  # Sin scipy: más lento, mismo resultado.
+        return np.vectorize(NormalDist().inv_cdf, otypes=[float])(u)
+    return ndtri(u)
+
+
+def _bloque(n, d, metodo, rng):
+    if metodo == "iid":
+        return rng.standard_normal((n, d))
+
+    if metodo == "antitetico":
+        z = rng.standard_normal((-(-n // 2), d))
+        return np.concatenate([z, -z])[:n]
+
+    if metodo == "lhs":
+        # Un punto uniforme dentro de cada uno de los n estratos, con los
+        # estratos permutados de forma independiente en cada dimensión.
+        estratos = rng.permuted(np.tile(np.arange(n), (d, 1)), axis=1).T
+        return _inversa_normal((estratos + rng.random((n, d))) / n)
+
+    if metodo == "sobol":
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            raise ImportError("El muestreo 'sobol' necesita scipy (pip install scipy).")
+        motor = qmc.Sobol(d, scramble=True, seed=rng)
+        with warnings.catch_warnings():
+            # Con n que no es potencia de 2 se pierde algo de equilibrio, no validez.
+            warnings.simplefilter("ignore", UserWarning)
+            u = motor.random(n)
+        return _inversa_normal(np.clip(u, 1e-12, 1 - 1e-12))
+
+    raise ValueError(f"Método de muestreo desconocido: {metodo!r}. Opciones: {METODOS}")
+
+
+def muestrear_normales(n, d, metodo="iid", rng=None, replicas=1):
+    """
+    Matriz (n, d) de normales estándar generada con el método indicado.
+
+    Args:
+        n (int): Escenarios.
+        d (int): Dimensiones (años).
+        metodo (str): Uno de METODOS.
+        rng (np.random.Generator | int | None): Generador o semilla.
+        replicas (int): Bloques independientes en que se reparten los
+            escenarios (filas consecutivas), para estimar el error estándar.
+
+    Returns:
+        np.ndarray: Matriz (n, d).
+    """
+    rng = np.random.default_rng(rng)
+    tamaños = np.diff(np.linspace(0, n, min(replicas, n) + 1).astype(int))
+    return np.concatenate([_bloque(int(t), d, metodo, rng) for t in tamaños])
+
+
+def error_estandar(matriz, replicas, estadistico):
+    """
+    Estimación y error estándar de `estadistico` por columnas.
+
+    Args:
+        matriz (np.ndarray): Escenarios (filas) generados con muestrear_normales
+            y el mismo número de réplicas.
+        replicas (int): Bloques independientes de la matriz.
+        estadistico (callable): Función (bloque, axis=0) -> array por columna.
+
+    Returns:
+        tuple: (estimación sobre toda la matriz, error estándar) por columna.
+    """
+    estimacion = estadistico(matriz, axis=0)
+    replicas = min(replicas, len(matriz))
+    if replicas < 2:
+        return estimacion, np.full_like(estimacion, np.nan, dtype="float64")
+
+    limites = np.linspace(0, len(matriz), replicas + 1).astype(int)
+    por_bloque = np.array([estadistico(matriz[i:j], axis=0)
+                           for i, j in zip(limites[:-1], limites[1:])])
+    return estimacion, por_bloque.std(axis=0, ddof=1) / np.sqrt(replicas)
+
+
+def _var_5(valores, axis=0):
+    return np.percentile(valores, 5, axis=axis)
+
+
+def resumen_error(matriz, replicas, metodo):
+    """
+    Media y VaR 5% por año con su error estándar, en el formato que se
+    guarda en los atributos del resultado (df.attrs / CuboEscenarios.meta).
+    """
+    resumen = {"metodo": metodo, "replicas": replicas}
+    for nombre, estadistico in (("media", np.mean), ("VaR_5", _var_5)):
+        estimacion, error = error_estandar(matriz, replicas, estadistico)
+        resumen[nombre] = np.round(estimacion, 6).tolist()
+        resumen[f"error_{nombre}"] = np.round(error, 6).tolist()
+    return resumen
+
+
+def simular_hasta_convergencia(generar_bloque, tam_bloque=100, maximo=20_000, precision=0.02,
+                               tolerancia=0.0, confianza=0.95, minimo_bloques=5, rng=None):
+    """
+    Simula por bloques hasta alcanzar la precisión pedida o el máximo de
+    escenarios.
+
+    Se para cuando, en todos los años, la semiamplitud del intervalo de
+    confianza de la media y del VaR 5% es menor que
+    max(precision * |estimación|, tolerancia). El intervalo se calcula con
+    medias por lotes: cada bloque es una estimación independiente.
+
+    Args:
+        generar_bloque (callable): (n, rng) -> matriz (n, años) con n
+            escenarios nuevos.
+        tam_bloque (int): Escenarios por bloque. Si con él no caben
+            `minimo_bloques` bloques en `maximo`, se reduce.
+        maximo (int): Tope de escenarios; nunca se supera (se redondea hacia
+            abajo a bloques completos). Al menos 2.
+        precision (float): Semiamplitud relativa admitida (> 0).
+        tolerancia (float): Semiamplitud absoluta que se da por buena aunque
+            la relativa no se cumpla (para estimaciones próximas a cero).
+        confianza (float): Nivel de confianza del intervalo.
+        minimo_bloques (int): Bloques mínimos antes de evaluar la parada
+            (al menos 2, y no más de los que caben en `maximo`).
+        rng (np.random.Generator | int | None): Generador o semilla.
+
+    Returns:
+        tuple: (matriz (escenarios, años), informe de convergencia).
+    """
+    if maximo < 2:
+        raise ValueError(f"maximo debe ser al menos 2 escenarios (recibido {maximo}).")
+    rng = np.random.default_rng(rng)
+    z = NormalDist().inv_cdf(0.5 + confianza / 2)
+    # El intervalo necesita al menos 2 bloques; con un tope pequeño se
+    # reducen los bloques en lugar de pasarse del tope.
+    minimo_bloques = max(2, minimo_bloques)
+    tam_bloque = max(1, min(tam_bloque, maximo // minimo_bloques))
+    max_bloques = maximo // tam_bloque
+    minimo_bloques = min(minimo_bloques, max_bloques)
+
+    bloques, por_bloque = [], {"media": [], "VaR_5": []}
+    convergido = False
+    while len(bloques) < max_bloques:
+        bloque = generar_bloque(tam_bloque, rng)
+        bloques.append(bloque)
+        por_bloque["media"].append(bloque.mean(axis=0))
+        por_bloque["VaR_5"].append(_var_5(bloque))
+
+        k = len(bloques)
+        if k < minimo_bloques:
+            continue
+        estimaciones = {n: np.mean(v, axis=0) for n, v in por_bloque.items()}
+        semiamplitudes = {n: z * np.std(v, axis=0, ddof=1) / np.sqrt(k)
+                          for n, v in por_bloque.items()}
+        convergido = all(
+            np.all(semiamplitudes[n] <= np.maximum(precision * np.abs(estimaciones[n]), tolerancia))
+            for n in por_bloque
+        )
+        if convergido:
+            break
+
+    informe = {"escenarios": k * tam_bloque, "bloques": k, "convergido": bool(convergido),
+               "precision_objetivo": precision, "tolerancia": tolerancia}
+    alcanzada = maxima = 0.0
+    for nombre in por_bloque:
+        informe[nombre] = np.round(estimaciones[nombre], 6).tolist()
+        informe[f"semiamplitud_{nombre}"] = np.round(semiamplitudes[nombre], 6).tolist()
+        # Relativa a la misma escala que el criterio de parada: con estimaciones
+        # próximas a cero cuenta la tolerancia absoluta.
+        escala = np.maximum(np.abs(estimaciones[nombre]), tolerancia / precision)
+        relativa = semiamplitudes[nombre] / np.maximum(escala, 1e-12)
+        alcanzada = max(alcanzada, float(relativa.max()))
+        maxima = max(maxima, float(semiamplitudes[nombre].max()))
+    informe["precision_alcanzada"] = round(alcanzada, 6)
+    informe["semiamplitud_maxima"] = round(maxima, 6)
+    return np.concatenate(bloques), informe
+
+
+def imprimir_informe_convergencia(informes, titulo="Escenarios por simulación"):
+    """
+    Escenarios usados y precisión alcanzada por país o empresa.
+
+    Args:
+        informes (dict): {clave: informe de simular_hasta_convergencia}.
+    """
+    total = sum(i["escenarios"] for i in informes.values())
+    print(f"\n📊 {titulo}: {total} escenarios en {len(informes)} simulaciones.")
+    for clave, informe in informes.items():
+        estado = "✅" if informe["convergido"] else "⚠️ tope"
+        print(f"   {str(clave):<12} {informe['escenarios']:>7} escenarios  "
+              f"precisión {informe['precision_alcanzada']:.2%} "
+              f"(±{informe['semiamplitud_maxima']:,.4g})  {estado}")
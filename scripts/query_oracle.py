@@ -17,6 +17,9 @@ def generar_insert_oracle(nombre_pais, codigo_pais, df_pais):
 
     Returns:
         str: Sentencia SQL INSERT lista para pegar en Oracle SQL Developer.
+
+    Para cargar datos usar carga_panel_fdi.cargar_panel_fdi, que enlaza la
+    colección como objeto y carga todos los países en una sola llamada.
     """
     valores = []
     for _, fila in df_pais.iterrows():
@@ -65,58 +68,19 @@ def consultar_fdi_por_pais(conexion, nombre_pais):
 
 
 if __name__ == "__main__":
-    from scripts.fdi_analysis_preprocessing import procesar_pais, limpiar_datos_fdi
+    from carga_panel_fdi import NOMBRES_PAIS, cargar_panel_fdi
     from conexion_Oracle import conectar_oracle
-    import pandas as pd
-
-    # ========================
-    # 1. Diccionarios de mapeo
-    # ========================
-
-    nombre_paises = {
-        "Germany": "Alemania",
-        "France": "Francia",
-        "Italy": "Italia",
-        "Poland": "Polonia",
-        "Netherlands": "Países Bajos",
-        "Belgium": "Bélgica",
-        "Portugal": "Portugal",
-        "Greece": "Grecia"
-    }
-
-    codigos_pais = {
-        "Germany": "DEU",
-        "France": "FRA",
-        "Italy": "ITA",
-        "Poland": "POL",
-        "Netherlands": "NLD",
-        "Belgium": "BEL",
-        "Portugal": "PRT",
-        "Greece": "GRC"
-    }
-
-    # ========================
-    # 2. Limpieza y procesamiento
-    # ========================
-
-    df = pd.read_csv("data/fdi_inflows.csv", skiprows=4)
-    df_limpio = limpiar_datos_fdi(df)
 
     # ========================
-    # 3. Generador SQL para INSERT en Oracle
+    # 1. Carga del panel limpio en fdi_pais_objeto (MERGE por lotes,
+    #    sin generar ni pegar sentencias INSERT)
     # ========================
 
-    for nombre_csv in nombre_paises.keys():
-        df_pais = procesar_pais(df_limpio, nombre_csv)
-        nombre_es = nombre_paises[nombre_csv]
-        codigo = codigos_pais[nombre_csv]
-        
-        sql_insert = generar_insert_oracle(nombre_es, codigo, df_pais)
-        print(f"===== INSERT PARA {nombre_es} =====")
-        print(sql_insert)
+    cargar_panel_fdi("usuario/contraseña@host:puerto/SID", "data/fdi_inflows.csv",
+                     codigos=list(NOMBRES_PAIS))
 
     # ========================
-    # 4. Ejecutar la consulta a la BBDD de Oracle. 
+    # 2. Ejecutar la consulta a la BBDD de Oracle. 
     # ========================
 
     conexion = conectar_oracle("usuario", "contraseña")
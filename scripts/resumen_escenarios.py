@@ -0,0 +1,149 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import abrir_almacenamiento
+from estadisticas_incrementales import SketchCuantiles
+from instrumentacion import instrumentar
+
+"""
+Resumen por escenarios de los Z-Scores simulados.
+
+Recorre 'zscore_empresas' por bloques y acumula, por (empresa, año), la
+media y los percentiles 5/50/95 del ingreso y del Z-Score, además de la
+proporción de escenarios por debajo del umbral de quiebra de la empresa
+(el de su sector en 'umbrales_alerta' o el general, igual que las
+alertas). Los resúmenes
+por (país, año) se obtienen fusionando los de sus empresas, sin volver a
+leer la tabla. El resultado se guarda en 'resumen_escenarios', que es lo
+que consultan Power BI y la API.
+"""
+
+# Umbral general inicial de 'umbrales_alerta'; solo se usa cuando no se
+# indican los umbrales leídos de la base de datos.
+UMBRAL_ZSCORE = 1.8
+
+# Con hasta CAPACIDAD_SKETCH escenarios por grupo los percentiles son exactos.
+CAPACIDAD_SKETCH = 2048
+
+COLUMNAS_ZSCORE = ["id_empresa", "pais", "año", "escenario_id", "ingreso_simulado", "z_score"]
+
+
+class ResumenGrupo:
+    """Acumulador combinable de un grupo (empresa-año o país-año)."""
+
+    def __init__(self, capacidad=CAPACIDAD_SKETCH):
+        self.n = 0
+        self.suma_ingreso = 0.0
+        self.suma_z = 0.0
+        self.bajo_umbral = 0
+        self.ingresos = SketchCuantiles(capacidad)
+        self.zscores = SketchCuantiles(capacidad)
+
+    def actualizar(self, ingresos, zscores, umbral=UMBRAL_ZSCORE):
+        self.n += len(ingresos)
+        self.suma_ingreso += float(ingresos.sum())
+        self.suma_z += float(zscores.sum())
+        self.bajo_umbral += int(np.count_nonzero(zscores < umbral))
+        self.ingresos.extender(ingresos.tolist())
+        self.zscores.extender(zscores.tolist())
+
+    def fusionar(self, otro):
+        self.n += otro.n
+        self.suma_ingreso += otro.suma_ingreso
+        self.suma_z += otro.suma_z
+        self.bajo_umbral += otro.bajo_umbral
+        self.ingresos.fusionar(otro.ingresos)
+        self.zscores.fusionar(otro.zscores)
+
+    def fila(self, nivel, id_empresa, pais, año):
+        """Tupla en el orden de las columnas de 'resumen_escenarios'."""
+        return (
+            nivel, id_empresa, pais, año, self.n,
+            self.suma_ingreso / self.n,
+            self.ingresos.percentil(5),
+            self.ingresos.percentil(50),
+            self.ingresos.percentil(95),
+            self.suma_z / self.n,
+            self.zscores.percentil(5),
+            self.zscores.percentil(50),
+            self.zscores.percentil(95),
+            self.bajo_umbral / self.n,
+        )
+
+
+def acumular_resumenes(lotes, umbrales=None, umbral_defecto=UMBRAL_ZSCORE):
+    """
+    Acumula los resúmenes por (id_empresa, pais, año) a partir de bloques de
+    filas de 'zscore_empresas'.
+
+    Args:
+        lotes (iterable): Listas de tuplas (id_empresa, pais, año,
+            escenario_id, ingreso_simulado, z_score).
+        umbrales (dict | None): Umbral de Z-Score por id_empresa
+            (Almacenamiento.obtener_umbrales_zscore).
+        umbral_defecto (float | None): Umbral de las empresas sin entrada en
+            `umbrales`; None si no hay umbral general (ningún escenario en riesgo).
+
+    Returns:
+        dict: {(id_empresa, pais, año): ResumenGrupo}
+    """
+    umbrales = umbrales or {}
+    if umbral_defecto is None:
+        umbral_defecto = float("-inf")
+
+    grupos = {}
+    for filas in lotes:
+        bloque = pd.DataFrame(filas, columns=COLUMNAS_ZSCORE)
+        for clave, datos in bloque.groupby(["id_empresa", "pais", "año"], sort=False):
+            grupo = grupos.setdefault(clave, ResumenGrupo())
+            grupo.actualizar(datos["ingreso_simulado"].to_numpy(dtype="float64"),
+                             datos["z_score"].to_numpy(dtype="float64"),
+                             umbrales.get(clave[0], umbral_defecto))
+    return grupos
+
+
+def filas_resumen(grupos):
+    """Filas de nivel 'empresa' y de nivel 'pais' listas para insertar."""
+    filas = []
+    paises = {}
+    for (id_empresa, pais, año), grupo in sorted(grupos.items()):
+        filas.append(grupo.fila("empresa", int(id_empresa), pais, int(año)))
+        paises.setdefault((pais, año), ResumenGrupo()).fusionar(grupo)
+
+    for (pais, año), grupo in sorted(paises.items()):
+        filas.append(grupo.fila("pais", None, pais, int(año)))
+    return filas
+
+
+@instrumentar("generar_resumen_escenarios", filas=lambda args, n: n)
+def generar_resumen_escenarios(connection_string, tam_lote=50_000):
+    """
+    Recalcula 'resumen_escenarios' a partir de 'zscore_empresas'.
+
+    Args:
+        connection_string (str): Cadena de conexión Oracle o 'sqlite:///ruta.db'.
+        tam_lote (int): Filas por bloque de lectura.
+
+    Returns:
+        int: Filas de resumen escritas.
+    """
+    inicio = time.perf_counter()
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        umbral_general, umbrales = almacenamiento.obtener_umbrales_zscore()
+        grupos = acumular_resumenes(almacenamiento.leer_zscores_empresas(tam_lote),
+                                    umbrales, umbral_general)
+        filas = filas_resumen(grupos)
+        almacenamiento.reemplazar_resumen_escenarios(filas)
+        almacenamiento.confirmar()
+
+    escenarios = sum(grupo.n for grupo in grupos.values())
+    print(f"✅ Resumen por escenarios generado: {len(filas)} filas "
+          f"a partir de {escenarios} Z-Scores ({time.perf_counter() - inicio:.2f} s).")
+    return len(filas)
+
+
+if __name__ == "__main__":
+    connection_string = "usuario/contraseña@host:puerto/SID"
+    generar_resumen_escenarios(connection_string)
@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+from instrumentacion import instrumentar
+from muestreo import muestrear_normales
+
+"""
+Simulación conjunta y correlacionada del FDI de varios países.
+
+En lugar de simular cada país por separado, se estima la covarianza
+histórica entre países a partir del panel limpio y se generan todas las
+trayectorias en un único paso: Z (escenarios, años, países) @ L.T, con L el
+factor de Cholesky de la covarianza. Así se conserva el co-movimiento que se
+ve en el panel (p. ej. los países de la UE en 2009 y 2020).
+
+El resultado es un único tensor países x escenarios x años (EscenariosPaises)
+del que se leen directamente el VaR de un bloque de países o de una cartera
+ponderada, sin unir simulaciones independientes.
+"""
+
+AÑO_INICIO_SIMULACION = 2023
+
+# Años comunes mínimos para estimar la covarianza de un par de países; con
+# menos se supone que no están correlacionados.
+MIN_AÑOS_COMUNES = 5
+
+
+# =====================================
+# Estimación de parámetros
+# =====================================
+
+def panel_ancho(panel, codigos=None):
+    """
+    Panel largo (salida de construir_panel_largo) en formato año x país.
+
+    Args:
+        panel (pd.DataFrame): Índice ['Country Name', 'Año'] y columnas
+            ['Country Code', 'FDI'].
+        codigos (iterable | None): Códigos de país a incluir (None = todos).
+
+    Returns:
+        pd.DataFrame: Índice 'Año', una columna por código de país.
+    """
+    datos = panel.reset_index()
+    if codigos is not None:
+        datos = datos[datos["Country Code"].isin(list(codigos))]
+    ancho = datos.pivot(index="Año", columns="Country Code", values="FDI")
+    if codigos is not None:
+        ancho = ancho[[c for c in dict.fromkeys(codigos) if c in ancho.columns]]
+    return ancho
+
+
+def _semidefinida_positiva(covarianzas, minimo=1e-8):
+    """
+    Matriz semidefinida positiva más próxima que conserva las varianzas.
+
+    La covarianza por pares (cada par con sus años comunes) no tiene por qué
+    ser semidefinida positiva, y con más países que años nunca es de rango
+    completo. Se recortan los autovalores negativos de la matriz de
+    correlaciones y se vuelve a escalar su diagonal a 1.
+    """
+    desviaciones = np.sqrt(np.diag(covarianzas))
+    escala = np.where(desviaciones > 0, desviaciones, 1.0)
+    correlaciones = covarianzas / np.outer(escala, escala)
+    np.fill_diagonal(correlaciones, 1.0)
+
+    autovalores, autovectores = np.linalg.eigh(correlaciones)
+    autovalores = np.clip(autovalores, minimo, None)
+    correlaciones = (autovectores * autovalores) @ autovectores.T
+    diagonal = np.sqrt(np.diag(correlaciones))
+    correlaciones = correlaciones / np.outer(diagonal, diagonal)
+    return correlaciones * np.outer(desviaciones, desviaciones)
+
+
+def estimar_parametros_conjuntos(ancho, min_años_comunes=MIN_AÑOS_COMUNES, ddof=1):
+    """
+    Medias y covarianza histórica entre países.
+
+    Args:
+        ancho (pd.DataFrame): Panel año x país (salida de panel_ancho).
+        min_años_comunes (int): Años comunes mínimos por par de países.
+        ddof (int): Grados de libertad de la varianza (1 = muestral).
+
+    Returns:
+        tuple: (codigos, medias (p,), covarianzas (p, p) semidefinida positiva).
+    """
+    # Países con menos de dos observaciones no tienen varianza estimable.
+    ancho = ancho.loc[:, ancho.notna().sum() >= 2]
+    medias = ancho.mean().to_numpy()
+    covarianzas = ancho.cov(min_periods=min_años_comunes, ddof=ddof).to_numpy()
+
+    varianzas = ancho.var(ddof=ddof).to_numpy()
+    covarianzas = np.where(np.isnan(covarianzas), 0.0, covarianzas)
+    np.fill_diagonal(covarianzas, varianzas)
+    return list(ancho.columns), medias, _semidefinida_positiva(covarianzas)
+
+
+def _factor_cholesky(covarianzas):
+    try:
+        return np.linalg.cholesky(covarianzas)
+    except np.linalg.LinAlgError:
+        # Autovalores en el límite de la precisión: se añade un margen mínimo.
+        margen = 1e-10 * max(float(np.trace(covarianzas)) / len(covarianzas), 1e-12)
+        return np.linalg.cholesky(covarianzas + margen * np.eye(len(covarianzas)))
+
+
+# =====================================
+# Tensor de escenarios
+# =====================================
+
+class EscenariosPaises:
+    """Tensor (países, escenarios, años) de FDI simulado."""
+
+    __slots__ = ("codigos", "valores", "año_inicio", "meta")
+
+    def __init__(self, codigos, valores, año_inicio=AÑO_INICIO_SIMULACION, meta=None):
+        self.codigos = tuple(codigos)
+        self.valores = valores
+        self.año_inicio = año_inicio
+        self.meta = meta if meta is not None else {}
+
+    def __repr__(self):
+        paises, escenarios, años = self.valores.shape
+        return (f"EscenariosPaises({paises} países x {escenarios} escenarios x {años} años, "
+                f"{self.valores.nbytes / 1e6:.1f} MB)")
+
+    @property
+    def años(self):
+        return np.arange(self.año_inicio, self.año_inicio + self.valores.shape[2])
+
+    def indices(self, codigos):
+        posicion = {c: i for i, c in enumerate(self.codigos)}
+        return [posicion[c] for c in codigos]
+
+    def pais(self, codigo):
+        """Matriz (escenarios, años) de un país (vista, sin copia)."""
+        return self.valores[self.indices([codigo])[0]]
+
+    def agregado(self, codigos=None, pesos=None):
+        """
+        Suma ponderada de varios países por escenario y año.
+
+        Args:
+            codigos (iterable | None): Países del bloque (None = todos).
+            pesos (iterable | None): Peso de cada país (None = media simple).
+
+        Returns:
+            np.ndarray: Matriz (escenarios, años).
+        """
+        indices = self.indices(codigos) if codigos is not None else list(range(len(self.codigos)))
+        if pesos is None:
+            pesos = np.full(len(indices), 1.0 / len(indices))
+        return np.tensordot(np.asarray(pesos, dtype=float), self.valores[indices], axes=1)
+
+    def var(self, codigos=None, pesos=None, nivel=5):
+        """VaR (percentil `nivel`) por año de un bloque o cartera de países."""
+        return np.percentile(self.agregado(codigos, pesos), nivel, axis=0)
+
+    def a_dataframe(self):
+        """Formato largo de 'simulaciones_montecarlo' (mismo orden que simular_fdi)."""
+        paises, escenarios, años = self.valores.shape
+        return pd.DataFrame({
+            "pais": pd.Categorical.from_codes(
+                np.repeat(np.arange(paises, dtype=np.int16), escenarios * años), self.codigos),
+            "año": np.tile(self.años.astype(np.int16), paises * escenarios),
+            "valor_simulado": np.round(self.valores.ravel(), 2),
+            "escenario_id": np.tile(np.repeat(np.arange(1, escenarios + 1, dtype=np.int32), años),
+                                    paises),
+        })
+
+
+@instrumentar("simular_paises_correlacionados", filas=lambda args, cubo: cubo.valores.size)
+def simular_paises_correlacionados(codigos, medias, covarianzas, años=8, escenarios=1000,
+                                   rng=None, metodo="iid", replicas=1):
+    """
+    Simula todos los países a la vez con la correlación histórica.
+
+    Args:
+        codigos (list): Códigos de país, en el orden de medias/covarianzas.
+        medias (np.ndarray): Media histórica de cada país (p,).
+        covarianzas (np.ndarray): Covarianza entre países (p, p).
+        años (int): Años a proyectar.
+        escenarios (int): Escenarios a simular.
+        rng (np.random.Generator | int | None): Generador o semilla.
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol".
+        replicas (int): Bloques independientes de escenarios, para estimar
+            el error estándar (ver muestreo.resumen_error).
+
+    Returns:
+        EscenariosPaises: Tensor (países, escenarios, años).
+    """
+    p = len(codigos)
+    factor = _factor_cholesky(np.asarray(covarianzas, dtype=float))
+    # Una sola extracción para todos los países y años; los años son
+    # independientes entre sí y los países se correlacionan con L.
+    z = muestrear_normales(escenarios, años * p, metodo, rng,
+                           replicas).reshape(escenarios, años, p)
+    valores = (z @ factor.T + np.asarray(medias, dtype=float)).transpose(2, 0, 1)
+    meta = {"metodo": metodo, "replicas": replicas}
+    return EscenariosPaises(codigos, np.ascontiguousarray(valores), meta=meta)
+
+
+def simular_panel_correlacionado(panel, codigos=None, años=8, escenarios=1000, semilla=None,
+                                 metodo="iid", min_años_comunes=MIN_AÑOS_COMUNES):
+    """
+    Estima medias y covarianzas del panel limpio y simula todos sus países
+    de forma conjunta.
+
+    Args:
+        panel (pd.DataFrame): Salida de construir_panel_largo.
+        codigos (iterable | None): Códigos de país a simular (None = todos).
+        años (int): Años a proyectar.
+        escenarios (int): Escenarios a simular.
+        semilla (int | np.random.Generator | None): Semilla del generador.
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol".
+        min_años_comunes (int): Años comunes mínimos por par de países.
+
+    Returns:
+        EscenariosPaises: Tensor (países, escenarios, años).
+    """
+    codigos, medias, covarianzas = estimar_parametros_conjuntos(
+        panel_ancho(panel, codigos), min_años_comunes)
+    return simular_paises_correlacionados(codigos, medias, covarianzas, años, escenarios,
+                                          semilla, metodo)
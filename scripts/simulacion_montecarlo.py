@@ -2,9 +2,68 @@
 
 import numpy as np
 import pandas as pd
-import cx_Oracle
 
-def simular_fdi(pais, media, std, años=8, iteraciones=1000):
+from almacenamiento import abrir_almacenamiento
+from ejecucion_paralela import ejecutar_en_paralelo
+from generacion_alertas import carga_con_alertas
+from instrumentacion import instrumentar
+from muestreo import (imprimir_informe_convergencia, muestrear_normales, resumen_error,
+                      simular_hasta_convergencia)
+from simulacion_conjunta import estimar_parametros_conjuntos, simular_paises_correlacionados
+
+AÑO_INICIO_SIMULACION = 2023
+
+# Semiamplitud (puntos de % del PIB) que se acepta en el modo adaptativo
+# aunque no se alcance la precisión relativa, p. ej. con FDI medio cercano a 0.
+TOLERANCIA_FDI = 0.1
+
+
+def generar_escenarios_fdi(media, std, años=8, iteraciones=1000, rng=None, metodo="iid",
+                           replicas=10):
+    """
+    Genera de una sola vez la matriz escenario x año de la simulación
+    de Monte Carlo, sin bucles de Python.
+
+    Args:
+        media (float): Media histórica del FDI.
+        std (float): Desviación estándar histórica del FDI.
+        años (int): Años a proyectar hacia el futuro.
+        iteraciones (int): Número de escenarios a simular.
+        rng (np.random.Generator | int | None): Generador o semilla para
+            poder reproducir la simulación.
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol"
+            (ver muestreo.py).
+        replicas (int): Bloques independientes para estimar el error
+            estándar (no afecta al muestreo iid).
+
+    Returns:
+        np.ndarray: Matriz (iteraciones, años) con los valores simulados.
+    """
+    rng = np.random.default_rng(rng)
+    if metodo == "iid":
+        return rng.normal(loc=media, scale=std, size=(iteraciones, años))
+    return media + std * muestrear_normales(iteraciones, años, metodo, rng, replicas)
+
+
+def generar_escenarios_adaptativo(media, std, años=8, maximo=20_000, rng=None, metodo="iid",
+                                  precision=0.02, tolerancia=TOLERANCIA_FDI, tam_bloque=100):
+    """
+    Como generar_escenarios_fdi, pero el número de escenarios se decide por
+    convergencia: se simulan bloques hasta que la media y el VaR 5% de cada
+    año tienen la precisión pedida, con `maximo` como tope.
+
+    Returns:
+        tuple: (matriz (escenarios, años), informe de convergencia).
+    """
+    return simular_hasta_convergencia(
+        lambda n, rng_bloque: generar_escenarios_fdi(media, std, años, n, rng_bloque, metodo, 1),
+        tam_bloque, maximo, precision, tolerancia, rng=rng,
+    )
+
+
+@instrumentar("simular_fdi", filas=lambda args, df: len(df))
+def simular_fdi(pais, media, std, años=8, iteraciones=1000, semilla=None, metodo="iid",
+                replicas=10, precision=None, tolerancia=TOLERANCIA_FDI):
     """
     Principal función que realiza la simulación de Monte Carlo. 
     En base a un FDI anaul, imula FDI futuro para un país 
@@ -16,24 +75,87 @@ def simular_fdi(pais, media, std, años=8, iteraciones=1000):
         std (float): Desviación estándar histórica del FDI.
         años (int): Años a proyectar hacia el futuro.
         iteraciones (int): Número de escenarios a simular.
+        semilla (int | np.random.Generator | None): Semilla del generador
+            para reproducir la simulación.
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol".
+        replicas (int): Bloques independientes para el error estándar.
+        precision (float | None): Si se indica, modo adaptativo: se simula
+            por bloques hasta esa semiamplitud relativa del intervalo del 95%
+            de la media y del VaR 5%, e `iteraciones` pasa a ser el tope.
+        tolerancia (float): Semiamplitud absoluta aceptada en modo adaptativo.
 
     Returns:
         pd.DataFrame: Resultados con columnas [pais, año, valor_simulado, escenario_id].
+        En df.attrs["error_estandar"] se guardan la media y el VaR 5% de
+        cada año con su error estándar y, en modo adaptativo, en
+        df.attrs["convergencia"] los escenarios usados y la precisión alcanzada.
     """
-    resultados = []
+    informe = None
+    if precision is None:
+        matriz = generar_escenarios_fdi(media, std, años, iteraciones, semilla, metodo, replicas)
+    else:
+        matriz, informe = generar_escenarios_adaptativo(media, std, años, iteraciones, semilla,
+                                                        metodo, precision, tolerancia)
+        iteraciones, replicas = informe["escenarios"], informe["bloques"]
+
+    # La matriz se recorre fila a fila (escenario) y dentro de cada fila por
+    # año, que es el mismo orden que producían los bucles originales.
+    # Tipos compactos: país categórico, año int16 y escenario int32. El valor
+    # se mantiene en float64 porque se inserta tal cual en la BBDD.
+    df = pd.DataFrame({
+        "pais": pd.Categorical.from_codes(np.zeros(iteraciones * años, dtype=np.int8), [pais]),
+        "año": np.tile(np.arange(AÑO_INICIO_SIMULACION, AÑO_INICIO_SIMULACION + años,
+                                 dtype=np.int16), iteraciones),
+        "valor_simulado": np.round(matriz.ravel(), 2),
+        "escenario_id": np.repeat(np.arange(1, iteraciones + 1, dtype=np.int32), años),
+    })
+    df.attrs["error_estandar"] = resumen_error(matriz, replicas, metodo)
+    if informe is not None:
+        df.attrs["convergencia"] = informe
+    return df
+
 
-    for i in range(iteraciones):
-        for j in range(años):
-            año = 2023 + j
-            valor = np.random.normal(loc=media, scale=std)
-            resultados.append({
-                "pais": pais,
-                "año": año,
-                "valor_simulado": round(valor, 2),
-                "escenario_id": i + 1
-            })
+def _tarea_simular_pais(tarea, semilla):
+    codigo, media, std, años, iteraciones, metodo, precision = tarea
+    if precision is None:
+        matriz = generar_escenarios_fdi(media, std, años, iteraciones, semilla, metodo)
+        return codigo, matriz, None
+    return (codigo,) + generar_escenarios_adaptativo(media, std, años, iteraciones, semilla,
+                                                     metodo, precision)
 
-    return pd.DataFrame(resultados)
+
+@instrumentar("simular_paises_paralelo", filas=lambda args, res: len(res))
+def simular_paises_paralelo(parametros, años=8, iteraciones=1000, semilla=None, procesos=None,
+                            metodo="iid", precision=None):
+    """
+    Simula varios países repartiéndolos entre procesos. Cada país usa su
+    propio flujo aleatorio derivado de `semilla`, así que el resultado no
+    depende del número de procesos.
+
+    Args:
+        parametros (dict): {codigo_pais: (media, std)}.
+        años (int): Años a proyectar hacia el futuro.
+        iteraciones (int): Número de escenarios por país.
+        semilla (int | None): Semilla común de la ejecución.
+        procesos (int | None): Procesos a usar (None = todos los núcleos).
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol".
+        precision (float | None): Modo adaptativo (ver simular_fdi); cada
+            país usa los escenarios que necesite, hasta `iteraciones`.
+
+    Returns:
+        dict: {codigo_pais: np.ndarray (escenarios, años)}.
+    """
+    tareas = [(codigo, media, std, años, iteraciones, metodo, precision)
+              for codigo, (media, std) in parametros.items()]
+    matrices, informes = {}, {}
+    for codigo, matriz, informe in ejecutar_en_paralelo(_tarea_simular_pais, tareas, semilla,
+                                                        procesos):
+        matrices[codigo] = matriz
+        informes[codigo] = informe
+
+    if precision is not None:
+        imprimir_informe_convergencia(informes, "Escenarios por país")
+    return matrices
 
 
 """Esta función fue reemplazada por la lógica directa implementada 
@@ -41,7 +163,8 @@ en exploracion_fdi.py, donde se ejecutan simulaciones y se insertan
 directamente en Oracle. Se conserva aquí por si se desea reutilizar como 
 utilidad general en otros proyectos."""
 
-def simular_montecarlo_fdi(df_fdi, num_simulaciones=1000, horizonte=5):
+def simular_montecarlo_fdi(df_fdi, num_simulaciones=1000, horizonte=5, metodo="iid",
+                           correlacionado=False, semilla=None, replicas=10, con_error=False):
     """
     Ejecuta simulación de Monte Carlo para proyectar FDI futuros por país.
 
@@ -49,53 +172,95 @@ def simular_montecarlo_fdi(df_fdi, num_simulaciones=1000, horizonte=5):
         df_fdi (dict): Diccionario con DataFrames por país, columnas 'Año' y 'FDI'.
         num_simulaciones (int): Número de escenarios a simular.
         horizonte (int): Número de años hacia el futuro a simular.
+        metodo (str): Muestreo: "iid", "antitetico", "lhs" o "sobol".
+        correlacionado (bool): Si es True, todos los países se simulan en un
+            solo paso con la covarianza histórica entre ellos
+            (simulacion_conjunta.py) en lugar de uno a uno.
+        semilla (int | None): Semilla de la ejecución. Cada país usa su
+            propio flujo, derivado según su posición en df_fdi con
+            SeedSequence(semilla).spawn.
+        replicas (int): Bloques independientes para estimar el error estándar.
+        con_error (bool): Devolver también el error estándar de cada país.
 
     Returns:
-        dict: Diccionario con simulaciones por país.
+        dict: Diccionario con simulaciones por país. Con con_error=True,
+        tupla (simulaciones, errores), donde errores es {pais: resumen_error}
+        con la media y el VaR 5% de cada año y su error estándar.
     """
-    simulaciones = {}
-
-    for pais, df in df_fdi.items():
-        serie = df["FDI"].values
+    if correlacionado:
+        ancho = pd.concat({pais: df.set_index("Año")["FDI"] for pais, df in df_fdi.items()},
+                          axis=1)
+        # ddof=0, igual que np.std en la simulación país a país.
+        paises, medias, covarianzas = estimar_parametros_conjuntos(ancho, ddof=0)
+        conjunto = simular_paises_correlacionados(paises, medias, covarianzas, horizonte,
+                                                  num_simulaciones, rng=semilla, metodo=metodo,
+                                                  replicas=replicas)
+        simulaciones = {pais: conjunto.pais(pais) for pais in paises}
+    else:
+        simulaciones = {}
+        semillas = np.random.SeedSequence(semilla).spawn(len(df_fdi))
+        for (pais, df), semilla_pais in zip(df_fdi.items(), semillas):
+            serie = df["FDI"].values
 
-        # Cálculo de estadísticos
-        media = np.mean(serie)
-        desviacion = np.std(serie)
+            # Cálculo de estadísticos
+            media = np.mean(serie)
+            desviacion = np.std(serie)
 
-        # Simulación normal
-        simulacion = np.random.normal(loc=media, scale=desviacion, size=(num_simulaciones, horizonte))
+            simulaciones[pais] = generar_escenarios_fdi(media, desviacion, horizonte,
+                                                        num_simulaciones, semilla_pais, metodo,
+                                                        replicas)
 
-        simulaciones[pais] = simulacion
+    if not con_error:
+        return simulaciones
+    errores = {pais: resumen_error(matriz, replicas, metodo)
+               for pais, matriz in simulaciones.items()}
+    return simulaciones, errores
 
-    return simulaciones
 
-
-def insertar_simulacion_oracle(df_resultados, connection_string):
+@instrumentar("insertar_simulacion_oracle", filas=lambda args, res: res["insertadas"])
+def insertar_simulacion_oracle(df_resultados, connection_string, tam_lote=10_000,
+                               commit_cada=10, desde=0, triggers_fila=False):
     """
     Inserta los resultados simulados en la tabla Oracle 'simulaciones_montecarlo'.
 
+    Los valores se envían como arrays tipados en lotes de `tam_lote` filas.
+    Las filas rechazadas se informan sin abortar la carga y se confirma
+    cada `commit_cada` lotes.
+
     Args:
         df_resultados (pd.DataFrame): DataFrame con columnas [pais, año, valor_simulado, escenario_id].
-        connection_string (str): Cadena de conexión para Oracle (usuario/contraseña@host:puerto/servicio).
-    """
-    connection = cx_Oracle.connect(connection_string)
-    cursor = connection.cursor()
+        connection_string (str): Cadena de conexión para Oracle (usuario/contraseña@host:puerto/servicio)
+            o 'sqlite:///ruta.db' para la base embebida.
+        tam_lote (int): Filas por executemany.
+        commit_cada (int): Lotes entre cada commit.
+        desde (int): Fila desde la que reanudar una carga interrumpida.
+        triggers_fila (bool): Generar las alertas con el trigger de fila en
+            lugar de por conjuntos al terminar (generacion_alertas.py).
 
-    insert_sql = """
-        INSERT INTO simulaciones_montecarlo 
-        (pais, año, valor_simulado, escenario_id)
-        VALUES (:1, :2, :3, :4)
+    Returns:
+        dict: Resumen de la carga (insertadas, rechazadas, filas_confirmadas,
+        id_carga y alertas).
     """
+    filas = zip(
+        df_resultados["pais"].tolist(),
+        df_resultados["año"].tolist(),
+        df_resultados["valor_simulado"].tolist(),
+        df_resultados["escenario_id"].tolist(),
+    )
 
-    for _, row in df_resultados.iterrows():
-        cursor.execute(insert_sql, (
-            row["pais"],
-            row["año"],
-            row["valor_simulado"],
-            row["escenario_id"]
-        ))
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        with carga_con_alertas(almacenamiento, "simulaciones_montecarlo",
+                               triggers_fila) as carga:
+            resumen = almacenamiento.insertar_simulaciones_pais(
+                filas, tam_lote=tam_lote, commit_cada=commit_cada, desde=desde,
+                id_carga=carga["id_carga"]
+            )
+    resumen.update(carga)
 
-    connection.commit()
-    cursor.close()
-    connection.close()
+    print(f"✅ Simulaciones insertadas: {resumen['insertadas']} filas.")
+    if carga["alertas"] is not None:
+        print(f"   Carga {carga['id_carga']}: {carga['alertas']} alertas de FDI generadas.")
+    for indice, mensaje in resumen["rechazadas"]:
+        print(f"⚠️ Fila {indice} rechazada: {mensaje}")
 
+    return resumen
@@ -1,87 +1,160 @@
-from scripts.fdi_analysis_preprocessing import limpiar_datos_fdi, procesar_pais
-from conexion_Oracle import conectar_oracle
+import argparse
+import json
+import sys
+
 import pandas as pd
 
+from almacenamiento import ERRORES_BD, abrir_almacenamiento
+from fdi_analysis_preprocessing import cargar_fdi_limpio, construir_panel_largo
+
 # ==============================================
 # Script de validación cruzada Python vs Oracle
 # ==============================================
+#
+# Compara el panel limpio del CSV con el contenido de fdi_pais_objeto.
+# La tabla anidada se lee aplanada en una sola consulta y se cruza con el
+# panel en un único merge por (codigo_pais, año); los nombres no
+# intervienen en el cruce porque en Oracle están en español y en el CSV
+# en inglés.
+#
+# Uso:
+#     python scripts/validacion_cruzada.py usuario/contraseña@host:puerto/SID
+#     python scripts/validacion_cruzada.py sqlite:///data/fdi.db --tolerancia 0.01 --salida informe.json
+#
+# Código de salida: 0 sin discrepancias, 1 con discrepancias, 2 si falla la BBDD.
+
+TIPOS_DISCREPANCIA = ("diferencia", "solo_csv", "solo_bd")
+
+
+def leer_panel_bd(connection_string):
+    """
+    Lee todo fdi_pais_objeto con TABLE(p.fdi_anual) en una sola consulta.
+
+    Returns:
+        pd.DataFrame: Columnas [nombre_bd, codigo_pais, Año, FDI_BD].
+    """
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        filas = almacenamiento.leer_panel_fdi()
+
+    df = pd.DataFrame(filas, columns=["nombre_bd", "codigo_pais", "Año", "FDI_BD"])
+    return df.astype({"Año": "int64", "FDI_BD": "float64"})
 
 
-# 1. Leer y limpiar CSV
-
-df = pd.read_csv("data/fdi_inflows.csv", skiprows=4)
-df_limpio = limpiar_datos_fdi(df)
-
-# 2. Lista de países a validar (Python usa nombres en inglés, Oracle en español)
-paises = [
-    {"python": "Spain", "oracle": "España"},
-    {"python": "Italy", "oracle": "Italia"},
-    {"python": "France", "oracle": "Francia"},
-    {"python": "Germany", "oracle": "Alemania"},
-    {"python": "Netherlands", "oracle": "Países Bajos"},
-    {"python": "Greece", "oracle": "Grecia"},
-    {"python":"Poland", "oracle": "Polonia"},
-    {"python": "Belgium", "oracle": "Bélgica"},
-    {"python": "Portugal", "oracle": "Portugal"},
-    {"python": "China", "oracle": "China"},
-]
-
-# 3. Función para obtener datos desde Oracle
-def obtener_datos_oracle(conexion, nombre_pais):
-    cursor = conexion.cursor()
-    query = """
-        SELECT f.anio, f.fdi_porcentaje
-        FROM fdi_pais_objeto p,
-             TABLE(p.fdi_anual) f
-        WHERE p.nombre_pais = :nombre_pais
-        ORDER BY f.anio
+def leer_panel_csv(ruta_csv, año_inicio=2000, año_fin=None):
+    """
+    Panel limpio del CSV en formato largo.
+
+    Returns:
+        pd.DataFrame: Columnas [nombre_csv, codigo_pais, Año, FDI_CSV].
+    """
+    panel = construir_panel_largo(cargar_fdi_limpio(ruta_csv, año_inicio=año_inicio,
+                                                    año_fin=año_fin), año_inicio, año_fin)
+    return (panel.reset_index()
+            .rename(columns={"Country Name": "nombre_csv", "Country Code": "codigo_pais",
+                             "FDI": "FDI_CSV"})
+            [["nombre_csv", "codigo_pais", "Año", "FDI_CSV"]])
+
+
+def comparar_paneles(df_csv, df_bd, tolerancia=0.01, todos_los_paises=False):
+    """
+    Cruza ambos paneles por (codigo_pais, Año) y clasifica las discrepancias.
+
+    Args:
+        df_csv (pd.DataFrame): Salida de leer_panel_csv.
+        df_bd (pd.DataFrame): Salida de leer_panel_bd.
+        tolerancia (float): Diferencia absoluta admitida entre el valor del
+            CSV redondeado a 2 decimales (como se guarda) y el de la BBDD.
+        todos_los_paises (bool): Si es False solo se validan los países que
+            ya existen en la BBDD; si es True, los del CSV que falten en la
+            BBDD también cuentan como discrepancias.
+
+    Returns:
+        dict: Informe con el total de países y observaciones comparadas, el
+        recuento por tipo de discrepancia y el detalle de cada una.
     """
-    cursor.execute(query, {"nombre_pais": nombre_pais})
-    resultados = cursor.fetchall()
-    cursor.close()
-    return pd.DataFrame(resultados, columns=["Año", "FDI_Oracle"])
-
-""""""
-
-# ========================================================
-# Validación cruzada con Oracle utilizando try/except/finally
-# --------------------------------------------------------
-# Este bloque establece la conexión con Oracle y compara
-# los datos FDI país por país entre el CSV y la BBDD.
-# Se implementa un bloque try/except/finally para:
-#   - Capturar errores durante la conexión o consulta.
-#   - Evitar la interrupción del script ante fallos.
-#   - Asegurar el cierre correcto de la conexión.
-# ========================================================
-
-try:
-    # 4. Conectar a Oracle
-    conexion = conectar_oracle("usuario", "contrasena")
-    if not conexion:
-        raise Exception("Conexión fallida.")
-
-    # 5. Recorrer países y comparar
-    for pais in paises:
-        print(f"\nComparando FDI para {pais['python']} / {pais['oracle']}")
-
-        # Procesar desde CSV
-        df_python = procesar_pais(df_limpio, pais["python"])
-        df_python = df_python.rename(columns={"FDI": "FDI_Python"})
-
-        # Obtener desde Oracle
-        df_oracle = obtener_datos_oracle(conexion, pais["oracle"])
-
-        # Comparar por año
-        comparacion = df_python.merge(df_oracle, on="Año", how="inner")
-        comparacion["Diferencia"] = abs(comparacion["FDI_Python"] - comparacion["FDI_Oracle"])
-
-        # Mostrar resultado
-        print(comparacion)
-
-except Exception as error:
-    print(f"\nError durante la validación cruzada: {error}")
-
-finally:
-    if 'conexion' in locals() and conexion:
-        conexion.close()
-       
+    if not todos_los_paises:
+        df_csv = df_csv[df_csv["codigo_pais"].isin(df_bd["codigo_pais"].unique())]
+
+    cruce = df_csv.merge(df_bd, on=["codigo_pais", "Año"], how="outer", indicator=True)
+    cruce["diferencia"] = (cruce["FDI_CSV"].round(2) - cruce["FDI_BD"]).abs()
+
+    tipo = pd.Series(None, index=cruce.index, dtype="object")
+    tipo[cruce["_merge"] == "left_only"] = "solo_csv"
+    tipo[cruce["_merge"] == "right_only"] = "solo_bd"
+    tipo[(cruce["_merge"] == "both") & (cruce["diferencia"] > tolerancia + 1e-9)] = "diferencia"
+    cruce["tipo"] = tipo
+
+    discrepancias = (cruce[cruce["tipo"].notna()]
+                     .drop(columns="_merge")
+                     .sort_values(["codigo_pais", "Año"]))
+    # NaN no es JSON válido: los huecos se devuelven como None.
+    detalle = discrepancias.astype(object).where(discrepancias.notna(), None).to_dict("records")
+
+    return {
+        "tolerancia": tolerancia,
+        "paises": int(cruce["codigo_pais"].nunique()),
+        "observaciones": int((cruce["_merge"] == "both").sum()),
+        "resumen": {t: int((cruce["tipo"] == t).sum()) for t in TIPOS_DISCREPANCIA},
+        "paises_con_discrepancias": sorted(discrepancias["codigo_pais"].unique().tolist()),
+        "discrepancias": detalle,
+    }
+
+
+def imprimir_informe(informe, maximo=20):
+    print(f"\n🔎 Validación CSV vs BBDD: {informe['paises']} países, "
+          f"{informe['observaciones']} observaciones comparadas "
+          f"(tolerancia {informe['tolerancia']}).")
+    for tipo, total in informe["resumen"].items():
+        print(f"   {tipo:<12} {total}")
+
+    if not informe["discrepancias"]:
+        print("✅ Sin discrepancias.")
+        return
+
+    print(f"❌ Países con discrepancias: {', '.join(informe['paises_con_discrepancias'])}")
+    print(pd.DataFrame(informe["discrepancias"][:maximo]).to_string(index=False))
+    if len(informe["discrepancias"]) > maximo:
+        print(f"   ... y {len(informe['discrepancias']) - maximo} más.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validación cruzada del panel FDI CSV vs BBDD")
+    parser.add_argument("connection_string")
+    parser.add_argument("--csv", default="data/fdi_inflows.csv")
+    parser.add_argument("--tolerancia", type=float, default=0.01)
+    parser.add_argument("--paises", nargs="*", help="Códigos de país a validar (por defecto, todos)")
+    parser.add_argument("--todos", action="store_true",
+                        help="Informar también de los países del CSV que no están en la BBDD")
+    parser.add_argument("--año-inicio", type=int, default=2000)
+    parser.add_argument("--año-fin", type=int, default=None,
+                        help="Último año (por defecto, el último del CSV)")
+    parser.add_argument("--salida", help="Fichero JSON donde guardar el informe")
+    args = parser.parse_args(argv)
+
+    df_csv = leer_panel_csv(args.csv, args.año_inicio, args.año_fin)
+    try:
+        df_bd = leer_panel_bd(args.connection_string)
+    except ERRORES_BD as error:
+        print(f"\nError durante la validación cruzada: {error}")
+        return 2
+
+    df_bd = df_bd[df_bd["Año"] >= args.año_inicio]
+    if args.año_fin is not None:
+        df_bd = df_bd[df_bd["Año"] <= args.año_fin]
+    if args.paises:
+        df_csv = df_csv[df_csv["codigo_pais"].isin(args.paises)]
+        df_bd = df_bd[df_bd["codigo_pais"].isin(args.paises)]
+
+    informe = comparar_paneles(df_csv, df_bd, args.tolerancia, args.todos)
+    imprimir_informe(informe)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"📁 Informe guardado en: {args.salida}")
+
+    return 1 if informe["discrepancias"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,14 @@
+import time
+
+import numpy as np
 import pandas as pd
-import cx_Oracle
+
+from almacenamiento import abrir_almacenamiento
+from generacion_alertas import carga_con_alertas
+from instrumentacion import instrumentar
+
+
+COLUMNAS_SIMULACION = ["id_empresa", "pais", "año", "escenario_id", "ingreso_simulado"]
 
 
 def obtener_simulaciones_empresas(connection_string):
@@ -7,124 +16,212 @@ def obtener_simulaciones_empresas(connection_string):
     Extrae los ingresos simulados de todas las empresas desde Oracle.
 
     Args:
-        connection_string (str): usuario/contraseña@host:puerto/SID.
+        connection_string (str): usuario/contraseña@host:puerto/SID o 'sqlite:///ruta.db'.
 
     Returns:
         pd.DataFrame: DataFrame con columnas [id_empresa, pais, año, escenario_id, ingreso_simulado]
     """
-    conn = cx_Oracle.connect(connection_string)
-    cursor = conn.cursor()
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        datos = [fila for lote in almacenamiento.leer_simulaciones_empresas(10_000)
+                 for fila in lote]
 
-    query = """
-        SELECT id_empresa, pais, año, escenario_id, ingreso_simulado
-        FROM simulaciones_empresas
+    return pd.DataFrame(datos, columns=COLUMNAS_SIMULACION)
+
+
+def obtener_sensibilidades(connection_string):
     """
+    Obtiene la sensibilidad al FDI de cada empresa desde 'empresas_ficticias'.
+
+    Args:
+        connection_string (str): usuario/contraseña@host:puerto/SID o 'sqlite:///ruta.db'.
+
+    Returns:
+        pd.Series: Sensibilidad indexada por id_empresa.
+    """
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        return _serie_sensibilidades(almacenamiento.obtener_sensibilidades())
+
+
+def _serie_sensibilidades(datos):
+    ids, sensibilidades = zip(*datos) if datos else ((), ())
+    return pd.Series(sensibilidades, index=pd.Index(ids, name="id_empresa"),
+                     name="sensibilidad_fdi", dtype="float64")
 
-    cursor.execute(query)
-    columnas = [col[0].lower() for col in cursor.description]
-    datos = cursor.fetchall()
 
-    df = pd.DataFrame(datos, columns=columnas)
+def _redondear_como_python(valores, decimales=2):
+    """
+    Redondea un array igual que round() de Python.
+
+    np.round escala por 10**decimales antes de redondear y puede decidir
+    distinto en valores muy próximos a la mitad; esos pocos casos se
+    resuelven con round() para conservar el resultado exacto.
+    """
+    escala = 10.0 ** decimales
+    escalados = valores * escala
+    redondeados = np.round(escalados) / escala
 
-    cursor.close()
-    conn.close()
+    distancia_mitad = np.abs(escalados - np.floor(escalados) - 0.5)
+    dudosos = np.flatnonzero(distancia_mitad < 1e-6 * np.maximum(1.0, np.abs(escalados)))
+    for i in dudosos:
+        redondeados[i] = round(float(valores[i]), decimales)
 
-    return df
+    return redondeados
 
 
-def calcular_z_score(df_simulaciones, sensibilidad_dict):
+@instrumentar("calcular_z_score", filas=lambda args, df: len(df))
+def calcular_z_score(df_simulaciones, sensibilidad_dict=None, sensibilidad_defecto=0.5):
     """
     Calcula el Z-Score de Altman adaptado para cada fila del DataFrame.
 
+    El cálculo es columnar: la sensibilidad se asigna por id_empresa con un
+    único map y la fórmula se evalúa sobre columnas completas.
+
     Args:
         df_simulaciones (pd.DataFrame): Contiene columnas ['id_empresa', 'pais', 
         'año', 'escenario_id', 'ingreso_simulado']
-        sensibilidad_dict (dict): Diccionario con sensibilidad 
-        por empresa: {id_empresa: sensibilidad_fdi}
+        sensibilidad_dict (dict | pd.Series): Sensibilidad por empresa
+        {id_empresa: sensibilidad_fdi}, por ejemplo la Serie devuelta por
+        obtener_sensibilidades().
+        sensibilidad_defecto (float): Valor prudente para empresas sin sensibilidad.
 
     Returns:
         pd.DataFrame: Mismo DataFrame original + columna 'z_score'
     """
-    z_scores = []
-
-    for _, row in df_simulaciones.iterrows():
-        ingreso = row['ingreso_simulado']
-        sensibilidad = sensibilidad_dict.get(row['id_empresa'], 0.5)  # Valor por defecto prudente
-
-        # Fórmulas simuladas (ajustadas con lógica ficticia)
-        activos_totales = ingreso
-        activos_circulantes = ingreso * 0.4
-        pasivos_circulantes = ingreso * (0.2 + (1 - sensibilidad) * 0.3)
-        utilidad_retenida = ingreso * 0.1
-        ebit = ingreso * (0.12 + sensibilidad * 0.08)
-        patrimonio = ingreso * sensibilidad
-        pasivo_total = ingreso - patrimonio
-
-        # Fórmula Z-Score Altman adaptada
-        z = (0.717 * (activos_circulantes - pasivos_circulantes) / activos_totales +
-             0.847 * utilidad_retenida / activos_totales +
-             3.107 * ebit / activos_totales +
-             0.420 * patrimonio / pasivo_total)
-
-        z_scores.append(round(z, 2))
-
-    df_simulaciones['z_score'] = z_scores
+    if sensibilidad_dict is None:
+        sensibilidad_dict = {}
+    if not isinstance(sensibilidad_dict, pd.Series):
+        sensibilidad_dict = pd.Series(sensibilidad_dict, dtype="float64")
+
+    ingreso = df_simulaciones['ingreso_simulado'].to_numpy(dtype="float64")
+    sensibilidad = (df_simulaciones['id_empresa'].map(sensibilidad_dict)
+                    .fillna(sensibilidad_defecto).to_numpy(dtype="float64"))
+
+    # Fórmulas simuladas (ajustadas con lógica ficticia)
+    activos_totales = ingreso
+    activos_circulantes = ingreso * 0.4
+    pasivos_circulantes = ingreso * (0.2 + (1 - sensibilidad) * 0.3)
+    utilidad_retenida = ingreso * 0.1
+    ebit = ingreso * (0.12 + sensibilidad * 0.08)
+    patrimonio = ingreso * sensibilidad
+    pasivo_total = ingreso - patrimonio
+
+    # Fórmula Z-Score Altman adaptada
+    z = (0.717 * (activos_circulantes - pasivos_circulantes) / activos_totales +
+         0.847 * utilidad_retenida / activos_totales +
+         3.107 * ebit / activos_totales +
+         0.420 * patrimonio / pasivo_total)
+
+    df_simulaciones['z_score'] = _redondear_como_python(z)
     return df_simulaciones
 
 
 
-def insertar_zscores_en_oracle(df, connection_string):
+@instrumentar("insertar_zscores_en_oracle", filas=lambda args, res: len(args[0]))
+def insertar_zscores_en_oracle(df, connection_string, triggers_fila=False):
     """
     Inserta los Z-Scores calculados en la tabla 'zscore_empresas'.
 
     Args:
         df (pd.DataFrame): DataFrame con columnas [id_empresa, pais, año, 
         escenario_id, ingreso_simulado, z_score]
-        connection_string (str): Cadena de conexión Oracle
+        connection_string (str): Cadena de conexión Oracle o 'sqlite:///ruta.db'.
+        triggers_fila (bool): Generar las alertas con el trigger de fila en
+            lugar de por conjuntos al terminar (generacion_alertas.py).
     """
-    conn = cx_Oracle.connect(connection_string)
-    cursor = conn.cursor()
+    datos = _filas_zscore(df)
 
-    insert_sql = """
-        INSERT INTO zscore_empresas (
-            id_empresa, pais, año, escenario_id, ingreso_simulado, z_score
-        ) VALUES (:1, :2, :3, :4, :5, :6)
-    """
-
-    datos = [
-        (
-            row["id_empresa"],
-            row["pais"],
-            row["año"],
-            row["escenario_id"],
-            row["ingreso_simulado"],
-            row["z_score"]
-        )
-        for _, row in df.iterrows()
-    ]
-
-    cursor.executemany(insert_sql, datos)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        with carga_con_alertas(almacenamiento, "zscore_empresas", triggers_fila) as carga:
+            almacenamiento.insertar_zscores(datos, id_carga=carga["id_carga"])
+            almacenamiento.confirmar()
 
     print(f"✅ Z-Scores insertados correctamente: {len(datos)} registros.")
+    _informar_alertas(carga)
 
 
-connection_string = "usuario/contraseña@host:puerto/SID"
-# Suponiendo que ya cargaste tus simulaciones desde Oracle:
-df = obtener_simulaciones_empresas(connection_string)
+def _informar_alertas(carga):
+    if carga["alertas"] is not None:
+        print(f"   Carga {carga['id_carga']}: {carga['alertas']} alertas de quiebra generadas.")
 
-# Y ya tienes un diccionario con sensibilidad por empresa:
-sensibilidad_dict = {
-    1: 0.41, 2: 0.44, 3: 0.81, 4: 0.24, 5: 0.63,
-    6: 0.24, 7: 0.99, 8: 0.26, 9: 0.64, 10: 0.45
-}
 
-# Calcular Z-Scores:
-df_z = calcular_z_score(df, sensibilidad_dict)
-print(df_z.head())
+def _filas_zscore(df):
+    """Convierte las columnas del DataFrame en tuplas para executemany."""
+    return list(zip(
+        df["id_empresa"].tolist(),
+        df["pais"].tolist(),
+        df["año"].tolist(),
+        df["escenario_id"].tolist(),
+        df["ingreso_simulado"].tolist(),
+        df["z_score"].tolist(),
+    ))
 
-# Insertar Z-Cores en BBDD Oracle:
 
-insertar_zscores_en_oracle(df_z, connection_string)
+@instrumentar("procesar_zscores_streaming", filas=lambda args, res: res["filas"])
+def procesar_zscores_streaming(connection_string, sensibilidad_dict=None, tam_lote=50_000,
+                               triggers_fila=False):
+    """
+    Calcula e inserta los Z-Scores leyendo 'simulaciones_empresas' por bloques.
+
+    Cada bloque se lee con fetchmany, se puntúa con calcular_z_score y se
+    escribe en 'zscore_empresas' con executemany desde un segundo cursor,
+    de modo que la memoria depende de `tam_lote` y no del tamaño de la tabla.
+
+    Args:
+        connection_string (str): Cadena de conexión Oracle o 'sqlite:///ruta.db'.
+        sensibilidad_dict (dict | pd.Series | None): Sensibilidad por empresa.
+            Si es None se lee de 'empresas_ficticias'.
+        tam_lote (int): Filas por bloque de lectura/escritura.
+        triggers_fila (bool): Generar las alertas con el trigger de fila en
+            lugar de por conjuntos al terminar (generacion_alertas.py).
+
+    Returns:
+        dict: Filas procesadas, segundos empleados por etapa, id_carga y
+        alertas generadas.
+    """
+    tiempos = {"lectura": 0.0, "calculo": 0.0, "escritura": 0.0, "alertas": 0.0}
+    filas_totales = 0
+
+    with abrir_almacenamiento(connection_string) as almacenamiento:
+        if sensibilidad_dict is None:
+            sensibilidad_dict = _serie_sensibilidades(almacenamiento.obtener_sensibilidades())
+
+        with carga_con_alertas(almacenamiento, "zscore_empresas", triggers_fila) as carga:
+            lotes = almacenamiento.leer_simulaciones_empresas(tam_lote)
+            while True:
+                inicio = time.perf_counter()
+                filas = next(lotes, None)
+                fin_lectura = time.perf_counter()
+                tiempos["lectura"] += fin_lectura - inicio
+                if filas is None:
+                    break
+
+                bloque = calcular_z_score(pd.DataFrame(filas, columns=COLUMNAS_SIMULACION),
+                                          sensibilidad_dict)
+                fin_calculo = time.perf_counter()
+                tiempos["calculo"] += fin_calculo - fin_lectura
+
+                almacenamiento.insertar_zscores(_filas_zscore(bloque), id_carga=carga["id_carga"])
+                tiempos["escritura"] += time.perf_counter() - fin_calculo
+                filas_totales += len(filas)
+
+            inicio = time.perf_counter()
+            almacenamiento.confirmar()
+            fin_escritura = time.perf_counter()
+            tiempos["escritura"] += fin_escritura - inicio
+        tiempos["alertas"] += time.perf_counter() - fin_escritura
+
+    print(f"✅ Z-Scores insertados correctamente: {filas_totales} registros.")
+    for etapa, segundos in tiempos.items():
+        ritmo = filas_totales / segundos if segundos > 0 else float("inf")
+        print(f"   {etapa:<10} {segundos:8.2f} s  {ritmo:12,.0f} filas/s")
+    _informar_alertas(carga)
+
+    return {"filas": filas_totales, "segundos": tiempos, "id_carga": carga["id_carga"],
+            "alertas": carga["alertas"]}
+
+
+if __name__ == "__main__":
+    connection_string = "usuario/contraseña@host:puerto/SID"
+    # Lectura, cálculo e inserción por bloques; la sensibilidad se lee
+    # de 'empresas_ficticias'.
+    procesar_zscores_streaming(connection_string, tam_lote=50_000)
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+# Los scripts se importan entre sí por nombre (from almacenamiento import ...)
+# y la API como paquete (from scripts.almacenamiento import ...).
+sys.path.insert(0, str(RAIZ / "scripts"))
+sys.path.insert(0, str(RAIZ))
+
+
+@pytest.fixture
+def csv_fdi(tmp_path):
+    """CSV sintético con el formato del Banco Mundial (4 filas de cabecera)."""
+    rng = np.random.default_rng(7)
+    años = [str(a) for a in range(1995, 2024)]
+    valores = rng.normal(3, 2, size=(12, len(años)))
+    valores[0, 5:8] = np.nan
+    datos = pd.DataFrame(valores, columns=años)
+    datos.insert(0, "Country Name", [f"Pais_{i}" for i in range(12)])
+    datos.insert(1, "Country Code", [f"P{i:02d}" for i in range(12)])
+    datos.insert(2, "Indicator Name", "Foreign direct investment, net inflows (% of GDP)")
+    datos.insert(3, "Indicator Code", "BX.KLT.DINV.WD.GD.ZS")
+    datos["2024"] = np.nan
+
+    ruta = tmp_path / "fdi_inflows.csv"
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write('"Data Source","World Development Indicators",\n\n"Last Updated Date","2024-01-01",\n\n')
+        datos.to_csv(f, index=False)
+    return ruta
+
+
+@pytest.fixture
+def cadena_sqlite(tmp_path):
+    return f"sqlite:///{tmp_path / 'fdi.db'}"
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from almacenamiento import abrir_almacenamiento
+from generacion_alertas import carga_con_alertas
+
+EMPRESAS = [
+    ("Solar SA", "ESP", "Energía", 1e6, 0.8),
+    ("Banco SL", "ESP", "Finanzas", 2e6, 0.3),
+    ("Tienda SA", "IRL", "Comercio", 5e5, 0.5),
+    ("Mina SL", "POL", "Energía", 3e6, 0.6),
+]
+
+
+def _filas_zscore(semilla, n=3_000):
+    rng = np.random.default_rng(semilla)
+    return [(int(e), "ESP", 2023 + int(a), int(s), 1e6, round(float(z), 2))
+            for e, a, s, z in zip(rng.integers(1, 6, n), rng.integers(0, 5, n),
+                                  np.arange(n), rng.normal(2.0, 0.6, n))]
+
+
+def _filas_simulacion(semilla, n=3_000):
+    rng = np.random.default_rng(semilla)
+    return [("ESP", 2023 + i % 5, round(float(v), 2), i // 5 + 1)
+            for i, v in enumerate(rng.normal(5, 4, n))]
+
+
+@pytest.fixture
+def almacenamiento(cadena_sqlite):
+    with abrir_almacenamiento(cadena_sqlite) as almacenamiento:
+        almacenamiento.insertar_empresas(EMPRESAS)
+        # Umbral general 1.8, más alto para Energía y más bajo para Finanzas.
+        almacenamiento.fijar_umbral_alerta("zscore", minimo=2.1, sector="Energía")
+        almacenamiento.fijar_umbral_alerta("zscore", minimo=1.2, sector="Finanzas")
+        almacenamiento.fijar_umbral_alerta("fdi", 0, 10)
+        almacenamiento.confirmar()
+        yield almacenamiento
+
+
+def _contar(almacenamiento, sql, *binds):
+    return almacenamiento.conexion.execute(sql, binds).fetchone()[0]
+
+
+def _alertas_por_carga(almacenamiento, tabla, id_carga):
+    columnas = ("id_empresa, año, escenario_id, z_score" if tabla == "alertas_empresas"
+                else "pais, año, valor_detectado")
+    return sorted(almacenamiento.conexion.execute(
+        f"SELECT {columnas} FROM {tabla} WHERE id_carga = ?", (id_carga,)).fetchall())
+
+
+def test_alertas_zscore_por_conjuntos_igual_que_trigger(almacenamiento):
+    filas = _filas_zscore(1)
+
+    with carga_con_alertas(almacenamiento, "zscore_empresas", triggers_fila=True) as fila:
+        almacenamiento.insertar_zscores(filas, id_carga=fila["id_carga"])
+    almacenamiento.confirmar()
+    with carga_con_alertas(almacenamiento, "zscore_empresas") as conjunto:
+        almacenamiento.insertar_zscores(filas, id_carga=conjunto["id_carga"])
+
+    por_fila = _alertas_por_carga(almacenamiento, "alertas_empresas", fila["id_carga"])
+    por_conjunto = _alertas_por_carga(almacenamiento, "alertas_empresas", conjunto["id_carga"])
+    assert conjunto["alertas"] == len(por_conjunto) == len(por_fila) > 0
+    assert por_conjunto == por_fila
+
+    # Mismo criterio que obtener_umbrales_zscore (el de resumen_escenarios);
+    # la empresa 5 no existe y usa el umbral general.
+    general, umbrales = almacenamiento.obtener_umbrales_zscore()
+    esperadas = sum(z < umbrales.get(e, general) for e, _, _, _, _, z in filas)
+    assert len(por_fila) == esperadas
+
+
+def test_alertas_simulacion_por_conjuntos_igual_que_trigger(almacenamiento):
+    filas = _filas_simulacion(2)
+
+    with carga_con_alertas(almacenamiento, "simulaciones_montecarlo",
+                           triggers_fila=True) as fila:
+        almacenamiento.insertar_simulaciones_pais(filas, id_carga=fila["id_carga"])
+    almacenamiento.confirmar()
+    with carga_con_alertas(almacenamiento, "simulaciones_montecarlo") as conjunto:
+        almacenamiento.insertar_simulaciones_pais(filas, id_carga=conjunto["id_carga"])
+
+    por_fila = _alertas_por_carga(almacenamiento, "alertas_simulacion", fila["id_carga"])
+    por_conjunto = _alertas_por_carga(almacenamiento, "alertas_simulacion", conjunto["id_carga"])
+    assert conjunto["alertas"] == len(por_conjunto) == len(por_fila)
+    assert por_conjunto == por_fila
+    assert len(por_fila) == sum(not 0 <= v <= 10 for _, _, v, _ in filas)
+
+
+def test_carga_fallida_se_revierte(almacenamiento):
+    class Interrumpida(Exception):
+        pass
+
+    with pytest.raises(Interrumpida):
+        with carga_con_alertas(almacenamiento, "zscore_empresas") as carga:
+            almacenamiento.insertar_zscores(_filas_zscore(3), id_carga=carga["id_carga"])
+            raise Interrumpida
+
+    # Un confirmar posterior en la misma conexión no guarda nada de la carga.
+    almacenamiento.confirmar()
+    assert carga["alertas"] is None
+    assert _contar(almacenamiento, "SELECT COUNT(*) FROM zscore_empresas") == 0
+    assert _contar(almacenamiento, "SELECT COUNT(*) FROM alertas_empresas") == 0
+
+    # Los triggers vuelven a estar activos en la sesión.
+    almacenamiento.insertar_zscores([(1, "ESP", 2023, 1, 1e6, 0.5)])
+    assert _contar(almacenamiento, "SELECT COUNT(*) FROM alertas_empresas") == 1
+
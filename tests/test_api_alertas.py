@@ -0,0 +1,180 @@
+import sqlite3
+import threading
+import types
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import alerts, db
+from api.main import app
+from scripts.almacenamiento import ErrorAlmacenamiento, conectar_sqlite
+
+
+def _insertar_alertas(ruta, n, inicio, repeticiones=7):
+    """n alertas; cada fecha se repite `repeticiones` veces (empates en fecha_alerta)."""
+    conexion = conectar_sqlite(ruta)
+    conexion.executemany("""
+        INSERT INTO alertas_empresas (id_empresa, año, escenario_id, z_score, mensaje, fecha_alerta)
+        VALUES (?, ?, ?, ?, 'Riesgo', ?)
+    """, [(1 + i % 4, 2023 + i % 3, i, 1.0, inicio + timedelta(seconds=i // repeticiones))
+          for i in range(n)])
+    conexion.commit()
+    conexion.close()
+
+
+def _ids(consulta, ruta):
+    conexion = sqlite3.connect(ruta)
+    try:
+        return [fila[0] for fila in conexion.execute(consulta)]
+    finally:
+        conexion.close()
+
+
+@pytest.fixture
+def cliente_sqlite(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "fdi.db")
+    conectar_sqlite(ruta).close()
+    monkeypatch.setenv("FDI_BACKEND", "sqlite")
+    monkeypatch.setenv("FDI_SQLITE_RUTA", ruta)
+    alerts.invalidar_cache_alertas()
+    with TestClient(app) as cliente:
+        yield cliente, ruta
+    alerts.invalidar_cache_alertas()
+
+
+def _recorrer(cliente, limit, al_pedir=None, **filtros):
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        params = dict(filtros, limit=limit, **({"cursor": cursor} if cursor else {}))
+        respuesta = cliente.get("/alertas-quiebra", params=params)
+        assert respuesta.status_code == 200
+        vistos += [fila["id_alerta"] for fila in respuesta.json()]
+        paginas += 1
+        if al_pedir:
+            al_pedir(paginas)
+        cursor = respuesta.headers.get("X-Siguiente-Cursor")
+        if not cursor:
+            return vistos
+
+
+@pytest.mark.parametrize("limit", [1, 7, 37, 100, 1000])
+def test_paginacion_por_cursor_sin_duplicados_ni_huecos(cliente_sqlite, limit):
+    cliente, ruta = cliente_sqlite
+    _insertar_alertas(ruta, 250, datetime(2024, 1, 1))
+
+    vistos = _recorrer(cliente, limit)
+
+    esperado = _ids("SELECT id_alerta FROM alertas_empresas "
+                    "ORDER BY fecha_alerta DESC, id_alerta DESC", ruta)
+    assert vistos == esperado
+    assert len(set(vistos)) == 250
+
+
+def test_paginacion_estable_con_alertas_nuevas(cliente_sqlite):
+    cliente, ruta = cliente_sqlite
+    _insertar_alertas(ruta, 120, datetime(2024, 1, 1))
+    originales = _ids("SELECT id_alerta FROM alertas_empresas "
+                      "ORDER BY fecha_alerta DESC, id_alerta DESC", ruta)
+
+    def nueva_carga(pagina):
+        # Alertas más recientes mientras se recorren las páginas: no deben
+        # desplazar ni repetir las que quedan por leer.
+        if pagina == 2:
+            _insertar_alertas(ruta, 30, datetime(2024, 6, 1))
+            alerts.invalidar_cache_alertas()
+
+    assert _recorrer(cliente, 25, al_pedir=nueva_carga) == originales
+
+
+def test_paginacion_con_filtros(cliente_sqlite):
+    cliente, ruta = cliente_sqlite
+    _insertar_alertas(ruta, 200, datetime(2024, 1, 1))
+
+    vistos = _recorrer(cliente, 9, id_empresa=2, anio=2024)
+
+    esperado = _ids("SELECT id_alerta FROM alertas_empresas WHERE id_empresa = 2 AND año = 2024 "
+                    "ORDER BY fecha_alerta DESC, id_alerta DESC", ruta)
+    assert vistos == esperado and esperado
+
+
+def test_cursor_no_valido(cliente_sqlite):
+    cliente, _ = cliente_sqlite
+    assert cliente.get("/alertas-quiebra", params={"cursor": "no-es-un-cursor"}).status_code == 400
+
+
+# =====================================
+# Pool de Oracle con un driver simulado (crear_pool(driver=...))
+# =====================================
+
+class _ErrorDriver(ErrorAlmacenamiento):
+    # Como cx_Oracle.Error en una instalación real, forma parte de ERRORES_BD.
+    pass
+
+
+class _PoolAgotadoSimulado:
+    """SessionPool sin conexiones libres: acquire agota la espera y falla."""
+
+    def __init__(self, **opciones):
+        self.opciones = opciones
+        self.busy = self.opened = opciones["max"]
+        self.cerrado = threading.Event()
+
+    def acquire(self):
+        raise _ErrorDriver(f"ORA-24459: tiempo de espera agotado ({self.opciones['waitTimeout']} ms)")
+
+    def release(self, conexion):
+        raise AssertionError("No se ha prestado ninguna conexión")
+
+    def close(self, force=False):
+        self.cerrado.set()
+
+
+def _driver_simulado():
+    return types.SimpleNamespace(
+        Error=_ErrorDriver,
+        SPOOL_ATTRVAL_TIMEDWAIT=3,
+        SessionPool=_PoolAgotadoSimulado,
+        makedsn=lambda host, puerto, service_name: f"{host}:{puerto}/{service_name}",
+    )
+
+
+def test_pool_oracle_espera_acotada_y_503(monkeypatch):
+    monkeypatch.setenv("FDI_BACKEND", "oracle")
+    monkeypatch.setenv("ORACLE_POOL_MAX", "3")
+    monkeypatch.setenv("ORACLE_POOL_ESPERA", "0.25")
+    alerts.invalidar_cache_alertas()
+
+    pool = db.crear_pool(driver=_driver_simulado())
+    try:
+        assert pool.opciones["getmode"] == 3
+        assert pool.opciones["waitTimeout"] == 250
+        assert pool.opciones["max"] == 3
+        assert db._exportaciones["maximo"] == 2
+
+        # Sin lifespan: el pool simulado es el de la aplicación.
+        cliente = TestClient(app)
+        respuesta = cliente.get("/alertas-quiebra")
+        assert respuesta.status_code == 503
+        assert respuesta.headers["Retry-After"] == "5"
+    finally:
+        db.cerrar_pool()
+    assert pool.cerrado.is_set()
+
+
+def test_exportaciones_limitadas_con_pool_sqlite(cliente_sqlite):
+    cliente, ruta = cliente_sqlite
+    _insertar_alertas(ruta, 10, datetime(2024, 1, 1))
+    maximo = db._exportaciones["maximo"]
+
+    # Exportaciones en curso ocupando todo su cupo: la siguiente recibe 503
+    # en lugar de quedarse esperando una conexión.
+    db._exportaciones["en_curso"] = maximo
+    try:
+        assert cliente.get("/alertas-quiebra/exportar").status_code == 503
+    finally:
+        db._exportaciones["en_curso"] = 0
+
+    respuesta = cliente.get("/alertas-quiebra/exportar", params={"formato": "csv"})
+    assert respuesta.status_code == 200
+    assert len(respuesta.text.strip().splitlines()) == 11
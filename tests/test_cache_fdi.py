@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fdi_analysis_preprocessing import (analizar_fdi_lote, cargar_fdi_limpio,
+                                        construir_panel_largo, limpiar_datos_fdi)
+
+
+def _ficheros(directorio, sufijo):
+    return sorted(p for p in directorio.iterdir() if p.name.startswith("fdi_")
+                  and p.suffix == sufijo)
+
+
+def test_cache_igual_que_limpiar(csv_fdi, tmp_path):
+    esperado = limpiar_datos_fdi(pd.read_csv(csv_fdi, skiprows=4))
+    cache = tmp_path / "cache"
+
+    primero = cargar_fdi_limpio(csv_fdi, cache)
+    segundo = cargar_fdi_limpio(csv_fdi, cache)
+
+    pd.testing.assert_frame_equal(primero, esperado, check_dtype=False)
+    pd.testing.assert_frame_equal(segundo, esperado, check_dtype=False)
+    # El rango de años sale del CSV: 2024 está vacío y se descarta.
+    assert list(primero.columns[2:]) == [str(a) for a in range(2000, 2024)]
+
+
+@pytest.mark.parametrize("danar", [
+    lambda meta, valores: meta.write_text("{incompleto", encoding="utf-8"),
+    lambda meta, valores: meta.write_text(json.dumps({"columnas": []}), encoding="utf-8"),
+    lambda meta, valores: valores.write_bytes(b"\x93NUMPY truncado"),
+    lambda meta, valores: valores.unlink(),
+])
+def test_cache_danada_se_regenera(csv_fdi, tmp_path, danar):
+    cache = tmp_path / "cache"
+    # Copia: el resultado es un memmap del .npy que se va a dañar.
+    esperado = cargar_fdi_limpio(csv_fdi, cache).copy()
+    [meta], [valores] = _ficheros(cache, ".json"), _ficheros(cache, ".npy")
+
+    danar(meta, valores)
+    regenerado = cargar_fdi_limpio(csv_fdi, cache)
+
+    pd.testing.assert_frame_equal(regenerado, esperado)
+    assert cargar_fdi_limpio(csv_fdi, cache).equals(esperado)
+    assert not list(cache.glob(".tmp_*"))
+
+
+def test_indice_danado_se_recalcula(csv_fdi, tmp_path):
+    cache = tmp_path / "cache"
+    esperado = cargar_fdi_limpio(csv_fdi, cache)
+    (cache / "indice.json").write_text("[1, 2", encoding="utf-8")
+
+    pd.testing.assert_frame_equal(cargar_fdi_limpio(csv_fdi, cache), esperado)
+    assert isinstance(json.loads((cache / "indice.json").read_text(encoding="utf-8")), dict)
+
+
+def test_estadisticas_incrementales_igual_que_recalcular(csv_fdi, tmp_path):
+    cache = tmp_path / "cache"
+    panel = construir_panel_largo(cargar_fdi_limpio(csv_fdi, cache))
+    completo = analizar_fdi_lote(panel, directorio_cache=None)
+
+    # Primero sin los dos últimos años; después el panel completo solo
+    # añade esos años al estado guardado.
+    parcial = panel[panel.index.get_level_values(1) < 2022]
+    analizar_fdi_lote(parcial, directorio_cache=cache)
+    incremental = analizar_fdi_lote(panel, directorio_cache=cache)
+    np.testing.assert_allclose(incremental.to_numpy(), completo.to_numpy(), rtol=1e-12)
+
+    # Un valor revisado en un año ya procesado reconstruye ese país.
+    revisado = panel.copy()
+    revisado.iloc[3, revisado.columns.get_loc("FDI")] += 1.0
+    np.testing.assert_allclose(analizar_fdi_lote(revisado, directorio_cache=cache).to_numpy(),
+                               analizar_fdi_lote(revisado, directorio_cache=None).to_numpy(),
+                               rtol=1e-12)
+
+    (cache / "estadisticas_fdi.json").write_text("{dañado", encoding="utf-8")
+    np.testing.assert_allclose(analizar_fdi_lote(panel, directorio_cache=cache).to_numpy(),
+                               completo.to_numpy(), rtol=1e-12)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from almacenamiento import abrir_almacenamiento
+from empresas import generar_ingresos_empresa, insertar_simulaciones_empresas
+from simulacion_conjunta import EscenariosPaises
+
+EMPRESAS = [
+    ("Solar SA", "ESP", "Energía", 1e6, 0.8),
+    ("Banco SL", "CHN", "Finanzas", 2e6, 0.3),
+]
+
+
+def _ingresos(cadena, id_empresa, escenarios, años):
+    with abrir_almacenamiento(cadena) as almacenamiento:
+        filas = [f for lote in almacenamiento.leer_simulaciones_empresas() for f in lote
+                 if f[0] == id_empresa]
+    filas.sort(key=lambda f: (f[3], f[2]))
+    return np.array([f[4] for f in filas]).reshape(escenarios, años)
+
+
+@pytest.mark.parametrize("procesos", [1, 2])
+def test_cubo_sin_pais_simula_con_el_metodo_pedido(cadena_sqlite, procesos):
+    with abrir_almacenamiento(cadena_sqlite) as almacenamiento:
+        almacenamiento.insertar_empresas(EMPRESAS)
+        almacenamiento.confirmar()
+    cubo = EscenariosPaises(["ESP"], np.random.default_rng(1).normal(3, 1, (1, 50, 4)))
+
+    total = insertar_simulaciones_empresas(cadena_sqlite, años=4, escenarios=50, semilla=8,
+                                           procesos=procesos, metodo="lhs", cubo_paises=cubo)
+
+    assert total == 2 * 50 * 4
+    # CHN no está en el cubo: su empresa se simula con su propio flujo y el
+    # método pedido, como sin cubo.
+    semilla_chn = np.random.SeedSequence(8).spawn(2)[1]
+    esperado = generar_ingresos_empresa(2e6, 0.3, 4, 50, semilla_chn, "lhs")
+    np.testing.assert_allclose(_ingresos(cadena_sqlite, 2, 50, 4), esperado)
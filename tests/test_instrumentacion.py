@@ -0,0 +1,31 @@
+import pytest
+
+import instrumentacion
+
+
+@pytest.fixture
+def metricas():
+    activa = instrumentacion.esta_activa()
+    instrumentacion.activar()
+    instrumentacion.reiniciar()
+    yield
+    instrumentacion.reiniciar()
+    instrumentacion.activar(activa)
+
+
+@pytest.mark.parametrize("valor,escapado", [
+    ("ESP", "ESP"),
+    ('dijo "hola"', 'dijo \\"hola\\"'),
+    ("C:\\datos\\fdi.csv", "C:\\\\datos\\\\fdi.csv"),
+    ("línea 1\nlínea 2", "línea 1\\nlínea 2"),
+    ('\\"\n', '\\\\\\"\\n'),
+])
+def test_valores_de_etiqueta_escapados(metricas, valor, escapado):
+    instrumentacion.observar("carga.prueba", 0.01, filas=3, origen=valor)
+
+    texto = instrumentacion.exportar_prometheus()
+
+    assert f'fdi_carga_prueba_segundos_count{{origen="{escapado}"}} 1' in texto
+    assert f'{{origen="{escapado}",le="+Inf"}} 1' in texto
+    # Cada muestra sigue en su propia línea.
+    assert all(linea.startswith(("#", "fdi_")) for linea in texto.splitlines() if linea)
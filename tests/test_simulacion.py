@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ejecucion_paralela import ejecutar_en_paralelo
+from muestreo import simular_hasta_convergencia
+from simulacion_montecarlo import simular_fdi, simular_montecarlo_fdi, simular_paises_paralelo
+
+
+# =====================================
+# Modo adaptativo (tope de escenarios)
+# =====================================
+
+def _bloque_ruidoso(n, rng):
+    # Media cercana a 0 y mucha dispersión: nunca alcanza la precisión.
+    return rng.normal(0.001, 50.0, size=(n, 3))
+
+
+@pytest.mark.parametrize("maximo", [2, 3, 7, 99, 100, 101, 250, 1_001])
+@pytest.mark.parametrize("tam_bloque", [1, 30, 100, 500])
+def test_adaptativo_no_supera_el_maximo(maximo, tam_bloque):
+    matriz, informe = simular_hasta_convergencia(_bloque_ruidoso, tam_bloque=tam_bloque,
+                                                 maximo=maximo, precision=1e-6, rng=1)
+    assert len(matriz) == informe["escenarios"] <= maximo
+    assert informe["bloques"] >= 2
+    assert not informe["convergido"]
+
+
+def test_adaptativo_rechaza_maximo_menor_que_dos():
+    with pytest.raises(ValueError):
+        simular_hasta_convergencia(_bloque_ruidoso, maximo=1)
+
+
+@pytest.mark.parametrize("metodo", ["iid", "antitetico", "lhs"])
+def test_simular_fdi_adaptativo_respeta_iteraciones(metodo):
+    df = simular_fdi("ESP", 0.01, 5.0, años=4, iteraciones=333, semilla=3, metodo=metodo,
+                     precision=1e-6)
+    assert df["escenario_id"].max() == df.attrs["convergencia"]["escenarios"] <= 333
+
+
+# =====================================
+# Resultados independientes del número de procesos
+# =====================================
+
+def _tarea_aleatoria(tarea, semilla):
+    return tarea, np.random.default_rng(semilla).normal(size=3).tolist()
+
+
+@pytest.mark.parametrize("procesos,tam_fragmento", [(2, None), (3, 1), (4, 7), (2, 500)])
+def test_ejecutar_en_paralelo_igual_que_un_proceso(procesos, tam_fragmento):
+    tareas = list(range(150))
+    esperado = list(ejecutar_en_paralelo(_tarea_aleatoria, tareas, semilla=11, procesos=1))
+    obtenido = list(ejecutar_en_paralelo(_tarea_aleatoria, tareas, semilla=11,
+                                         procesos=procesos, tam_fragmento=tam_fragmento))
+    assert obtenido == esperado
+
+
+@pytest.mark.parametrize("metodo,precision", [("iid", None), ("lhs", None), ("iid", 0.05)])
+def test_simular_paises_paralelo_igual_con_1_y_n_procesos(metodo, precision):
+    parametros = {f"P{i:02d}": (1.0 + i, 0.5 + i / 10) for i in range(9)}
+    uno = simular_paises_paralelo(parametros, años=3, iteraciones=200, semilla=5, procesos=1,
+                                  metodo=metodo, precision=precision)
+    varios = simular_paises_paralelo(parametros, años=3, iteraciones=200, semilla=5,
+                                     procesos=3, metodo=metodo, precision=precision)
+    assert list(uno) == list(varios) == list(parametros)
+    for codigo in parametros:
+        np.testing.assert_array_equal(uno[codigo], varios[codigo])
+
+
+# =====================================
+# simular_montecarlo_fdi
+# =====================================
+
+def _series_fdi():
+    rng = np.random.default_rng(0)
+    años = np.arange(2000, 2023)
+    return {pais: pd.DataFrame({"Año": años, "FDI": rng.normal(media, 1.5, len(años))})
+            for pais, media in (("ESP", 2.5), ("IRL", 9.0), ("POL", 3.1))}
+
+
+@pytest.mark.parametrize("metodo", ["iid", "lhs"])
+@pytest.mark.parametrize("correlacionado", [False, True])
+def test_simular_montecarlo_fdi_reproducible_y_con_error(metodo, correlacionado):
+    series = _series_fdi()
+    simulaciones, errores = simular_montecarlo_fdi(series, 400, 4, metodo, correlacionado,
+                                                   semilla=21, con_error=True)
+    repetidas = simular_montecarlo_fdi(series, 400, 4, metodo, correlacionado, semilla=21)
+
+    assert list(simulaciones) == list(errores) == list(series)
+    for pais, matriz in simulaciones.items():
+        assert matriz.shape == (400, 4)
+        np.testing.assert_array_equal(matriz, repetidas[pais])
+        assert errores[pais]["replicas"] == 10
+        assert np.all(np.isfinite(errores[pais]["error_media"]))
+        np.testing.assert_allclose(errores[pais]["media"], matriz.mean(axis=0), atol=1e-6)
+
+
+def test_simular_montecarlo_fdi_un_flujo_por_pais():
+    simulaciones = simular_montecarlo_fdi(_series_fdi(), 300, 3, semilla=4)
+    # Flujos distintos: los ruidos estandarizados de los países no coinciden.
+    ruidos = [(m - m.mean()) / m.std() for m in simulaciones.values()]
+    assert not np.allclose(ruidos[0], ruidos[1])
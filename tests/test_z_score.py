@@ -0,0 +1,74 @@
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# z-score.py no es importable por nombre (lleva guion).
+_spec = importlib.util.spec_from_file_location("z_score", RAIZ / "scripts" / "z-score.py")
+z_score = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(z_score)
+
+
+def _z_score_original(df_simulaciones, sensibilidad_dict):
+    """Implementación original fila a fila (iterrows + round), como referencia."""
+    z_scores = []
+    for _, row in df_simulaciones.iterrows():
+        ingreso = row['ingreso_simulado']
+        sensibilidad = sensibilidad_dict.get(row['id_empresa'], 0.5)
+
+        activos_totales = ingreso
+        activos_circulantes = ingreso * 0.4
+        pasivos_circulantes = ingreso * (0.2 + (1 - sensibilidad) * 0.3)
+        utilidad_retenida = ingreso * 0.1
+        ebit = ingreso * (0.12 + sensibilidad * 0.08)
+        patrimonio = ingreso * sensibilidad
+        pasivo_total = ingreso - patrimonio
+
+        z = (0.717 * (activos_circulantes - pasivos_circulantes) / activos_totales +
+             0.847 * utilidad_retenida / activos_totales +
+             3.107 * ebit / activos_totales +
+             0.420 * patrimonio / pasivo_total)
+        z_scores.append(round(z, 2))
+    return z_scores
+
+
+def _bits(valores):
+    return np.asarray(valores, dtype="float64").view("int64")
+
+
+def test_z_score_identico_al_original():
+    rng = np.random.default_rng(3)
+    n = 5_000
+    df = pd.DataFrame({
+        "id_empresa": rng.integers(1, 13, n),
+        "pais": "ESP",
+        "año": 2023,
+        "escenario_id": np.arange(n),
+        "ingreso_simulado": np.round(rng.lognormal(13, 1.5, n), 2),
+    })
+    # La empresa 12 no tiene sensibilidad: usa el valor por defecto (0.5).
+    sensibilidades = {i: round(float(s), 3) for i, s in enumerate(rng.uniform(0.05, 0.95, 11), 1)}
+
+    esperado = _z_score_original(df, sensibilidades)
+    obtenido = z_score.calcular_z_score(df.copy(), sensibilidades)["z_score"]
+
+    np.testing.assert_array_equal(_bits(obtenido), _bits(esperado))
+
+
+@pytest.mark.parametrize("decimales", [1, 2, 3])
+def test_redondeo_identico_a_round_en_mitades(decimales):
+    # Valores "x.xx5" en decimal: en binario quedan justo por encima o por
+    # debajo de la mitad, que es donde np.round y round() pueden discrepar.
+    escala = 10 ** (decimales + 1)
+    base = (np.arange(-50_000, 50_000) * 10 + 5) / escala
+    valores = np.concatenate([base, np.nextafter(base, np.inf), np.nextafter(base, -np.inf),
+                              base * 1e4 + 0.5 / 10 ** decimales])
+
+    obtenido = z_score._redondear_como_python(valores, decimales)
+    esperado = [round(float(v), decimales) for v in valores]
+
+    np.testing.assert_array_equal(_bits(obtenido), _bits(esperado))